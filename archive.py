@@ -0,0 +1,275 @@
+"""Columnar history: multi-season player game logs and odds snapshots as partitioned Parquet.
+
+    archive/game_logs/sport=NBA/season=2023-24/part-*.parquet
+    archive/odds/sport=NBA/season=2023-24/month=2024-01/part-*.parquet
+
+Files are read memory-mapped through pyarrow.dataset. Filters on sport, season
+and month prune whole directories; filters on other columns (player, date,
+market) are pushed down to Parquet row-group statistics, and only the requested
+columns are decoded. Game logs are sorted by player and odds by market then
+game date, in small row groups, so a narrow query touches a few groups per file. Odds are
+partitioned by month rather than day because opening a file costs about as
+much as reading a day of odds; `compact` merges the per-fetch files:
+
+    python archive.py backfill                                   # copy sports.db history in
+    python archive.py compact                                    # one sorted file per partition
+    python archive.py games --player 203954 --opponent "Milwaukee Bucks" --since 2018-10-01
+    python archive.py closing --sport NBA --season 2023-24 --market h2h
+"""
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+from metrics import get_logger, stage
+from utils import season_for
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+ROW_GROUP_ROWS = 4096  # ~6 groups per NBA season; small enough for player pruning to matter
+
+GAME_LOG_SCHEMA = pa.schema([
+    ('player_id', pa.int64()),
+    ('game_id', pa.string()),
+    ('game_date', pa.date32()),
+    ('team', pa.string()),
+    ('opponent', pa.string()),
+    ('position', pa.string()),
+    ('pts', pa.float32()), ('reb', pa.float32()), ('ast', pa.float32()),
+    ('fg3m', pa.float32()), ('blk', pa.float32()), ('stl', pa.float32()),
+    ('sport', pa.string()),
+    ('season', pa.string())
+])
+
+ODDS_SCHEMA = pa.schema([
+    ('fetched_at', pa.timestamp('s', tz='UTC')),
+    ('game_id', pa.string()),
+    ('commence_time', pa.timestamp('s', tz='UTC')),
+    ('home_team', pa.string()),
+    ('away_team', pa.string()),
+    ('bookmaker', pa.string()),
+    ('market', pa.string()),
+    ('outcome', pa.string()),
+    ('player', pa.string()),
+    ('point', pa.float32()),
+    ('price', pa.float32()),
+    ('sport', pa.string()),
+    ('season', pa.string()),
+    ('month', pa.string()),
+    ('date', pa.string())
+])
+
+PARTITIONS = {
+    'game_logs': ds.partitioning(pa.schema([('sport', pa.string()), ('season', pa.string())]), flavor='hive'),
+    'odds': ds.partitioning(pa.schema([('sport', pa.string()), ('season', pa.string()), ('month', pa.string())]),
+                            flavor='hive')
+}
+SCHEMAS = {'game_logs': GAME_LOG_SCHEMA, 'odds': ODDS_SCHEMA}
+SORT_KEYS = {'game_logs': [('player_id', 'ascending'), ('game_date', 'ascending')],
+             'odds': [('market', 'ascending'), ('date', 'ascending'), ('game_id', 'ascending'),
+                      ('fetched_at', 'ascending')]}
+
+log = get_logger(__name__)
+_filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+_datasets: Dict[str, ds.Dataset] = {}
+
+
+def dataset_path(name: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or ARCHIVE_DIR, name)
+
+
+def open_dataset(name: str, root: Optional[str] = None) -> Optional[ds.Dataset]:
+    """The archived dataset (file listing cached until the next write), or None if empty"""
+    path = dataset_path(name, root)
+    if path not in _datasets:
+        if not os.path.isdir(path):
+            return None
+        _datasets[path] = ds.dataset(path, schema=SCHEMAS[name], format='parquet',
+                                     partitioning=PARTITIONS[name], filesystem=_filesystem)
+    return _datasets[path]
+
+
+def _write(name: str, table: pa.Table, root: Optional[str], replace: bool, tag: str):
+    path = dataset_path(name, root)
+    ds.write_dataset(table, path, format='parquet', partitioning=PARTITIONS[name],
+                     basename_template=f"part-{tag}-{{i}}.parquet",
+                     existing_data_behavior='delete_matching' if replace else 'overwrite_or_ignore',
+                     min_rows_per_group=ROW_GROUP_ROWS, max_rows_per_group=ROW_GROUP_ROWS,
+                     filesystem=_filesystem)
+    _datasets.pop(path, None)
+
+
+def archive_game_logs(logs: pd.DataFrame, sport: str = 'NBA', root: Optional[str] = None) -> int:
+    """Write fetch_bulk_game_logs-shaped rows, replacing the seasons they cover"""
+    if logs.empty:
+        return 0
+    frame = logs.assign(sport=sport.upper(), game_date=pd.to_datetime(logs['game_date']).dt.date)
+    frame = frame.astype({name: object for name in frame.select_dtypes('category').columns})
+    frame = frame.sort_values(['player_id', 'game_date'])
+    table = pa.Table.from_pandas(frame[GAME_LOG_SCHEMA.names], schema=GAME_LOG_SCHEMA, preserve_index=False)
+    with stage('archive', dataset='game_logs'):
+        _write('game_logs', table, root, replace=True, tag='logs')
+    return table.num_rows
+
+
+def archive_odds(rows: pd.DataFrame, root: Optional[str] = None) -> int:
+    """Append odds rows (ODDS_COLUMNS plus fetched_at) partitioned by sport, season and game month"""
+    if rows.empty:
+        return 0
+    commence = pd.to_datetime(rows['commence_time'], utc=True, errors='coerce').dt.floor('s')
+    fetched = rows['fetched_at']
+    fetched = pd.to_datetime(fetched, unit='s', utc=True) if pd.api.types.is_numeric_dtype(fetched) \
+        else pd.to_datetime(fetched, utc=True)
+    fetched = fetched.dt.floor('s')
+    from utils import SPORT_KEYS
+    sport_names = {key: name for name, key in SPORT_KEYS.items()}
+    frame = pd.DataFrame({
+        'fetched_at': fetched,
+        'game_id': rows['game_id'].astype(str),
+        'commence_time': commence,
+        'home_team': rows['home_team'], 'away_team': rows['away_team'],
+        'bookmaker': rows['bookmaker'], 'market': rows['market'], 'outcome': rows['outcome'],
+        'player': rows['player'].fillna(''),
+        'point': pd.to_numeric(rows['point'], errors='coerce'),
+        'price': pd.to_numeric(rows['price'], errors='coerce'),
+        'sport': rows['sport'].map(lambda s: sport_names.get(s, str(s).upper())),
+        'season': commence.map(season_for),
+        'month': commence.dt.strftime('%Y-%m'),
+        'date': commence.dt.strftime('%Y-%m-%d')
+    }).dropna(subset=['commence_time']).sort_values(['market', 'date', 'game_id'])
+    table = pa.Table.from_pandas(frame, schema=ODDS_SCHEMA, preserve_index=False)
+    tag = f"{int(fetched.max().timestamp())}-{os.getpid()}"
+    with stage('archive', dataset='odds'):
+        _write('odds', table, root, replace=False, tag=tag)
+    return table.num_rows
+
+
+def archive_odds_snapshot(games, fetched_at: float, root: Optional[str] = None) -> int:
+    """Append one fetch (raw games or an OddsBuffer) to the odds archive"""
+    from utils import ODDS_COLUMNS, iter_odds
+    rows = pd.DataFrame(list(iter_odds(games)), columns=ODDS_COLUMNS)
+    return archive_odds(rows.assign(fetched_at=fetched_at), root)
+
+
+def compact(name: str = 'odds', root: Optional[str] = None) -> int:
+    """Rewrite every partition holding several files as one sorted file; returns partitions merged"""
+    path = dataset_path(name, root)
+    merged = 0
+    for directory, _, files in os.walk(path):
+        parts = sorted(f for f in files if f.endswith('.parquet'))
+        if len(parts) < 2:
+            continue
+        table = ds.dataset([os.path.join(directory, f) for f in parts], format='parquet',
+                           filesystem=_filesystem).to_table()
+        table = table.sort_by([key for key in SORT_KEYS[name] if key[0] in table.column_names])
+        # Write beside the old files, then swap, so a reader sees either set but never neither
+        target = os.path.join(directory, f"part-compact-{int(datetime.now(timezone.utc).timestamp())}.parquet")
+        pq.write_table(table, target + '.tmp', row_group_size=ROW_GROUP_ROWS)
+        os.replace(target + '.tmp', target)
+        for f in parts:
+            if os.path.join(directory, f) != target:
+                os.remove(os.path.join(directory, f))
+        merged += 1
+    _datasets.pop(path, None)
+    return merged
+
+
+def scan(name: str, filter: Optional[ds.Expression] = None, columns: Optional[Sequence[str]] = None,
+         root: Optional[str] = None) -> pd.DataFrame:
+    """Rows matching filter with only the given columns; partition filters skip whole directories"""
+    dataset = open_dataset(name, root)
+    if dataset is None:
+        return pd.DataFrame(columns=list(columns or SCHEMAS[name].names))
+    with stage('archive_scan', dataset=name):
+        return dataset.to_table(columns=list(columns) if columns else None, filter=filter).to_pandas()
+
+
+def player_games(player_id: int, opponent: Optional[str] = None, since=None, until=None,
+                 columns: Optional[Sequence[str]] = None, sport: str = 'NBA',
+                 root: Optional[str] = None) -> pd.DataFrame:
+    """One player's archived games, e.g. every game against one opponent since a date"""
+    expr = (ds.field('sport') == sport.upper()) & (ds.field('player_id') == int(player_id))
+    if since is not None:
+        expr &= (ds.field('season') >= season_for(since)) & (ds.field('game_date') >= pd.Timestamp(since).date())
+    if until is not None:
+        expr &= (ds.field('season') <= season_for(until)) & (ds.field('game_date') <= pd.Timestamp(until).date())
+    if opponent:
+        expr &= ds.field('opponent') == opponent
+    games = scan('game_logs', expr, columns, root)
+    return games.sort_values('game_date').reset_index(drop=True) if 'game_date' in games else games
+
+
+CLOSING_COLUMNS = ['game_id', 'commence_time', 'bookmaker', 'market', 'outcome', 'player', 'point', 'price',
+                   'fetched_at']
+
+
+def closing_lines(sport: str = 'NBA', season: Optional[str] = None, market: Optional[str] = None,
+                  dates: Optional[List[str]] = None, columns: Sequence[str] = CLOSING_COLUMNS,
+                  root: Optional[str] = None) -> pd.DataFrame:
+    """Last price each book hung before tip-off, per game / market / outcome / player"""
+    expr = ds.field('sport') == sport.upper()
+    if season:
+        expr &= ds.field('season') == season
+    if dates:
+        expr &= ds.field('month').isin(sorted({d[:7] for d in dates})) & ds.field('date').isin(dates)
+    if market:
+        expr &= ds.field('market') == market
+    expr &= ds.field('fetched_at') <= ds.field('commence_time')
+    keys = ['game_id', 'bookmaker', 'market', 'outcome', 'player']
+    columns = list(dict.fromkeys([*keys, 'commence_time', 'fetched_at', *columns]))
+    lines = scan('odds', expr, columns, root)
+    if lines.empty:
+        return lines
+    return (lines.sort_values('fetched_at')
+            .drop_duplicates(keys, keep='last')
+            .sort_values(['commence_time', 'game_id', 'market', 'bookmaker'])
+            .reset_index(drop=True))
+
+
+def backfill_from_db(conn, root: Optional[str] = None) -> Dict[str, int]:
+    """Copy the sqlite game logs (season by season) and odds history into the archive"""
+    counts = {'game_logs': 0, 'odds': 0}
+    seasons = [row[0] for row in conn.execute('SELECT DISTINCT season FROM player_game_logs').fetchall()]
+    for season in seasons:
+        logs = pd.read_sql_query('SELECT * FROM player_game_logs WHERE season = ?', conn, params=(season,))
+        counts['game_logs'] += archive_game_logs(logs, root=root)
+    for chunk in pd.read_sql_query('SELECT * FROM odds_snapshots', conn, chunksize=200_000):
+        counts['odds'] += archive_odds(chunk, root)
+    return counts
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and query the Parquet history archive")
+    parser.add_argument('--root', default=ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('backfill', help="copy sports.db game logs and odds snapshots into the archive")
+    commands.add_parser('compact', help="merge each partition's files into one sorted file")
+    games = commands.add_parser('games', help="one player's games")
+    games.add_argument('--player', type=int, required=True)
+    games.add_argument('--opponent')
+    games.add_argument('--since')
+    games.add_argument('--columns', nargs='+')
+    closing = commands.add_parser('closing', help="closing lines")
+    closing.add_argument('--sport', default='NBA')
+    closing.add_argument('--season')
+    closing.add_argument('--market')
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    if args.command == 'backfill':
+        import db
+        with db.connect() as conn:
+            result = backfill_from_db(conn, args.root)
+        print(', '.join(f"{name}: {count} rows" for name, count in result.items()))
+    elif args.command == 'compact':
+        print(', '.join(f"{name}: {compact(name, args.root)} partitions merged" for name in SCHEMAS))
+    else:
+        result = (player_games(args.player, args.opponent, args.since, columns=args.columns, root=args.root)
+                  if args.command == 'games' else
+                  closing_lines(args.sport, args.season, args.market, root=args.root))
+        print(result.to_string(index=False))
+        print(f"{len(result)} rows in {(datetime.now(timezone.utc) - started).total_seconds() * 1000:.1f} ms")
@@ -1,58 +1,131 @@
+import base64
 import hashlib
+import hmac
+import json
 import sqlite3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
 import os
+from contextlib import nullcontext
+from db import connect, transaction
+from saved_props import save_props
 
-def hash_password(password: str) -> str:
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '100000'))
+LEGACY_ITERATIONS = 100000  # 'salt:key' hashes written before iterations were stored
+SESSION_TTL = timedelta(hours=12)
+
+# pbkdf2_hmac releases the GIL, so a pool sized to the cores hashes logins in parallel
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix='pbkdf2')
+
+# Without a configured secret, tokens are only valid for this process
+_jwt_secret = (os.getenv('JWT_SECRET') or os.urandom(32).hex()).encode('utf-8')
+
+def _derive(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+def _parse_hash(stored_hash: str):
+    """(iterations, salt, key) from either 'pbkdf2_sha256$iter$salt$key' or legacy 'salt:key'"""
+    if stored_hash.startswith('pbkdf2_sha256$'):
+        _, iterations, salt_str, key_str = stored_hash.split('$')
+        return int(iterations), bytes.fromhex(salt_str), bytes.fromhex(key_str)
+    salt_str, key_str = stored_hash.split(':')
+    return LEGACY_ITERATIONS, bytes.fromhex(salt_str), bytes.fromhex(key_str)
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
     salt = os.urandom(32)
-    key = hashlib.pbkdf2_hmac(
-        'sha256',
-        password.encode('utf-8'),
-        salt,
-        100000
-    )
-    return salt.hex() + ':' + key.hex()
+    key = _derive(password, salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${key.hex()}"
 
 def verify_password(password: str, stored_hash: str) -> bool:
     try:
-        salt_str, key_str = stored_hash.split(':')
-        salt = bytes.fromhex(salt_str)
-        stored_key = bytes.fromhex(key_str)
-        new_key = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt,
-            100000
-        )
-        return stored_key == new_key
-    except:
+        iterations, salt, stored_key = _parse_hash(stored_hash)
+        return hmac.compare_digest(stored_key, _derive(password, salt, iterations))
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+def needs_rehash(stored_hash: str) -> bool:
+    try:
+        return _parse_hash(stored_hash)[0] != PBKDF2_ITERATIONS or not stored_hash.startswith('pbkdf2_sha256$')
+    except (ValueError, AttributeError):
         return False
 
+def hash_password_async(password: str) -> Future:
+    return _hash_pool.submit(hash_password, password)
+
+def verify_password_async(password: str, stored_hash: str) -> Future:
+    return _hash_pool.submit(verify_password, password, stored_hash)
+
 def create_user(conn, username: str, password: str) -> bool:
     try:
-        c = conn.cursor()
-        hashed = hash_password(password)
-        c.execute('INSERT INTO users (username, password) VALUES (?, ?)',
-                 (username, hashed))
-        conn.commit()
+        hashed = hash_password_async(password).result()
+        with transaction(conn) as conn:
+            conn.execute('INSERT INTO users (username, password) VALUES (?, ?)',
+                         (username, hashed))
         return True
     except sqlite3.IntegrityError:
         return False
 
 def get_user(conn, username: str, password: str):
-    c = conn.cursor()
-    c.execute('SELECT id, password FROM users WHERE username = ?', (username,))
-    result = c.fetchone()
-    if result and verify_password(password, result[1]):
+    with connect() if conn is None else nullcontext(conn) as conn:
+        result = conn.execute('SELECT id, password FROM users WHERE username = ?',
+                              (username,)).fetchone()
+        if not result or not verify_password_async(password, result[1]).result():
+            return None
+        if needs_rehash(result[1]):
+            # The plaintext is only available at login, so upgrade old hashes here
+            with transaction(conn):
+                conn.execute('UPDATE users SET password = ? WHERE id = ?',
+                             (hash_password_async(password).result(), result[0]))
         return result[0]
-    return None
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def issue_session_token(user_id: int, username: str = '', ttl: timedelta = SESSION_TTL) -> str:
+    """Signed HS256 JWT carrying the user id and an expiry"""
+    now = int(time.time())
+    header = _b64encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+    payload = _b64encode(json.dumps({
+        'sub': str(user_id),
+        'name': username,
+        'iat': now,
+        'exp': now + int(ttl.total_seconds())
+    }, separators=(',', ':')).encode())
+    signature = hmac.new(_jwt_secret, f"{header}.{payload}".encode('ascii'), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64encode(signature)}"
+
+def verify_session_token(token: Optional[str]) -> Optional[dict]:
+    """Claims of a valid, unexpired token; None otherwise. No key derivation involved"""
+    if not token:
+        return None
+    try:
+        header, payload, signature = token.split('.')
+        expected = hmac.new(_jwt_secret, f"{header}.{payload}".encode('ascii'), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+        if claims.get('exp', 0) < time.time():
+            return None
+        return claims
+    except (ValueError, TypeError):
+        return None
+
+def login(conn, username: str, password: str) -> Optional[str]:
+    """Session token for valid credentials, None otherwise"""
+    user_id = get_user(conn, username, password)
+    if user_id is None:
+        return None
+    return issue_session_token(user_id, username)
 
 def save_user_prop(conn, user_id: int, prop_data: dict) -> bool:
     try:
-        c = conn.cursor()
-        c.execute('INSERT INTO saved_props (user_id, prop_data) VALUES (?, ?)',
-                 (user_id, str(prop_data)))
-        conn.commit()
+        with connect() if conn is None else nullcontext(conn) as conn:
+            save_props(conn, user_id, [prop_data])
         return True
-    except:
+    except (sqlite3.Error, KeyError, TypeError, ValueError):
         return False
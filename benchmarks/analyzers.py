@@ -0,0 +1,227 @@
+"""Throughput, latency and peak memory of the screening analyzers at slate scale.
+
+Drives each analyzer with synthetic_data payloads across a grid of game and
+book counts, appends the results to history.jsonl and compares them with
+analyzers_baseline.json:
+
+    python benchmarks/analyzers.py                          # default grid, check the baseline
+    python benchmarks/analyzers.py --games 10 100 --books 5  # a smaller grid
+    python benchmarks/analyzers.py --update                 # rewrite the baseline from this run
+
+Cases whose linear projection from the previous game count exceeds
+--max-seconds are recorded as skipped with that projection, so the slowest
+analyzers show up as a cliff instead of hanging the run.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_data import generate_odds, generate_roster, generate_player_game_log  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analyzers_baseline.json')
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+GAMES = (10, 100, 1000, 10000)
+BOOKS = (5, 20, 50)
+MAX_CELLS = 50_000    # games x books; the middles output alone passes 2 GB beyond this
+TOLERANCE = 1.5       # p50 may grow this much over the baseline before it counts as a regression
+MIN_SLACK_MS = 5.0    # keeps sub-millisecond cases from failing on timer noise
+
+
+def bench_ev(games, n_games):
+    from betting_analysis import find_high_ev_opportunities
+    return lambda: find_high_ev_opportunities(games, min_ev=0.0)
+
+
+def bench_arbitrage(games, n_games):
+    from data_utils import identify_arbitrage_opportunities
+    return lambda: identify_arbitrage_opportunities(games)
+
+
+def bench_middles(games, n_games):
+    from betting_analysis import find_enhanced_middles
+    return lambda: find_enhanced_middles(games)
+
+
+def bench_normalize(games, n_games):
+    from utils import normalize_odds
+    return lambda: normalize_odds(games)
+
+
+def bench_best_lines(games, n_games):
+    from best_lines import BestLineIndex
+    return lambda: BestLineIndex.from_games(games)
+
+
+def bench_props(games, n_games):
+    from betting_analysis import screen_player_props
+    from prop_odds import PROP_CATEGORIES
+
+    # Two rosters per game, as the Props page screens both sides of every matchup
+    rosters = {f"Team {i:05d}": generate_roster(f"Team {i:05d}", size=8) for i in range(2 * n_games)}
+    logs = {}
+
+    def fetch_logs(player_id, last_n_games):
+        if player_id not in logs:
+            logs[player_id] = generate_player_game_log(player_id, last_n_games)
+        return logs[player_id]
+
+    for players in rosters.values():  # log generation is the fake upstream, not the analyzer
+        for player in players:
+            fetch_logs(player['id'], 10)
+    return lambda: screen_player_props(rosters, PROP_CATEGORIES, list(PROP_CATEGORIES), min_win_rate=0,
+                                       fetch_logs=fetch_logs)
+
+
+def bench_chart(games, n_games):
+    from betting_analysis import create_comparison_chart
+    import altair  # noqa: F401  import cost is not chart cost
+
+    # Chart cost scales with history length, not books: one game log row per game
+    stats1 = generate_player_game_log('1000100', n_games)
+    stats2 = generate_player_game_log('1000201', n_games)
+    return lambda: create_comparison_chart(stats1, stats2, 'Player One', 'Player Two', 'points').to_dict()
+
+
+def bench_chart_cached(games, n_games):
+    from charts import comparison_spec
+
+    # A rerun with the same players, window and log versions, as when a metric is toggled back
+    stats1 = generate_player_game_log('1000100', n_games)
+    stats2 = generate_player_game_log('1000201', n_games)
+    key = ('1000100', '1000201', n_games, 1, 1)
+    comparison_spec(key, stats1, stats2, 'Player One', 'Player Two', 'points')
+    return lambda: comparison_spec(key, stats1, stats2, 'Player One', 'Player Two', 'points')
+
+
+# name -> (setup, whether the case depends on the book count)
+ANALYZERS = {
+    'ev': (bench_ev, True),
+    'arbitrage': (bench_arbitrage, True),
+    'middles': (bench_middles, True),
+    'normalize': (bench_normalize, True),
+    'best_lines': (bench_best_lines, True),
+    'props': (bench_props, False),
+    'chart': (bench_chart, False),
+    'chart_cached': (bench_chart_cached, False)
+}
+
+
+def measure(run, repeat: int, max_seconds: float) -> dict:
+    """Latency samples (stopping early past max_seconds) and the peak traced allocation of one run"""
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+        if sum(samples) > max_seconds:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'p50_ms': statistics.median(samples) * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))] * 1000,
+        'max_ms': samples[-1] * 1000,
+        'peak_mb': peak / 2 ** 20
+    }
+
+
+def run(analyzers, game_counts, book_counts, repeat: int = 5, max_seconds: float = 20.0,
+        max_cells: int = MAX_CELLS) -> dict:
+    results = {}
+    per_game_ms = {}  # (analyzer, books) -> p50 per game at the last size measured
+    for n_books in book_counts:
+        for n_games in game_counts:
+            if n_games * n_books > max_cells:
+                print(f"{'*':<12} games={n_games:<6} books={n_books:<3} skipped (> {max_cells} cells)")
+                continue
+            games = None
+            for name in analyzers:
+                setup, uses_books = ANALYZERS[name]
+                if not uses_books and n_books != book_counts[0]:
+                    continue
+                key = f"{name}:g{n_games}:b{n_books if uses_books else 0}"
+                projected_ms = per_game_ms.get((name, n_books), 0.0) * n_games
+                if projected_ms / 1000 > max_seconds:
+                    results[key] = {'skipped': True, 'projected_ms': projected_ms}
+                    print(f"{name:<12} games={n_games:<6} books={n_books:<3} skipped "
+                          f"(projected {projected_ms / 1000:.0f}s > {max_seconds:.0f}s)")
+                    continue
+                if games is None:
+                    games = generate_odds('NBA', n_games, n_books, seed=1)
+                try:
+                    result = measure(setup(games, n_games), repeat, max_seconds)
+                except Exception as e:
+                    # A size the analyzer can't handle at all is a result too
+                    results[key] = {'error': f"{type(e).__name__}: {str(e).splitlines()[0]}"}
+                    print(f"{name:<12} games={n_games:<6} books={n_books:<3} failed: {results[key]['error']}")
+                    continue
+                result['games_per_s'] = n_games / (result['p50_ms'] / 1000) if result['p50_ms'] else None
+                results[key] = result
+                per_game_ms[(name, n_books)] = result['p50_ms'] / n_games
+                print(f"{name:<12} games={n_games:<6} books={n_books:<3} p50 {result['p50_ms']:10.1f} ms"
+                      f"   p95 {result['p95_ms']:10.1f} ms   peak {result['peak_mb']:8.1f} MB"
+                      f"   {result['games_per_s'] or 0:10.0f} games/s")
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Cases whose p50 regressed past TOLERANCE (and MIN_SLACK_MS) of the baseline"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or 'p50_ms' not in result or 'p50_ms' not in base:
+            continue
+        limit = max(base['p50_ms'] * TOLERANCE, base['p50_ms'] + MIN_SLACK_MS)
+        if result['p50_ms'] > limit:
+            regressions.append((key, base['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--analyzers', nargs='+', choices=list(ANALYZERS), default=list(ANALYZERS))
+    parser.add_argument('--games', nargs='+', type=int, default=list(GAMES))
+    parser.add_argument('--books', nargs='+', type=int, default=list(BOOKS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=20.0, help="per-case time limit")
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS, help="largest games x books payload")
+    parser.add_argument('--update', action='store_true', help="write the baseline from this run")
+    args = parser.parse_args()
+
+    results = run(args.analyzers, sorted(args.games), sorted(args.books), args.repeat,
+                  args.max_seconds, args.max_cells)
+    with open(HISTORY_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'suite': 'analyzers', 'timestamp': time.time(), 'results': results}) + '\n')
+
+    baseline = json.load(open(BASELINE_PATH, encoding='utf-8')) if os.path.exists(BASELINE_PATH) else {}
+    if args.update:
+        baseline.update({key: {k: round(v, 3) if isinstance(v, float) else v for k, v in result.items()}
+                         for key, result in results.items()})
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write('\n')
+
+    regressions = compare(results, baseline)
+    for key, before, after in regressions:
+        print(f"REGRESSION {key}: p50 {before:.1f} ms -> {after:.1f} ms")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Import-time budget for main.py.
+
+Times, in fresh interpreters, the imports main.py runs at module level (cold
+start) and the extra imports each page pulls in on first render, then checks
+them against startup_budget.json. Page imports are traced at runtime: each page
+is rendered once with Streamlit's AppTest on synthetic data, so imports hidden
+in helpers and loaders count, not only the ones written in the page branch.
+
+    python benchmarks/startup.py            # check against the budget
+    python benchmarks/startup.py --update   # rewrite the budget from this run
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+MAIN_PATH = os.path.join(ROOT, 'main.py')
+HEADROOM = 1.5
+MIN_SLACK_MS = 50  # keeps near-zero page budgets from failing on timer noise
+RENDER_TIMEOUT = 300
+
+# Renders one page after the startup imports and prints every module the render loaded
+TRACE_CODE = """
+import json, os, sys
+os.environ['SYNTHETIC_DATA'] = '1'
+{startup}
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+app = AppTest.{source}
+app.session_state['page'] = {page!r}
+app.run(timeout={timeout})
+for error in app.exception:
+    print(f"{{error.message}}", file=sys.stderr)
+print(json.dumps([name for name in sys.modules if name not in before]))
+"""
+
+
+def collect_imports(path: str = MAIN_PATH) -> dict:
+    """Import statements main.py runs at startup and inside each page branch"""
+    tree = ast.parse(open(path, encoding='utf-8').read())
+    groups = {'startup': []}
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            groups['startup'].append(ast.unparse(node))
+        elif isinstance(node, ast.If):
+            branch = node
+            while isinstance(branch, ast.If):
+                test = branch.test
+                if (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+                        and test.left.id == 'page' and isinstance(test.comparators[0], ast.Constant)):
+                    groups[test.comparators[0].value] = [
+                        ast.unparse(inner) for inner in ast.walk(ast.Module(body=branch.body, type_ignores=[]))
+                        if isinstance(inner, (ast.Import, ast.ImportFrom))
+                    ]
+                branch = branch.orelse[0] if len(branch.orelse) == 1 else None
+    return groups
+
+
+def time_imports(statements: list, preload: list = (), repeat: int = 3) -> float:
+    """Median milliseconds to run the statements in a fresh interpreter"""
+    code = '\n'.join([
+        'import time',
+        *preload,
+        '_start = time.perf_counter()',
+        *statements,
+        'print((time.perf_counter() - _start) * 1000)'
+    ])
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def trace_page(startup: list, page: Optional[str]) -> List[str]:
+    """Modules first imported while rendering a page; page=None renders an empty script"""
+    source = f"from_file({MAIN_PATH!r})" if page else "from_string('import streamlit as st')"
+    code = TRACE_CODE.format(startup='\n'.join(startup), source=source, page=page, timeout=RENDER_TIMEOUT)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    for line in result.stderr.splitlines():
+        if line and not line.startswith(' '):
+            print(f"page:{page}: {line}", file=sys.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_statements(modules: List[str]) -> List[str]:
+    # Some entries in sys.modules (vendored aliases, virtual submodules) cannot be imported by name
+    return [f"for _name in {modules!r}:",
+            "    try:",
+            "        __import__(_name)",
+            "    except ImportError:",
+            "        pass"]
+
+
+def run(repeat: int = 3) -> dict:
+    groups = collect_imports()
+    startup = groups.pop('startup')
+    timings = {'startup': time_imports(startup, repeat=repeat)}
+    # AppTest's own runtime loads modules a real server already has; they are not the page's
+    runtime = set(trace_page(startup, None))
+    for page in groups:
+        modules = [name for name in trace_page(startup, page) if name not in runtime]
+        timings[f"page:{page}"] = time_imports(import_statements(modules), preload=startup,
+                                               repeat=repeat) if modules else 0.0
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--update', action='store_true', help="write the budget from this run")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    timings = run(args.repeat)
+    with open(HISTORY_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'suite': 'startup', 'timestamp': time.time(), 'results': timings}) + '\n')
+
+    if args.update:
+        budget = {name: round(max(ms * HEADROOM, ms + MIN_SLACK_MS)) for name, ms in timings.items()}
+        with open(BUDGET_PATH, 'w', encoding='utf-8') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+
+    budget = json.load(open(BUDGET_PATH, encoding='utf-8')) if os.path.exists(BUDGET_PATH) else {}
+    failed = False
+    for name, ms in timings.items():
+        limit = budget.get(name)
+        status = 'ok' if limit is None or ms <= limit else 'OVER'
+        failed |= status == 'OVER'
+        print(f"{name:<24} {ms:8.1f} ms   budget {limit if limit is not None else '-':>6}   {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
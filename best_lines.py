@@ -0,0 +1,140 @@
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from utils import iter_odds, outcome_label, american_to_decimal
+
+TOP_K = 3
+
+
+def _point_key(point) -> Optional[float]:
+    if point is None or (isinstance(point, float) and math.isnan(point)):
+        return None
+    return float(point)
+
+
+class BestLineIndex:
+    """Top prices per (game, market, outcome, point) across bookmakers
+
+    Every line keeps a max-heap of (decimal price, book). Updates push the new
+    price and leave the superseded entry behind; stale entries are skipped when
+    they surface and the heap is rebuilt once they outnumber live ones. The
+    current best is cached per line so reads are a single dict lookup. A full
+    snapshot also retires every price it no longer quotes.
+    """
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self._prices: Dict[Tuple, Dict[str, float]] = {}
+        self._heaps: Dict[Tuple, List] = {}
+        self._best: Dict[Tuple, Tuple[float, str]] = {}
+        self._lines: Dict[Tuple[str, str], Set[Tuple]] = {}
+        self.updated_at = -math.inf
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_games(cls, games: list, k: int = TOP_K) -> 'BestLineIndex':
+        index = cls(k)
+        index.update_from_games(games)
+        return index
+
+    def update_from_games(self, games: list, timestamp: Optional[float] = None, complete: bool = True) -> int:
+        """Apply a snapshot; returns how many prices changed or were retired
+
+        With complete=True games is the whole slate, so books, markets and games
+        it no longer quotes are dropped; otherwise only the games it carries are
+        reconciled. A snapshot already consumed (same or older timestamp) is a no-op.
+        """
+        changed = 0
+        quoted: Set[Tuple] = set()
+        with self._lock:
+            if timestamp is not None:
+                if timestamp <= self.updated_at:
+                    return 0
+                self.updated_at = timestamp
+            for (game_id, _, _, _, _, book, market, outcome, player, point, price, _) in iter_odds(games):
+                outcome = outcome_label(outcome, player)
+                quoted.add((game_id, market, outcome, _point_key(point), book))
+                changed += self.update(game_id, market, outcome, point, book, price)
+
+            games_quoted = None if complete else {key[0] for key in quoted}
+            retired = [(*key, book) for key, prices in self._prices.items()
+                       if games_quoted is None or key[0] in games_quoted
+                       for book in prices if (*key, book) not in quoted]
+            for game_id, market, outcome, point, book in retired:
+                self.remove(game_id, market, outcome, point, book)
+        return changed + len(retired)
+
+    def update(self, game_id: str, market: str, outcome: str, point, book: str, price: float) -> bool:
+        key = (game_id, market, outcome, _point_key(point))
+        with self._lock:
+            prices = self._prices.setdefault(key, {})
+            if prices.get(book) == price:
+                return False
+            prices[book] = price
+            heap = self._heaps.setdefault(key, [])
+            heapq.heappush(heap, (-american_to_decimal(price), book, price))
+            self._lines.setdefault((game_id, market), set()).add(key[2:])
+            self._refresh(key)
+            return True
+
+    def remove(self, game_id: str, market: str, outcome: str, point, book: str):
+        """Drop a book's price, e.g. when the market is pulled"""
+        key = (game_id, market, outcome, _point_key(point))
+        with self._lock:
+            prices = self._prices.get(key)
+            if prices is None or prices.pop(book, None) is None:
+                return
+            if prices:
+                self._refresh(key)
+                return
+            # Last book gone: forget the line so lines() never lists an outcome with no price
+            del self._prices[key], self._heaps[key]
+            self._best.pop(key, None)
+            lines = self._lines.get((game_id, market))
+            if lines is not None:
+                lines.discard(key[2:])
+                if not lines:
+                    del self._lines[(game_id, market)]
+
+    def _refresh(self, key: Tuple):
+        heap, prices = self._heaps[key], self._prices[key]
+        while heap and prices.get(heap[0][1]) != heap[0][2]:
+            heapq.heappop(heap)
+        if len(heap) > 2 * len(prices) + self.k:
+            heap[:] = [(-american_to_decimal(p), b, p) for b, p in prices.items()]
+            heapq.heapify(heap)
+        if heap:
+            self._best[key] = (heap[0][2], heap[0][1])
+        else:
+            self._best.pop(key, None)
+
+    def best(self, game_id: str, market: str, outcome: str, point=None) -> Optional[Tuple[float, str]]:
+        """(American price, bookmaker) of the best available line"""
+        return self._best.get((game_id, market, outcome, _point_key(point)))
+
+    def best_price(self, game_id: str, market: str, outcome: str, point=None) -> Optional[float]:
+        best = self.best(game_id, market, outcome, point)
+        return best[0] if best else None
+
+    def top(self, game_id: str, market: str, outcome: str, point=None, k: Optional[int] = None) -> List[Tuple[float, str]]:
+        """Best k (price, book) pairs, best first"""
+        key = (game_id, market, outcome, _point_key(point))
+        with self._lock:
+            heap, prices = self._heaps.get(key, []), self._prices.get(key, {})
+            result, seen = [], set()
+            # Walk the heap in order through a frontier of child indices: O(k log k)
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier and len(result) < (k or self.k):
+                (_, book, price), i = heapq.heappop(frontier)
+                if prices.get(book) == price and book not in seen:
+                    seen.add(book)
+                    result.append((price, book))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+            return result
+
+    def lines(self, game_id: str, market: str) -> List[Tuple[str, Optional[float]]]:
+        """(outcome, point) pairs the index holds for one game market"""
+        return sorted(self._lines.get((game_id, market), ()), key=lambda line: (line[0], line[1] or 0))
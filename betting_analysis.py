@@ -1,10 +1,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import altair as alt
-from utils import calculate_ev, calculate_implied_probability
-from sklearn.linear_model import LinearRegression
-import numpy as np
+from utils import calculate_ev, outcome_label
+from defense_data import join_defense_vs_position
+from best_lines import BestLineIndex
+from fair_lines import FairLineEngine, american_odds, fair_lines
+from metrics import get_logger
+
+log = get_logger(__name__)
 
 def analyze_player_performance(stats_df: pd.DataFrame | dict, metric: str) -> dict:
     """Analyze player performance from either DataFrame or dictionary stats"""
@@ -36,7 +39,7 @@ def analyze_player_performance(stats_df: pd.DataFrame | dict, metric: str) -> di
         }
         return analysis
     except Exception as e:
-        print(f"Error analyzing performance: {e}")
+        log.error("Error analyzing performance: %s", e)
         return {
             'recent_trend': 'unknown',
             'last_5_avg': 0,
@@ -47,155 +50,65 @@ def analyze_player_performance(stats_df: pd.DataFrame | dict, metric: str) -> di
             'momentum': 0
         }
 
-def find_high_ev_opportunities(odds_data: list, min_ev: float = 5.0) -> pd.DataFrame:
+EV_COLUMNS = ['game', 'bet_type', 'outcome', 'odds', 'bookmaker', 'ev', 'implied_prob', 'fair_prob',
+              'fair_odds', 'books', 'best_odds', 'best_book']
+
+def find_high_ev_opportunities(odds_data: list, min_ev: float = 5.0, index: BestLineIndex = None,
+                               engine: FairLineEngine = None) -> pd.DataFrame:
+    """Prices whose EV per $100 against the other books' no-vig consensus beats min_ev
+
+    Pass the FairLineEngine already fed with odds_data to skip re-de-vigging it.
+    """
     if not odds_data:
         return pd.DataFrame()
-        
-    opportunities = []
-    
+
     try:
-        for game in odds_data:
-            for book in game.get('bookmakers', []):
-                for market in book.get('markets', []):
-                    for outcome in market.get('outcomes', []):
-                        try:
-                            price = float(outcome.get('price', 0))
-                            implied_prob = calculate_implied_probability(price)
-                            ev = calculate_ev(price, implied_prob)
-                            
-                            if ev > min_ev:
-                                opportunities.append({
-                                    'game': f"{game['home_team']} vs {game['away_team']}",
-                                    'bet_type': market.get('key', 'unknown'),
-                                    'outcome': outcome.get('name', 'Unknown'),
-                                    'odds': price,
-                                    'bookmaker': book.get('title', 'Unknown'),
-                                    'ev': ev,
-                                    'implied_prob': implied_prob
-                                })
-                        except (ValueError, TypeError, KeyError) as e:
-                            print(f"Error processing outcome: {e}")
-                            continue
-                            
-        if not opportunities:
-            # Return empty DataFrame with defined columns
-            return pd.DataFrame(columns=[
-                'game', 'bet_type', 'outcome', 'odds', 
-                'bookmaker', 'ev', 'implied_prob'
-            ])
-            
-        df = pd.DataFrame(opportunities)
-        if 'ev' in df.columns:
-            return df.sort_values('ev', ascending=False)
-        return df
-        
+        index = index or BestLineIndex.from_games(odds_data)
+        table = engine.table if engine is not None else fair_lines(odds_data)
+        # Edges are against the consensus without the price's own book, so its vig can't inflate or hide them
+        hits = table[(table['ev'] > min_ev) & (table['books'] >= 2)]
+        if hits.empty:
+            return pd.DataFrame(columns=EV_COLUMNS)
+
+        points = [None if pd.isna(point) else point for point in hits['point']]
+        best = [index.best(game_id, market, outcome_label(outcome, player), point)
+                for game_id, market, outcome, player, point
+                in zip(hits['game_id'], hits['market'], hits['outcome'], hits['player'], points)]
+        df = pd.DataFrame({
+            'game': (hits['home_team'] + ' vs ' + hits['away_team']).to_numpy(),
+            'bet_type': hits['market'].to_numpy(),
+            'outcome': [outcome_label(outcome, player) for outcome, player in zip(hits['outcome'], hits['player'])],
+            'odds': hits['price'].to_numpy(),
+            'bookmaker': hits['bookmaker'].to_numpy(),
+            'ev': hits['ev'].to_numpy(),
+            'implied_prob': hits['implied'].round(3).to_numpy(),
+            'fair_prob': hits['others'].round(3).to_numpy(),
+            'fair_odds': american_odds(hits['others']),
+            'books': hits['books'].to_numpy(),
+            'best_odds': [b[0] if b else price for b, price in zip(best, hits['price'])],
+            'best_book': [b[1] if b else book for b, book in zip(best, hits['bookmaker'])]
+        })
+        return df.sort_values('ev', ascending=False)
+
     except Exception as e:
-        print(f"Error in find_high_ev_opportunities: {e}")
+        log.error("Error in find_high_ev_opportunities: %s", e)
         return pd.DataFrame()
 
 def create_comparison_chart(stats1: pd.DataFrame, stats2: pd.DataFrame, 
                           player1: str, player2: str, metric: str, 
                           add_trend: bool = True,
-                          prediction_days: int = 5) -> alt.Chart:
+                          prediction_days: int = 5) -> 'alt.Chart':
     """Create an interactive comparison chart with trend lines and predictions"""
-    
-    def add_predictions(df: pd.DataFrame, days: int) -> pd.DataFrame:
-        if len(df) < 3:  # Need at least 3 points for meaningful prediction
-            return df
-            
-        # Convert dates to numeric (days since first game)
-        df = df.copy()
-        df['days'] = (df['date'] - df['date'].min()).dt.total_seconds() / (24*60*60)
-        
-        # Fit linear regression
-        model = LinearRegression()
-        X = df['days'].values.reshape(-1, 1)
-        y = df[metric].values
-        model.fit(X, y)
-        
-        # Generate future dates and predictions
-        last_day = df['days'].max()
-        future_days = np.linspace(last_day + 1, last_day + days, days)
-        predictions = model.predict(future_days.reshape(-1, 1))
-        
-        # Create prediction DataFrame
-        pred_df = pd.DataFrame({
-            'date': pd.date_range(start=df['date'].max() + pd.Timedelta(days=1), periods=days),
-            'days': future_days,
-            metric: predictions,
-            'type': 'prediction'
-        })
-        
-        df['type'] = 'actual'
-        return pd.concat([df, pred_df])
-    
-    # Prepare data with predictions
-    df1 = add_predictions(stats1.copy(), prediction_days)
-    df2 = add_predictions(stats2.copy(), prediction_days)
-    df1['player'] = player1
-    df2['player'] = player2
-    
-    # Combine data
-    combined = pd.concat([df1, df2]).reset_index(drop=True)
-    
-    # Base chart
-    base = alt.Chart(combined).encode(
-        x=alt.X('date:T', title='Date',
-                axis=alt.Axis(format='%b %d', labelAngle=-45)),
-        color=alt.Color('player:N', legend=alt.Legend(title="Player"))
-    )
-    
-    # Actual data lines and points
-    actual_data = combined[combined['type'] == 'actual']
-    lines = base.mark_line(size=2).encode(
-        y=alt.Y(f'{metric}:Q', title=metric.title())
-    ).transform_filter(
-        alt.datum.type == 'actual'
-    )
-    
-    points = base.mark_circle(size=60).encode(
-        y=alt.Y(f'{metric}:Q'),
-        tooltip=['date:T', metric, 'player']
-    ).transform_filter(
-        alt.datum.type == 'actual'
-    )
-    
-    # Prediction lines
-    pred_data = combined[combined['type'] == 'prediction']
-    predictions = base.mark_line(
-        strokeDash=[6, 6],
-        stroke='red',
-        size=2
-    ).encode(
-        y=alt.Y(f'{metric}:Q')
-    ).transform_filter(
-        alt.datum.type == 'prediction'
-    )
-    
-    # Add trend lines if requested
-    if add_trend:
-        trend_lines = base.transform_regression(
-            'date', metric,
-            groupby=['player'],
-            method='linear'
-        ).mark_line(
-            size=3,
-            strokeDash=[5,5],
-            opacity=0.5
-        ).encode(
-            y=alt.Y(f'{metric}:Q')
-        ).transform_filter(
-            alt.datum.type == 'actual'
-        )
-        chart = (lines + points + trend_lines + predictions)
-    else:
-        chart = (lines + points + predictions)
-    
-    return chart.properties(
-        width=600,
-        height=300,
-        title=f"{metric.title()} Comparison - Last {len(stats1)} Games (with {prediction_days}-day prediction)"
-    ).interactive()
+    from charts import line_chart, series_frame  # Altair is imported there, only when a chart is drawn
+
+    # Only date and the metric go into the spec; fits happen here rather than in the browser
+    combined = pd.concat([
+        series_frame(stats1, metric, player1, trend=add_trend, prediction_days=prediction_days),
+        series_frame(stats2, metric, player2, trend=add_trend, prediction_days=prediction_days)
+    ], ignore_index=True)
+    return line_chart(combined, title=f"{metric.title()} Comparison - Last {len(stats1)} Games "
+                                      f"(with {prediction_days}-day prediction)",
+                      y_title=metric.title())
 
 def find_enhanced_middles(odds_data: list, min_middle: float = 1.0) -> list:
     middles = []
@@ -256,3 +169,126 @@ def find_enhanced_middles(odds_data: list, min_middle: float = 1.0) -> list:
                         })
     
     return middles
+
+def screen_player_props(rosters: dict, prop_categories: dict, prop_types: list,
+                        variations: list = ("Over", "Under"), prop_lines: dict = None,
+                        sport: str = 'NBA', positions: list = None, min_line: float = 0.5,
+                        min_ev: float = 0.0, min_win_rate: float = 50, hot_only: bool = False,
+                        fetch_logs=None, opponents: dict = None, fair: pd.DataFrame = None) -> list:
+    """Screen each rostered player's props against their recent game logs
+
+    rosters maps team name to player dicts; prop_lines is the posted-line summary
+    from prop_odds.summarize_props; opponents maps each team to the team it plays
+    (utils.slate_opponents); fair is a fair_lines table of the prop odds. EV
+    prices the posted odds at the books' no-vig consensus for that line; a side
+    with no posted price or no consensus keeps NaN Odds/EV and is not held to
+    min_ev. Rows match the Props page table and keep numbers as numbers (Win%
+    in percent); props_frame types them and adds the opponent's defense against
+    the player's position.
+    """
+    from prop_odds import PLAYER_MARKETS
+
+    if fetch_logs is None:
+        from team_data import fetch_player_game_log as fetch_logs
+    prop_lines = prop_lines or {}
+    opponents = opponents or {}
+    sport_markets = PLAYER_MARKETS.get(sport, {})
+    fair_probs = {}
+    if fair is not None and not fair.empty:
+        # Every book's row of an outcome carries the same consensus; take the player's next game
+        sides = (fair.sort_values('commence_time', kind='stable')
+                 .drop_duplicates(['player', 'market', 'outcome', 'point']))
+        fair_probs = dict(zip(zip(sides['player'], sides['market'], sides['outcome'], sides['point']),
+                              sides['consensus']))
+
+    all_props = []
+    for team, players in rosters.items():
+        for player in players:
+            if positions and player['position'] not in positions:
+                continue
+                
+            game_logs = fetch_logs(player['id'], 10)
+            
+            for prop_type in prop_types:
+                market = sport_markets.get(prop_type)
+                posted = prop_lines.get((player['name'], market))
+                # Screen the books' posted line when there is one, otherwise the category thresholds
+                lines = [posted['line']] if posted else prop_categories[prop_type]["thresholds"]
+                for threshold in lines:
+                    if threshold < min_line:
+                        continue
+                        
+                    for variation in variations:
+                        prop_key = prop_type.lower()
+                        
+                        # Calculate detailed metrics
+                        last_5_games = game_logs[prop_key].tail(5)
+                        last_10_games = game_logs[prop_key].tail(10)
+                        
+                        win_rate_5 = (
+                            (last_5_games > threshold if variation == "Over" else last_5_games < threshold)
+                            .mean() * 100
+                        )
+                        win_rate_10 = (
+                            (last_10_games > threshold if variation == "Over" else last_10_games < threshold)
+                            .mean() * 100
+                        )
+                        
+                        if hot_only and win_rate_5 < 80:
+                            continue
+                            
+                        if win_rate_5 < min_win_rate:
+                            continue
+                        
+                        # Posted price against the no-vig consensus at the same line
+                        odds = posted.get(f"{variation.lower()}_odds") if posted else None
+                        prob = fair_probs.get((player['name'], market, variation, threshold))
+                        if odds is None or pd.isna(odds) or prob is None or pd.isna(prob):
+                            odds, ev = np.nan, np.nan
+                        else:
+                            ev = calculate_ev(odds, prob)
+                            if ev < min_ev:
+                                continue
+                        
+                        all_props.append({
+                            "Player": player['name'],
+                            "Team": team,
+                            "Opponent": opponents.get(team),
+                            "Position": player['position'],
+                            "Prop": f"{variation} {threshold} {prop_type}",
+                            "Line": threshold,
+                            "Odds": float(odds),
+                            "L5 Avg": float(last_5_games.mean()),
+                            "L10 Avg": float(last_10_games.mean()),
+                            "Win% L5": float(win_rate_5),
+                            "Win% L10": float(win_rate_10),
+                            "EV": ev,
+                            "Trend": "🔥" if win_rate_5 >= 80 else ("📈" if win_rate_5 > win_rate_10 else "📉")
+                        })
+    return all_props
+
+
+PROP_DTYPES = {
+    "Player": object, "Team": 'category', "Opponent": 'category', "Position": 'category', "Prop": object,
+    "Line": 'float64', "Odds": 'float64', "L5 Avg": 'float64', "L10 Avg": 'float64',
+    "Win% L5": 'float64', "Win% L10": 'float64', "EV": 'float64', "Trend": 'category'
+}
+
+
+def props_frame(props: list, window: int = 10) -> pd.DataFrame:
+    """screen_player_props rows as a typed frame with the opponent's defense vs position attached"""
+    df = pd.DataFrame.from_records(props, columns=list(PROP_DTYPES)).astype(PROP_DTYPES)
+    # Prop reads "<side> <line> <stat>"; the DvP table is keyed by the stat
+    stats = df['Prop'].str.split(' ', n=2).str[2].fillna('')
+    return join_defense_vs_position(df.assign(Stat=stats), window=window).drop(columns='Stat')
+
+
+def prop_highlights(df: pd.DataFrame) -> pd.DataFrame:
+    """Cell styles for the Props table (Styler.apply with axis=None), one mask per column"""
+    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+    for col in ("Win% L5", "Win% L10"):
+        styles[col] = np.select([df[col] >= 80, df[col] >= 60],
+                                ['background-color: lightgreen', 'background-color: yellow'], '')
+    styles["EV"] = np.select([df["EV"] < 0, df["EV"] > 0],
+                             ['background-color: lightcoral', 'background-color: lightgreen'], '')
+    return styles
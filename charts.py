@@ -0,0 +1,139 @@
+"""Lean, cached chart specs for the player views.
+
+Each chart is built from a long frame holding only date, value, player and
+series, with long histories downsampled (largest-triangle-three-buckets) to
+MAX_POINTS per line and trend/prediction lines fitted here with np.polyfit,
+so the browser draws straight segments instead of running regressions. Built
+specs are kept in SPECS, an LRU keyed by whatever identifies the inputs, e.g.
+(player ids, metric, window, snapshot versions); Streamlit can draw a cached
+dict with st.vega_lite_chart without touching Altair again.
+"""
+import threading
+from typing import Callable, Dict, Hashable, Optional, Sequence
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+from metrics import cache_lookup
+
+MAX_POINTS = 400      # per line; keeps every spec far under Altair's 5000-row limit
+SPEC_CACHE_SIZE = 256
+CHART_WIDTH = 600
+CHART_HEIGHT = 300
+FRAME_COLUMNS = ['date', 'value', 'player', 'series']
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS) -> np.ndarray:
+    """Indices of at most max_points samples that keep the line's shape (LTTB); x must be sorted"""
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    # Buckets [edges[j], edges[j + 1]) between the fixed first and last points; the last bucket is [n - 1, n)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    counts = np.diff(np.append(edges, n))
+    mean_x, mean_y = np.add.reduceat(x, edges) / counts, np.add.reduceat(y, edges) / counts
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # The next bucket's average is the third corner of each candidate's triangle
+        ax, ay = x[keep[i]], y[keep[i]]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        keep[i + 1] = start + int(np.argmax(area))
+    return keep
+
+
+def _days(dates: pd.Series) -> np.ndarray:
+    return (dates - dates.min()).dt.total_seconds().to_numpy() / 86400
+
+
+def series_frame(stats: pd.DataFrame, metric: str, player: str, trend: bool = False,
+                 prediction_days: int = 0, max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """One player's metric as date/value/player/series rows: actual, plus fitted trend and prediction"""
+    df = stats[['date', metric]].dropna().sort_values('date')
+    if df.empty:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+    dates = pd.to_datetime(df['date'])
+    x, y = _days(dates), df[metric].to_numpy(dtype=float)
+    keep = downsample(x, y, max_points)
+    parts = [pd.DataFrame({'date': dates.to_numpy()[keep], 'value': y[keep], 'series': 'actual'})]
+
+    # A straight line only needs its ends; fit on the full history, not the downsampled one
+    if len(df) >= 3 and (trend or prediction_days):
+        slope, intercept = np.polyfit(x, y, 1)
+        start, last = dates.iloc[0], dates.iloc[-1]
+        if trend:
+            parts.append(pd.DataFrame({'date': [start, last], 'value': [intercept, intercept + slope * x[-1]],
+                                       'series': 'trend'}))
+        if prediction_days:
+            ahead = np.array([1, prediction_days], dtype=float)
+            parts.append(pd.DataFrame({'date': last + pd.to_timedelta(ahead, unit='D'),
+                                       'value': intercept + slope * (x[-1] + ahead), 'series': 'prediction'}))
+    frame = pd.concat(parts, ignore_index=True)
+    frame['player'] = player
+    return frame[FRAME_COLUMNS]
+
+
+def line_chart(frame: pd.DataFrame, title: str, y_title: str, color_title: str = 'Player',
+               points: bool = True):
+    """Layered Altair chart over a series_frame-shaped frame (color by 'player')"""
+    import altair as alt
+
+    # Data goes on the layer once; Altair hashes per-layer frames to merge them, which costs more than drawing
+    base = alt.Chart().encode(
+        x=alt.X('date:T', title='Date', axis=alt.Axis(format='%b %d', labelAngle=-45)),
+        y=alt.Y('value:Q', title=y_title),
+        color=alt.Color('player:N', legend=alt.Legend(title=color_title))
+    )
+    actual = base.transform_filter(alt.datum.series == 'actual')
+    layers = [actual.mark_line(size=2)]
+    if points:
+        layers.append(actual.mark_circle(size=60).encode(tooltip=['date:T', 'value:Q', 'player:N']))
+    if (frame['series'] == 'trend').any():
+        layers.append(base.transform_filter(alt.datum.series == 'trend')
+                      .mark_line(size=3, strokeDash=[5, 5], opacity=0.5))
+    if (frame['series'] == 'prediction').any():
+        layers.append(base.transform_filter(alt.datum.series == 'prediction')
+                      .mark_line(strokeDash=[6, 6], stroke='red', size=2))
+    return alt.layer(*layers, data=frame).properties(width=CHART_WIDTH, height=CHART_HEIGHT, title=title).interactive()
+
+
+def metrics_frame(stats: pd.DataFrame, metrics: Sequence[str], max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """Several metrics of one player as series_frame rows, with the metric name in 'player'"""
+    frames = [series_frame(stats, metric, metric, max_points=max_points) for metric in metrics if metric in stats]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FRAME_COLUMNS)
+
+
+class SpecCache:
+    """LRU of built Vega-Lite specs, so a rerun with the same inputs skips Altair entirely"""
+
+    def __init__(self, maxsize: int = SPEC_CACHE_SIZE):
+        self._specs = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], 'alt.TopLevelMixin']) -> Dict:
+        with self._lock:
+            spec = self._specs.get(key)
+        cache_lookup('charts', spec is not None)
+        if spec is None:
+            spec = build().to_dict()
+            with self._lock:
+                self._specs[key] = spec
+        return spec
+
+    def clear(self):
+        with self._lock:
+            self._specs.clear()
+
+
+SPECS = SpecCache()
+
+
+def comparison_spec(key: Optional[Hashable], stats1: pd.DataFrame, stats2: pd.DataFrame,
+                    player1: str, player2: str, metric: str, prediction_days: int = 5) -> Dict:
+    """Cached spec of create_comparison_chart; key should change whenever either log does"""
+    from betting_analysis import create_comparison_chart
+
+    build = lambda: create_comparison_chart(stats1, stats2, player1, player2, metric,
+                                            prediction_days=prediction_days)
+    return build().to_dict() if key is None else SPECS.get_or_build(('comparison', key, metric), build)
@@ -0,0 +1,227 @@
+"""Memory-compact odds and game-log representations.
+
+A slate as nested API dicts repeats every team, book and market name once per
+outcome and boxes every price in its own float object. OddsBuffer keeps the
+same rows as parallel numpy arrays of interned string codes and float32
+prices/points (exact for American odds and half-point lines), and converts
+back to the API dict shape or the normalized DataFrame only at the edges.
+Anything that reads odds through utils.iter_odds accepts a buffer in place of
+the raw game list.
+
+Names from a fixed vocabulary (sports, teams, books, markets, outcomes,
+players) share the process-wide STRINGS table. Game ids and timestamps change
+with every refresh, so each buffer interns those in its own table, which is
+freed with the buffer.
+"""
+from typing import Dict, Iterator, List, Optional
+import threading
+import numpy as np
+import pandas as pd
+from utils import ODDS_COLUMNS, iter_odds
+
+CATEGORY_MAX_RATIO = 0.5  # object columns with fewer distinct values than this share become categorical
+
+
+class Interner:
+    """Bidirectional string <-> small int table shared by every buffer that uses it"""
+    __slots__ = ('codes', 'values', '_lock')
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        self._lock = threading.Lock()
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            # Snapshot loaders and the refresh scheduler intern concurrently; one string, one code
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.values.append(value)
+                    self.codes[value] = code
+        return code
+
+    @property
+    def nbytes(self) -> int:
+        """Rough bytes held by the strings and the lookup table"""
+        return sum(len(value) + 49 for value in self.values) + 16 * len(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# Sport, team, book, market, outcome and player names are the same across refreshes
+STRINGS = Interner()
+
+
+class OddsRecord:
+    """One bookmaker outcome, without a per-row __dict__"""
+    __slots__ = tuple(ODDS_COLUMNS)
+
+    def __init__(self, *values):
+        for name, value in zip(ODDS_COLUMNS, values):
+            setattr(self, name, value)
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in ODDS_COLUMNS)
+
+    def __repr__(self) -> str:
+        return f"OddsRecord({', '.join(f'{n}={getattr(self, n)!r}' for n in ODDS_COLUMNS)})"
+
+
+class OddsBuffer:
+    """Struct-of-arrays odds snapshot: one array per column, strings stored as interned codes"""
+    __slots__ = ('strings', 'local', 'game_id', 'sport', 'commence_time', 'home_team', 'away_team',
+                 'game', 'bookmaker', 'market', 'outcome', 'player', 'point', 'price', 'last_update',
+                 'book_titles')
+
+    GAME_FIELDS = ('game_id', 'sport', 'commence_time', 'home_team', 'away_team')
+    ROW_FIELDS = ('bookmaker', 'market', 'outcome', 'player', 'last_update')
+    # Interned per buffer rather than in the shared table
+    LOCAL_FIELDS = ('game_id', 'commence_time', 'last_update')
+
+    def __init__(self, strings: Optional[Interner] = None):
+        self.strings = strings if strings is not None else STRINGS
+        self.local = Interner()
+        no_codes = np.empty(0, dtype=np.int32)
+        # Game table: one row per game
+        for name in self.GAME_FIELDS:
+            setattr(self, name, no_codes)
+        # Outcome rows: 'game' is the row number in the game table
+        self.game = no_codes
+        for name in self.ROW_FIELDS:
+            setattr(self, name, no_codes)
+        self.point = self.price = np.empty(0, dtype=np.float32)
+        self.book_titles: Dict[int, int] = {}
+
+    @classmethod
+    def from_games(cls, games: list, strings: Optional[Interner] = None) -> 'OddsBuffer':
+        buffer = cls(strings)
+        code, local = buffer.strings.code, buffer.local.code
+        game_rows: Dict[str, int] = {}
+        game_table, rows, values = [], [], []
+
+        for game in games:
+            game_id = str(game.get('id', ''))
+            if game_id not in game_rows:
+                game_rows[game_id] = len(game_table)
+                game_table.append((local(game_id), code(game.get('sport_key', '')),
+                                   local(game.get('commence_time', '')), code(game.get('home_team', '')),
+                                   code(game.get('away_team', ''))))
+            for book in game.get('bookmakers', []):
+                if book.get('title'):
+                    buffer.book_titles[code(book.get('key', ''))] = code(book['title'])
+
+        for (game_id, _, _, _, _, book, market, outcome, player, point, price, last_update) in iter_odds(games):
+            rows.append((game_rows[game_id], code(book), code(market), code(outcome),
+                         code(player), local(last_update)))
+            values.append((point, price))
+
+        table = np.array(game_table, dtype=np.int32).reshape(-1, len(cls.GAME_FIELDS))
+        for i, name in enumerate(cls.GAME_FIELDS):
+            setattr(buffer, name, np.ascontiguousarray(table[:, i]))
+        codes = np.array(rows, dtype=np.int32).reshape(-1, 1 + len(cls.ROW_FIELDS))
+        for i, name in enumerate(('game',) + cls.ROW_FIELDS):
+            setattr(buffer, name, np.ascontiguousarray(codes[:, i]))
+        values = np.array(values, dtype=np.float32).reshape(-1, 2)
+        buffer.point = np.ascontiguousarray(values[:, 0])
+        buffer.price = np.ascontiguousarray(values[:, 1])
+        # Snapshots are shared read-only between sessions
+        for name in cls.GAME_FIELDS + ('game',) + cls.ROW_FIELDS + ('point', 'price'):
+            getattr(buffer, name).flags.writeable = False
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays and this buffer's own strings (the shared table is not counted)"""
+        arrays = [getattr(self, name) for name in self.GAME_FIELDS + ('game',) + self.ROW_FIELDS]
+        return sum(a.nbytes for a in arrays) + self.point.nbytes + self.price.nbytes + self.local.nbytes
+
+    def _values(self, name: str) -> List[str]:
+        return (self.local if name in self.LOCAL_FIELDS else self.strings).values
+
+    def _decode(self, name: str) -> List[str]:
+        values = self._values(name)
+        return [values[c] for c in getattr(self, name).tolist()]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Same flat tuples as utils.iter_odds, in ODDS_COLUMNS order"""
+        values, updates = self.strings.values, self.local.values
+        game_table = list(zip(*(self._decode(name) for name in self.GAME_FIELDS)))
+        for game, book, market, outcome, player, last_update, point, price in zip(
+                self.game.tolist(), self.bookmaker.tolist(), self.market.tolist(), self.outcome.tolist(),
+                self.player.tolist(), self.last_update.tolist(), self.point.tolist(), self.price.tolist()):
+            yield (*game_table[game], values[book], values[market], values[outcome], values[player],
+                   point, price, updates[last_update])
+
+    def records(self) -> Iterator[OddsRecord]:
+        for row in self.iter_rows():
+            yield OddsRecord(*row)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Normalized odds table with categorical string columns and float32 numbers"""
+        shared, local = pd.Index(list(self.strings.values)), pd.Index(list(self.local.values))
+        columns = {}
+        for name in ODDS_COLUMNS:
+            if name in self.GAME_FIELDS:
+                codes = getattr(self, name)[self.game]
+            elif name in self.ROW_FIELDS:
+                codes = getattr(self, name)
+            else:
+                columns[name] = getattr(self, name)
+                continue
+            categories = local if name in self.LOCAL_FIELDS else shared
+            columns[name] = pd.Categorical.from_codes(codes, categories=categories).remove_unused_categories()
+        return pd.DataFrame(columns, columns=ODDS_COLUMNS)
+
+    def to_games(self) -> list:
+        """Rebuild the odds API game list (the UI-edge / JSON shape)"""
+        values, local = self.strings.values, self.local.values
+        games = []
+        for game_id, sport, commence_time, home, away in zip(*(getattr(self, n).tolist() for n in self.GAME_FIELDS)):
+            games.append({'id': local[game_id], 'sport_key': values[sport],
+                          'commence_time': local[commence_time], 'home_team': values[home],
+                          'away_team': values[away], 'bookmakers': []})
+
+        books: Dict[tuple, dict] = {}
+        markets: Dict[tuple, dict] = {}
+        for game, book, market, outcome, player, last_update, point, price in zip(
+                self.game.tolist(), self.bookmaker.tolist(), self.market.tolist(), self.outcome.tolist(),
+                self.player.tolist(), self.last_update.tolist(), self.point.tolist(), self.price.tolist()):
+            if (game, book) not in books:
+                books[(game, book)] = {'key': values[book],
+                                       'title': values[self.book_titles.get(book, book)],
+                                       'markets': []}
+                games[game]['bookmakers'].append(books[(game, book)])
+            if (game, book, market) not in markets:
+                markets[(game, book, market)] = {'key': values[market], 'last_update': local[last_update],
+                                                 'outcomes': []}
+                books[(game, book)]['markets'].append(markets[(game, book, market)])
+            entry = {'name': values[outcome], 'price': int(price) if price.is_integer() else price}
+            if values[player]:
+                entry['description'] = values[player]
+            if point == point:  # NaN means the market has no point
+                entry['point'] = point
+            markets[(game, book, market)]['outcomes'].append(entry)
+        return games
+
+
+def compact_frame(df: pd.DataFrame, max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """Repeated strings as categoricals, numbers downcast to the smallest dtype that holds them"""
+    compact = {}
+    for name, column in df.items():
+        is_text = column.dtype == object or pd.api.types.is_string_dtype(column)
+        if is_text and len(column) and column.nunique() <= max_ratio * len(column):
+            compact[name] = column.astype('category')
+        elif pd.api.types.is_integer_dtype(column):
+            compact[name] = pd.to_numeric(column, downcast='integer')
+        elif pd.api.types.is_float_dtype(column):
+            compact[name] = pd.to_numeric(column, downcast='float')
+        else:
+            compact[name] = column
+    return pd.DataFrame(compact, index=df.index)
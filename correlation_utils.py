@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from utils import american_to_decimal, calculate_implied_probability, calculate_ev
+
+STAT_COLUMNS = ['points', 'rebounds', 'assists']
+GAME_TOTAL = 'GAME_TOTAL'
+MIN_GAMES = 5
+DEFAULT_WINDOW = 20  # games per player; compute and every lookup share it
+
+
+def _to_american(decimal_odds: float) -> float:
+    if decimal_odds >= 2:
+        return round((decimal_odds - 1) * 100)
+    return round(-100 / (decimal_odds - 1))
+
+
+def game_key(game_logs: pd.DataFrame) -> pd.Series:
+    """Identifier of the game each log row belongs to
+
+    Uses 'game_id' when the logs carry it; otherwise the date plus both teams,
+    so two unrelated games on the same night are never treated as one.
+    """
+    if 'game_id' in game_logs and game_logs['game_id'].notna().all():
+        return game_logs['game_id'].astype(str)
+    date = pd.to_datetime(game_logs['date']).dt.strftime('%Y-%m-%d')
+    if 'team' in game_logs and 'opponent' in game_logs:
+        team, opponent = game_logs['team'].astype(str), game_logs['opponent'].astype(str)
+        first = team.where(team < opponent, opponent)
+        second = opponent.where(team < opponent, team)
+        return date + '|' + first + '|' + second
+    return date
+
+
+def build_stat_matrix(game_logs: pd.DataFrame, stats: Iterable[str] = STAT_COLUMNS,
+                      window: Optional[int] = None,
+                      game_totals: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Pivot long game logs (player, date, stats...) into a game x (player, stat) matrix
+
+    game_totals, if given, is indexed by the same game keys as game_key().
+    """
+    stats = [s for s in stats if s in game_logs.columns]
+    logs = game_logs.sort_values('date')
+    if window:
+        logs = logs.groupby('player', sort=False).tail(window)
+
+    logs = logs.assign(game=game_key(logs))
+    matrix = logs.pivot_table(index='game', columns='player', values=stats, aggfunc='mean')
+    # pivot_table puts the stat on the outer level; correlations are looked up by (player, stat)
+    matrix.columns = matrix.columns.swaplevel(0, 1)
+    matrix = matrix.sort_index(axis=1)
+
+    if game_totals is not None:
+        totals = game_totals.reindex(matrix.index)
+        matrix[(GAME_TOTAL, 'points')] = totals.values
+    return matrix
+
+
+def pairwise_correlations(matrix: pd.DataFrame, min_games: int = MIN_GAMES) -> pd.DataFrame:
+    """Pearson correlation of every column pair over the games both columns have values for"""
+    values = matrix.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    mask = present.astype(float)
+
+    # All sums are restricted to rows where both columns are present
+    n = mask.T @ mask
+    sum_x = filled.T @ mask
+    sum_xx = (filled ** 2).T @ mask
+    sum_xy = filled.T @ filled
+    sum_y = sum_x.T
+    sum_yy = sum_xx.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sum_xy - sum_x * sum_y
+        var = (n * sum_xx - sum_x ** 2) * (n * sum_yy - sum_y ** 2)
+        corr = cov / np.sqrt(var)
+    corr[(n < min_games) | ~np.isfinite(corr)] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    corr = np.clip(corr, -1.0, 1.0)
+    return pd.DataFrame(corr, index=matrix.columns, columns=matrix.columns)
+
+
+def _nearest_correlation(corr: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues so the leg correlation matrix is usable as a copula"""
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    if eigvals.min() > 1e-8:
+        return corr
+    fixed = eigvecs @ np.diag(np.clip(eigvals, 1e-8, None)) @ eigvecs.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+class CorrelationService:
+    """Pairwise stat-line correlations cached per player pair and season window"""
+
+    def __init__(self, min_games: int = MIN_GAMES):
+        self.min_games = min_games
+        self._matrices: Dict[Tuple, pd.DataFrame] = {}
+        self._pairs: Dict[Tuple, Dict[Tuple, float]] = {}
+
+    def compute(self, game_logs: pd.DataFrame, season: str = 'current',
+                window: Optional[int] = DEFAULT_WINDOW,
+                game_totals: Optional[pd.Series] = None) -> pd.DataFrame:
+        """Compute and cache the correlation matrix for one season window"""
+        matrix = build_stat_matrix(game_logs, window=window, game_totals=game_totals)
+        corr = pairwise_correlations(matrix, self.min_games)
+        self._store(corr, season, window)
+        return corr
+
+    def precompute_slate(self, rosters: Dict[str, List[Dict]], season: str = 'current',
+                         window: Optional[int] = DEFAULT_WINDOW,
+                         game_totals: Optional[pd.Series] = None,
+                         fetch_logs: Optional[Callable] = None) -> pd.DataFrame:
+        """Fetch logs for every rostered player on the slate and cache their matrix
+
+        rosters maps team name to player dicts, as screen_player_props takes them.
+        """
+        if fetch_logs is None:
+            from team_data import fetch_player_game_log as fetch_logs
+
+        frames = []
+        for team, players in rosters.items():
+            for player in players:
+                logs = fetch_logs(player['id'], window or 82)
+                if logs.empty:
+                    continue
+                frames.append(logs.assign(player=player['name'], team=team))
+        if not frames:
+            return pd.DataFrame()
+        return self.compute(pd.concat(frames, ignore_index=True), season, window, game_totals)
+
+    def _store(self, corr: pd.DataFrame, season: str, window: Optional[int]):
+        # Flatten into a dict so single pair lookups never touch pandas indexing; a recompute
+        # replaces the window's pairs wholesale, so players no longer in it drop out
+        labels = list(corr.columns)
+        values = corr.to_numpy()
+        pairs = {(a, b): values[i, j] for i, a in enumerate(labels) for j, b in enumerate(labels)}
+        self._matrices[(season, window)] = corr
+        self._pairs[(season, window)] = pairs
+
+    def get_matrix(self, season: str = 'current',
+                   window: Optional[int] = DEFAULT_WINDOW) -> Optional[pd.DataFrame]:
+        return self._matrices.get((season, window))
+
+    def get_correlation(self, leg_a: Tuple[str, str], leg_b: Tuple[str, str],
+                        season: str = 'current', window: Optional[int] = DEFAULT_WINDOW) -> float:
+        """Correlation between two (player, stat) lines, 0 if unknown"""
+        if leg_a == leg_b:
+            return 1.0
+        value = self._pairs.get((season, window), {}).get((leg_a, leg_b), np.nan)
+        return 0.0 if np.isnan(value) else float(value)
+
+    def parlay_probability(self, legs: List[Dict], season: str = 'current',
+                           window: Optional[int] = DEFAULT_WINDOW) -> float:
+        """Joint hit probability of the legs under a Gaussian copula
+
+        Each leg is a dict with 'player', 'stat', 'side' ('Over'/'Under') and either
+        'prob' or American 'odds'.
+        """
+        from scipy.stats import norm, multivariate_normal  # ~1s to import; only needed to price a parlay
+
+        probs = np.array([leg.get('prob') or calculate_implied_probability(leg['odds'])
+                          for leg in legs], dtype=float)
+        if len(legs) == 1:
+            return float(probs[0])
+
+        signs = np.array([1.0 if leg.get('side', 'Over') == 'Over' else -1.0 for leg in legs])
+        keys = [(leg['player'], leg['stat']) for leg in legs]
+        corr = np.array([[self.get_correlation(a, b, season, window) for b in keys] for a in keys])
+        corr = _nearest_correlation(corr * np.outer(signs, signs))
+
+        thresholds = norm.ppf(np.clip(probs, 1e-6, 1 - 1e-6))
+        joint = multivariate_normal(mean=np.zeros(len(legs)), cov=corr).cdf(thresholds)
+        return float(np.clip(joint, 0.0, 1.0))
+
+    def price_parlay(self, legs: List[Dict], bet_amount: float = 100,
+                     season: str = 'current', window: Optional[int] = DEFAULT_WINDOW) -> Dict:
+        """Price a same-game parlay against the product of the book's leg odds"""
+        decimal = float(np.prod([american_to_decimal(leg['odds']) for leg in legs]))
+        parlay_odds = _to_american(decimal)
+        independent = float(np.prod([leg.get('prob') or calculate_implied_probability(leg['odds'])
+                                     for leg in legs]))
+        correlated = self.parlay_probability(legs, season, window)
+        return {
+            'parlay_odds': parlay_odds,
+            'independent_prob': round(independent, 4),
+            'correlated_prob': round(correlated, 4),
+            'fair_odds': _to_american(1 / correlated) if 0 < correlated < 1 else None,
+            'ev': calculate_ev(parlay_odds, correlated, bet_amount)
+        }
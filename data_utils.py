@@ -1,58 +1,84 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from defense_data import get_defense_vs_position
+from best_lines import BestLineIndex
+from utils import american_to_decimal
+from synthetic_data import seeded_rng, generate_trending_props
 
-def fetch_historical_data(player_name, prop_type, num_games=10):
-    # Mock historical data - replace with actual API call
-    dates = pd.date_range(end=datetime.now(), periods=num_games).tolist()
-    mock_data = []
-    for date in dates:
-        mock_data.append({
-            'date': date,
-            'player': player_name,
-            'prop_type': prop_type,
-            'value': np.random.normal(20, 5),  # Mock statistics
-            'opponent': f"Team {np.random.randint(1, 30)}",
-            'result': np.random.choice(['Over', 'Under'])
-        })
-    return pd.DataFrame(mock_data)
-
-def calculate_opponent_rank(team_name):
-    # Mock opponent rankings - replace with actual data
-    rankings = {f"Team {i}": i for i in range(1, 31)}
-    return rankings.get(team_name, 15)
-
-def identify_arbitrage_opportunities(odds_data):
+def fetch_historical_data(player_name, prop_type, num_games=10, seed=None):
+    # Mock historical data - replace with actual API call; seeded per player and prop
+    rng = seeded_rng(seed, 'history', player_name, prop_type)
+    return pd.DataFrame({
+        'date': pd.date_range(end=datetime.now().date(), periods=num_games),
+        'player': player_name,
+        'prop_type': prop_type,
+        'value': rng.normal(20, 5, num_games),  # Mock statistics
+        'opponent': np.char.add('Team ', rng.integers(1, 30, num_games).astype(str)),
+        'result': rng.choice(['Over', 'Under'], num_games)
+    })
+
+def calculate_opponent_rank(team_name, position='G', stat='points', window=10):
+    """Rank (1 = stingiest) of a defense against a position, from the stored DvP table"""
+    entry = get_defense_vs_position(team_name, position, stat, window)
+    return entry['rank'] if entry else 15
+
+def identify_arbitrage_opportunities(odds_data, index=None):
+    """Two-way markets where the best prices across books imply less than 100%"""
+    index = index or BestLineIndex.from_games(odds_data)
     opportunities = []
     for game in odds_data:
-        if len(game.get('bookmakers', [])) > 1:
-            best_odds = {'home': -1000, 'away': -1000}
-            for book in game['bookmakers']:
-                for outcome in book.get('markets', [{}])[0].get('outcomes', []):
-                    if outcome['price'] > best_odds[outcome['name'].lower()]:
-                        best_odds[outcome['name'].lower()] = outcome['price']
-            
-            # Check for arbitrage
-            if best_odds['home'] > 0 and best_odds['away'] > 0:
-                prob_sum = (100/best_odds['home'] + 100/best_odds['away'])
+        if len(game.get('bookmakers', [])) < 2:
+            continue
+        game_id = str(game.get('id', ''))
+        for market in ('h2h', 'spreads', 'totals'):
+            for side_a, side_b in _opposing_lines(index.lines(game_id, market), market):
+                best_a, best_b = index.best(game_id, market, *side_a), index.best(game_id, market, *side_b)
+                if best_a is None or best_b is None:
+                    continue  # retired by a concurrent snapshot
+                (price_a, book_a), (price_b, book_b) = best_a, best_b
+                prob_sum = 1 / american_to_decimal(price_a) + 1 / american_to_decimal(price_b)
                 if prob_sum < 1:
                     opportunities.append({
                         'game': f"{game['home_team']} vs {game['away_team']}",
-                        'best_home': best_odds['home'],
-                        'best_away': best_odds['away'],
+                        'market': market,
+                        'side1': _line_label(side_a, market),
+                        'side2': _line_label(side_b, market),
+                        'best1': price_a,
+                        'book1': book_a,
+                        'best2': price_b,
+                        'book2': book_b,
                         'profit': (1 - prob_sum) * 100
                     })
     return opportunities
 
-def get_trending_props():
-    # Mock trending props data
-    return [{
-        'player': 'Player A',
-        'prop': 'Points',
-        'line': 20.5,
-        'trend': 'Up',
-        'last_5': [18, 22, 25, 21, 24]
-    }]
+def _opposing_lines(lines, market):
+    """Pair each line with the outcome that covers the other side of it
+
+    Only pairs that cover every result count: a moneyline with a draw has three
+    outcomes, and two of them alone are not an arbitrage.
+    """
+    if market == 'h2h' and len({outcome for outcome, _ in lines}) != 2:
+        return []
+    pairs = []
+    for i, (outcome_a, point_a) in enumerate(lines):
+        for outcome_b, point_b in lines[i + 1:]:
+            if outcome_a == outcome_b:
+                continue
+            if market == 'h2h' or (market == 'spreads' and point_a == -point_b) or \
+                    (market == 'totals' and point_a == point_b):
+                pairs.append(((outcome_a, point_a), (outcome_b, point_b)))
+    return pairs
+
+def _line_label(line, market):
+    outcome, point = line
+    if point is None:
+        return outcome
+    return f"{outcome} {point:+g}" if market == 'spreads' else f"{outcome} {point:g}"
+
+def get_trending_props(n_props=10, seed=None):
+    # Mock trending props data from the synthetic rosters and game logs
+    return generate_trending_props(n_props, seed)
 
 def format_ev_display(ev_value):
     color = 'green' if ev_value > 0 else 'red'
@@ -0,0 +1,256 @@
+import math
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DB_PATH = os.getenv('SPORTS_DB_PATH', 'sports.db')
+POOL_SIZE = int(os.getenv('SPORTS_DB_POOL_SIZE', '8'))
+# Price history kept in odds_snapshots; archive it first (python archive.py backfill) to keep more
+ODDS_RETENTION_DAYS = float(os.getenv('ODDS_RETENTION_DAYS', '14'))
+
+# WAL lets readers run alongside the single writer; busy_timeout makes writers
+# queue briefly instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+    'temp_store': 'MEMORY',
+    'cache_size': -32000,       # KiB
+    'mmap_size': 256 * 1024 * 1024
+}
+
+_engine = None
+_async_engine = None
+_engine_lock = threading.RLock()
+# Last stored (point, price) per (sport, game_id, bookmaker, market, outcome, player)
+_stored_prices: Dict[Tuple, Tuple] = {}
+_stored_lock = threading.Lock()
+_last_pruned = -math.inf
+PRUNE_INTERVAL = 86400
+_INSERT_ODDS = 'INSERT INTO odds_snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+_PRUNE_ODDS = 'DELETE FROM odds_snapshots WHERE fetched_at < ?'
+
+
+def _apply_pragmas(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def _create_users_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def _create_odds_snapshots_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS odds_snapshots (
+        fetched_at REAL NOT NULL,
+        game_id TEXT NOT NULL,
+        sport TEXT,
+        commence_time TEXT,
+        home_team TEXT,
+        away_team TEXT,
+        bookmaker TEXT NOT NULL,
+        market TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        player TEXT,
+        point REAL,
+        price REAL NOT NULL,
+        last_update TEXT
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_odds_snapshots_game '
+                 'ON odds_snapshots (game_id, market, fetched_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_odds_snapshots_sport_time '
+                 'ON odds_snapshots (sport, fetched_at)')
+
+
+def _create_saved_props_table(conn):
+    from saved_props import init_saved_props_table
+    init_saved_props_table(conn)
+
+
+def _create_game_log_tables(conn):
+    from defense_data import init_defense_tables
+    init_defense_tables(conn)
+
+
+def _index_odds_snapshots_time(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_odds_snapshots_time ON odds_snapshots (fetched_at)')
+
+
+# Append only: each step runs once, tracked with PRAGMA user_version
+MIGRATIONS = [
+    _create_users_table,
+    _create_saved_props_table,
+    _create_odds_snapshots_table,
+    _create_game_log_tables,
+    _index_odds_snapshots_time,
+]
+
+
+def migrate(conn) -> int:
+    """Bring the schema up to date; returns the resulting schema version"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            step(conn)
+            conn.execute(f'PRAGMA user_version={number}')
+    return len(MIGRATIONS)
+
+
+def get_engine(db_path: str = DB_PATH):
+    """Process-wide pooled engine; the schema is migrated on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from sqlalchemy import create_engine, event
+
+            engine = create_engine(
+                f'sqlite:///{db_path}',
+                pool_size=POOL_SIZE,
+                max_overflow=POOL_SIZE * 2,
+                pool_pre_ping=True,
+                connect_args={'check_same_thread': False, 'timeout': 30}
+            )
+            event.listen(engine, 'connect', _apply_pragmas)
+            fairy = engine.raw_connection()
+            try:
+                migrate(fairy.driver_connection)
+            finally:
+                fairy.close()
+            _engine = engine
+        return _engine
+
+
+@contextmanager
+def connect():
+    """Borrow a pooled sqlite3 connection; it goes back to the pool on exit"""
+    fairy = get_engine().raw_connection()
+    try:
+        yield fairy.driver_connection
+    finally:
+        fairy.close()
+
+
+@contextmanager
+def transaction(conn=None):
+    """Commit on success, roll back on error; borrows a connection if none is given"""
+    if conn is not None:
+        with conn:
+            yield conn
+        return
+    with connect() as conn:
+        with conn:
+            yield conn
+
+
+def get_async_engine(db_path: str = DB_PATH):
+    """aiosqlite engine sized, pragma'd and migrated like the sync one"""
+    global _async_engine
+    with _engine_lock:
+        if _async_engine is None:
+            from sqlalchemy import event
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            get_engine(db_path)  # migrations run once on the sync engine
+            engine = create_async_engine(
+                f'sqlite+aiosqlite:///{db_path}',
+                pool_size=POOL_SIZE,
+                max_overflow=POOL_SIZE * 2,
+                pool_pre_ping=True,
+                connect_args={'timeout': 30}
+            )
+            event.listen(engine.sync_engine, 'connect', _apply_pragmas)
+            _async_engine = engine
+        return _async_engine
+
+
+@asynccontextmanager
+async def async_connect():
+    """Borrow a pooled async connection inside a transaction"""
+    async with get_async_engine().begin() as conn:
+        yield conn
+
+
+async def fetch_all(sql: str, params: Optional[dict] = None) -> List[tuple]:
+    from sqlalchemy import text
+
+    async with async_connect() as conn:
+        result = await conn.execute(text(sql), params or {})
+        return [tuple(row) for row in result.fetchall()]
+
+
+async def execute_many(sql: str, rows: Iterable[dict]) -> None:
+    from sqlalchemy import text
+
+    rows = list(rows)
+    if not rows:
+        return
+    async with async_connect() as conn:
+        await conn.execute(text(sql), rows)
+
+
+def _changed_odds(games: list, fetched_at: float) -> Tuple[list, Dict, bool]:
+    """Rows whose line or price moved since the last save, the snapshot's quotes and whether to prune"""
+    global _last_pruned
+    from utils import iter_odds
+
+    rows, quotes = [], {}
+    for row in iter_odds(games):
+        game_id, sport, _, _, _, book, market, outcome, player, point, price, _ = row
+        key = (sport, game_id, book, market, outcome, player)
+        quotes[key] = (None if point != point else point, price)
+        rows.append((key, (fetched_at, *row)))
+    with _stored_lock:
+        prune = fetched_at - _last_pruned >= PRUNE_INTERVAL
+        if prune:
+            _last_pruned = fetched_at
+            _stored_prices.clear()  # other sports rewrite their slates on their next save
+        changed = [row for key, row in rows if _stored_prices.get(key) != quotes[key]]
+    return changed, quotes, prune
+
+
+def _remember_odds(quotes: Dict):
+    with _stored_lock:
+        # The snapshot is a sport's whole slate: its lines become the baseline, dropped ones are forgotten
+        sports = {key[0] for key in quotes}
+        for key in [key for key in _stored_prices if key[0] in sports and key not in quotes]:
+            del _stored_prices[key]
+        _stored_prices.update(quotes)
+
+
+def save_odds_snapshot(conn, games: list, fetched_at: float, retention_days: float = ODDS_RETENTION_DAYS) -> int:
+    """Append the outcomes whose line or price changed since the last save; returns rows written
+
+    Unchanged prices are not repeated, so a line's history is its first quote
+    plus every move. Once a day rows fetched more than retention_days earlier
+    are deleted and every live line is written again, so none loses its
+    current price to the cutoff.
+    """
+    changed, quotes, prune = _changed_odds(games, fetched_at)
+    with conn:
+        if prune:
+            conn.execute(_PRUNE_ODDS, (fetched_at - retention_days * 86400,))
+        conn.executemany(_INSERT_ODDS, changed)
+    _remember_odds(quotes)
+    return len(changed)
+
+
+async def save_odds_snapshot_async(games: list, fetched_at: float,
+                                   retention_days: float = ODDS_RETENTION_DAYS) -> int:
+    """save_odds_snapshot over the async engine, for callers already on an event loop"""
+    changed, quotes, prune = _changed_odds(games, fetched_at)
+    async with async_connect() as conn:
+        if prune:
+            await conn.exec_driver_sql(_PRUNE_ODDS, (fetched_at - retention_days * 86400,))
+        if changed:
+            await conn.exec_driver_sql(_INSERT_ODDS, changed)
+    _remember_odds(quotes)
+    return len(changed)
@@ -0,0 +1,222 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional
+from db import connect, transaction
+from compact import compact_frame
+from metrics import get_logger, upstream
+from transport import configure_nba_api
+from utils import season_for, use_synthetic_data
+
+DVP_WINDOWS = (5, 10, 0)  # 0 = full season
+DVP_STATS = {
+    'points': 'PTS',
+    'rebounds': 'REB',
+    'assists': 'AST',
+    'threes_made': 'FG3M',
+    'blocks': 'BLK',
+    'steals': 'STL'
+}
+
+_dvp_cache: Dict[str, Dict] = {}
+log = get_logger(__name__)
+
+
+def init_defense_tables(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS player_game_logs (
+        player_id INTEGER NOT NULL,
+        game_id TEXT NOT NULL,
+        game_date TEXT NOT NULL,
+        season TEXT NOT NULL,
+        team TEXT NOT NULL,
+        opponent TEXT NOT NULL,
+        position TEXT,
+        pts REAL, reb REAL, ast REAL, fg3m REAL, blk REAL, stl REAL,
+        PRIMARY KEY (player_id, game_id)
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_logs_season_date ON player_game_logs (season, game_date)')
+    c.execute('''CREATE TABLE IF NOT EXISTS defense_vs_position (
+        team TEXT NOT NULL,
+        position TEXT NOT NULL,
+        stat TEXT NOT NULL,
+        window INTEGER NOT NULL,
+        allowed REAL NOT NULL,
+        games INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (team, position, stat, window)
+    )''')
+
+
+def primary_position(position: str) -> str:
+    """Collapse roster positions like 'F-C' or 'Guard' to G/F/C"""
+    if not position or position == 'N/A':
+        return 'N/A'
+    return position.strip().split('-')[0][:1].upper()
+
+
+def current_season() -> str:
+    return season_for(datetime.now())
+
+
+def fetch_bulk_game_logs(season: Optional[str] = None, date_from: Optional[str] = None) -> pd.DataFrame:
+    """Fetch every player box score of a season (default: the current one) in one league-wide call"""
+    season = season or current_season()
+    if use_synthetic_data():
+        from synthetic_data import generate_game_logs
+        logs = generate_game_logs(season=season)
+        return logs[logs['game_date'] >= date_from] if date_from else logs
+    try:
+        from nba_api.stats.endpoints import leaguegamelog, playerindex
+        from nba_api.stats.static import teams
+        configure_nba_api()
+
+        params = {'season': season, 'player_or_team_abbreviation': 'P'}
+        if date_from:
+            params['date_from_nullable'] = datetime.strptime(date_from, '%Y-%m-%d').strftime('%m/%d/%Y')
+        with upstream('nba_stats', 'leaguegamelog'):
+            logs = leaguegamelog.LeagueGameLog(**params).get_data_frames()[0]
+        if logs.empty:
+            return pd.DataFrame()
+
+        with upstream('nba_stats', 'playerindex'):
+            index = playerindex.PlayerIndex(season=season).get_data_frames()[0]
+        positions = index.set_index('PERSON_ID')['POSITION'].map(primary_position)
+        team_names = {t['abbreviation']: t['full_name'] for t in teams.get_teams()}
+
+        return pd.DataFrame({
+            'player_id': logs['PLAYER_ID'].astype(int),
+            'game_id': logs['GAME_ID'].astype(str),
+            'game_date': pd.to_datetime(logs['GAME_DATE']).dt.strftime('%Y-%m-%d'),
+            'season': season,
+            'team': logs['TEAM_ABBREVIATION'].map(team_names),
+            'opponent': logs['MATCHUP'].str.split(' ').str[-1].map(team_names),
+            'position': logs['PLAYER_ID'].map(positions).fillna('N/A'),
+            'pts': logs['PTS'], 'reb': logs['REB'], 'ast': logs['AST'],
+            'fg3m': logs['FG3M'], 'blk': logs['BLK'], 'stl': logs['STL']
+        })
+
+    except Exception as e:
+        log.error("Error fetching league game logs: %s", e)
+        return pd.DataFrame()
+
+
+def build_defense_vs_position(logs: pd.DataFrame, windows=DVP_WINDOWS) -> pd.DataFrame:
+    """Average stats allowed per game by each team to each position over rolling windows"""
+    if logs.empty:
+        return pd.DataFrame()
+
+    stat_columns = [col.lower() for col in DVP_STATS.values()]
+    # One row per (defense, game, position) with the totals that position scored against it
+    per_game = (logs.groupby(['opponent', 'game_id', 'game_date', 'position'], sort=False, observed=True)[stat_columns]
+                .sum()
+                .reset_index()
+                .sort_values('game_date'))
+    team_games = (per_game[['opponent', 'game_id', 'game_date']].drop_duplicates()
+                  .sort_values('game_date'))
+    # Number games from most recent backwards so every window is a single comparison
+    team_games['recency'] = team_games.groupby('opponent', observed=True).cumcount(ascending=False)
+    per_game = per_game.merge(team_games[['opponent', 'game_id', 'recency']], on=['opponent', 'game_id'])
+
+    frames = []
+    for window in windows:
+        scoped = per_game if not window else per_game[per_game['recency'] < window]
+        games = scoped.groupby('opponent', observed=True)['game_id'].nunique()
+        allowed = scoped.groupby(['opponent', 'position'], observed=True)[stat_columns].sum()
+        allowed = allowed.div(games, level='opponent', axis=0)
+        long = (allowed.rename(columns={v.lower(): k for k, v in DVP_STATS.items()})
+                .stack()
+                .reset_index())
+        long.columns = ['team', 'position', 'stat', 'allowed']
+        long['games'] = long['team'].map(games).astype(int)
+        long['window'] = window
+        frames.append(long)
+
+    table = pd.concat(frames, ignore_index=True)
+    # Rank 1 = fewest allowed, matching the old calculate_opponent_rank scale
+    table['rank'] = (table.groupby(['position', 'stat', 'window'], observed=True)['allowed']
+                     .rank(method='min')
+                     .astype(int))
+    table['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    return table[['team', 'position', 'stat', 'window', 'allowed', 'games', 'rank', 'updated_at']]
+
+
+def refresh_defense_vs_position(conn, season: Optional[str] = None) -> int:
+    """Pull game logs since the last stored date and rebuild the defense table"""
+    season = season or current_season()
+    last_date = conn.execute('SELECT MAX(game_date) FROM player_game_logs WHERE season = ?',
+                             (season,)).fetchone()[0]
+
+    new_logs = fetch_bulk_game_logs(season, date_from=last_date)
+    new_logs = new_logs.dropna(subset=['team', 'opponent']) if not new_logs.empty else new_logs
+    with transaction(conn):
+        if not new_logs.empty:
+            conn.executemany(
+                'INSERT OR REPLACE INTO player_game_logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                new_logs.itertuples(index=False, name=None)
+            )
+
+        # A full season is ~25k rows of repeated team/position/date strings
+        logs = compact_frame(pd.read_sql_query('SELECT * FROM player_game_logs WHERE season = ?',
+                                               conn, params=(season,)))
+        table = build_defense_vs_position(logs)
+        if not new_logs.empty:
+            archive_season_logs(logs)
+        if not table.empty:
+            conn.execute('DELETE FROM defense_vs_position')
+            conn.executemany('INSERT INTO defense_vs_position VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             table.itertuples(index=False, name=None))
+    _dvp_cache.clear()
+    return len(new_logs)
+
+
+def archive_season_logs(logs: pd.DataFrame) -> None:
+    """Mirror the season into the Parquet archive; the sqlite table stays the source of truth"""
+    try:
+        from archive import archive_game_logs
+        archive_game_logs(logs)
+    except Exception as e:
+        log.warning("Could not archive game logs: %s", e)
+
+
+def load_defense_vs_position() -> Dict:
+    """Load the stored table once into a dict keyed by (team, position, stat, window)"""
+    if 'table' not in _dvp_cache:
+        try:
+            with connect() as conn:
+                rows = conn.execute('SELECT team, position, stat, window, allowed, games, rank '
+                                    'FROM defense_vs_position').fetchall()
+            _dvp_cache['table'] = {
+                row[:4]: {'allowed': row[4], 'games': row[5], 'rank': row[6]} for row in rows
+            }
+        except sqlite3.Error as e:
+            log.error("Error loading defense vs position: %s", e)
+            return {}
+    return _dvp_cache['table']
+
+
+def get_defense_vs_position(team: str, position: str, stat: str = 'points', window: int = 10) -> Optional[Dict]:
+    return load_defense_vs_position().get((team, primary_position(position), stat, window))
+
+
+def join_defense_vs_position(df: pd.DataFrame, team_col: str = 'Opponent',
+                             position_col: str = 'Position', stat_col: str = 'Stat',
+                             window: int = 10) -> pd.DataFrame:
+    """Attach allowed/rank columns to a props or projections frame; NaN where there is no entry"""
+    table = load_defense_vs_position()
+    keys = zip(df[team_col], df[position_col].astype(str).map(primary_position), df[stat_col].str.lower(),
+               [window] * len(df))
+    found = [table.get(key, {}) for key in keys]
+    return df.assign(**{
+        'Opp Allowed': np.array([row.get('allowed', np.nan) for row in found], dtype='float64'),
+        'Opp Rank': np.array([row.get('rank', np.nan) for row in found], dtype='float64')
+    })
+
+
+if __name__ == '__main__':
+    # Nightly cron entry point: python defense_data.py
+    with connect() as conn:
+        added = refresh_defense_vs_position(conn)
+    print(f"Stored {added} new player game logs")
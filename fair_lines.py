@@ -0,0 +1,277 @@
+"""No-vig fair lines per book and a weighted consensus across books.
+
+Works on the normalized odds table (utils.ODDS_COLUMNS). A book's market is
+every outcome it prices for one (game, market, player, line); a spread's
+line is the home team's handicap so both sides land together. Each
+book-market's implied probabilities are de-vigged with one of:
+
+    multiplicative  p = q / sum(q)
+    additive        p = q - (sum(q) - 1) / n
+    power           p = q ** k, with k solved so the p sum to 1
+    shin            Shin's insider-trading model, solved for z per market
+
+all vectorized across every book-market at once. The consensus fair
+probability of an outcome is the BOOK_WEIGHTS-weighted mean over books,
+renormalized across the market's outcomes. Each price's edge is measured
+against the same consensus computed without its own book ('others'), so a
+book's vig never flatters or hides its own price: others * decimal price - 1.
+
+FairLineEngine keeps the table between snapshots and only re-de-vigs the
+book-markets whose prices moved, then re-averages just the markets they
+belong to.
+"""
+import math
+import os
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils import ODDS_COLUMNS, normalize_odds
+
+METHODS = ('multiplicative', 'additive', 'power', 'shin')
+DEFAULT_METHOD = os.getenv('DEVIG_METHOD', 'shin')
+MIN_EDGE = 0.02
+# Market-making books move first and hold the least vig; their prices count for more
+BOOK_WEIGHTS = {'pinnacle': 3.0, 'circasports': 2.0, 'betonlineag': 1.5, 'lowvig': 1.5}
+
+MARKET_KEY = ['game_id', 'market', 'player', 'line']
+BOOK_MARKET_KEY = ['game_id', 'bookmaker', 'market', 'player', 'line']
+OUTCOME_KEY = ['game_id', 'market', 'player', 'line', 'outcome', 'point']
+ROW_KEY = BOOK_MARKET_KEY + ['outcome', 'point']
+FAIR_COLUMNS = ODDS_COLUMNS + ['line', 'implied', 'overround', 'fair_prob', 'consensus', 'others', 'books',
+                               'fair_odds', 'edge', 'ev', 'value']
+
+
+def implied_probability(prices) -> np.ndarray:
+    """Implied probability of American prices, unrounded and vectorized"""
+    prices = np.asarray(prices, dtype=float)
+    size = np.abs(prices)
+    return np.where(prices > 0, 100 / (size + 100), size / (size + 100))
+
+
+def american_odds(prob) -> np.ndarray:
+    """Fair American price of a probability"""
+    prob = np.clip(np.asarray(prob, dtype=float), 1e-6, 1 - 1e-6)
+    return np.where(prob < 0.5, (1 - prob) / prob * 100, -prob / (1 - prob) * 100).round(0)
+
+
+def _group_sum(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    return np.bincount(groups, weights=values, minlength=n_groups)
+
+
+def devig(implied: np.ndarray, groups: np.ndarray, method: str = DEFAULT_METHOD, iterations: int = 50) -> np.ndarray:
+    """Fair probabilities from implied ones; groups are integer codes of each row's book-market"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown de-vig method {method!r}; expected one of {METHODS}")
+    q = np.clip(implied, 1e-9, 1 - 1e-9)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    total = _group_sum(q, groups, n_groups)
+    count = np.bincount(groups, minlength=n_groups).astype(float)
+
+    if method == 'multiplicative':
+        return q / total[groups]
+
+    if method == 'additive':
+        p = np.clip(q - ((total - 1) / count)[groups], 1e-9, None)
+        return p / _group_sum(p, groups, n_groups)[groups]
+
+    if method == 'power':
+        # Newton on sum(q^k) = 1 per market; k > 1 shrinks longshots more than favourites
+        log_q, k = np.log(q), np.ones(n_groups)
+        for _ in range(iterations):
+            qk = q ** k[groups]
+            f = _group_sum(qk, groups, n_groups) - 1
+            fp = _group_sum(qk * log_q, groups, n_groups)
+            step = np.divide(f, fp, out=np.zeros_like(f), where=fp != 0)
+            k -= step
+            if np.abs(step).max(initial=0) < 1e-12:
+                break
+        p = q ** k[groups]
+        return p / _group_sum(p, groups, n_groups)[groups]
+
+    # Shin: sum of p(z) falls as the insider share z rises, so bisect z per market
+    share = q ** 2 / total[groups]
+    low, high = np.zeros(n_groups), np.full(n_groups, 0.5)
+    for _ in range(iterations):
+        z = (low + high) / 2
+        zg = z[groups]
+        p = (np.sqrt(zg ** 2 + 4 * (1 - zg) * share) - zg) / (2 * (1 - zg))
+        over = _group_sum(p, groups, n_groups) > 1
+        low, high = np.where(over, z, low), np.where(over, high, z)
+    zg = ((low + high) / 2)[groups]
+    p = (np.sqrt(zg ** 2 + 4 * (1 - zg) * share) - zg) / (2 * (1 - zg))
+    return p / _group_sum(p, groups, n_groups)[groups]
+
+
+def prepare(odds: pd.DataFrame) -> pd.DataFrame:
+    """Odds rows with their market line and unrounded implied probability"""
+    df = odds[ODDS_COLUMNS].copy()
+    df['player'] = df['player'].fillna('')
+    point = df['point'].astype(float)
+    home = np.where(df['outcome'] == df['home_team'], point, -point)
+    df['line'] = np.where(df['market'] == 'spreads', home, point)
+    df['line'] = df['line'].fillna(0.0)
+    # A book listing the same quote twice keeps its latest; the pair would otherwise count as four outcomes
+    df = df.drop_duplicates(ROW_KEY, keep='last')
+    df['implied'] = implied_probability(df['price'])
+    return df
+
+
+def devig_frame(df: pd.DataFrame, method: str = DEFAULT_METHOD) -> pd.DataFrame:
+    """prepare()d rows with 'overround' and per-book 'fair_prob'; one-sided book-markets are dropped"""
+    groups = df.groupby(BOOK_MARKET_KEY, sort=False, dropna=False).ngroup().to_numpy()
+    counts = np.bincount(groups)
+    keep = counts[groups] >= 2
+    df, groups = df[keep].copy(), pd.factorize(groups[keep])[0]
+    df['overround'] = _group_sum(df['implied'].to_numpy(), groups, int(groups.max()) + 1 if len(groups) else 0)[groups]
+    df['fair_prob'] = devig(df['implied'].to_numpy(), groups, method) if len(df) else []
+    return df
+
+
+def consensus(df: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Each row's consensus probability, the same without the row's own book, and the books pricing its outcome
+
+    The consensus is the weighted mean of the books' fair probabilities,
+    renormalized so a market's outcomes sum to 1. The leave-one-out version is
+    NaN where no other book prices every outcome the row's book does.
+    """
+    weights = BOOK_WEIGHTS if weights is None else weights
+    w = df['bookmaker'].map(weights).fillna(1.0).to_numpy(dtype=float)
+    wp = w * df['fair_prob'].to_numpy()
+    market = df.groupby(MARKET_KEY, sort=False, dropna=False).ngroup().to_numpy()
+    # Outcomes and book-markets refine the market by one column each (a market's line fixes
+    # each outcome's point), so combining integer codes replaces further grouped passes
+    names, name_index = pd.factorize(df['outcome'])
+    books, book_index = pd.factorize(df['bookmaker'])
+    outcome = pd.factorize(market * len(name_index) + names)[0]
+    book_market = pd.factorize(market * len(book_index) + books)[0]
+    n_outcomes, n_markets = int(outcome.max()) + 1, int(market.max()) + 1
+    total_wp, total_w = _group_sum(wp, outcome, n_outcomes), _group_sum(w, outcome, n_outcomes)
+    raw = total_wp / total_w
+    market_of = np.zeros(n_outcomes, dtype=int)
+    market_of[outcome] = market
+    market_total = _group_sum(raw, market_of, n_markets)
+    mean = raw / market_total[market_of]
+
+    # Drop the row's own book from its outcome's mean, then renormalize the market
+    # with the book's other outcomes swapped the same way
+    rest_w = total_w[outcome] - w
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rest = np.where(rest_w > 0, (total_wp[outcome] - wp) / rest_w, np.nan)
+    shift = _group_sum(rest - raw[outcome], book_market, int(book_market.max()) + 1)
+    others = rest / (market_total[market] + shift[book_market])
+    # prepare() leaves one row per book and outcome, so rows per outcome are books
+    return mean[outcome], others, np.bincount(outcome)[outcome]
+
+
+def score(df: pd.DataFrame, weights: Optional[Dict[str, float]] = None, min_edge: float = MIN_EDGE) -> pd.DataFrame:
+    """Attach consensus, fair odds and each price's edge against the other books' consensus"""
+    df = df.copy()
+    df['consensus'], df['others'], df['books'] = consensus(df, weights)
+    df['fair_odds'] = american_odds(df['consensus'])
+    df['edge'] = df['others'].to_numpy() / df['implied'].to_numpy() - 1
+    df['ev'] = (df['edge'] * 100).round(2)  # per $100, as utils.calculate_ev
+    # One book can't confirm its own price
+    df['value'] = (df['edge'] >= min_edge) & (df['books'] >= 2)
+    return df[FAIR_COLUMNS]
+
+
+def fair_lines(odds, method: str = DEFAULT_METHOD, weights: Optional[Dict[str, float]] = None,
+               min_edge: float = MIN_EDGE) -> pd.DataFrame:
+    """One-shot fair lines for raw games, an OddsBuffer or a normalized odds frame"""
+    odds = odds if isinstance(odds, pd.DataFrame) else normalize_odds(odds)
+    df = devig_frame(prepare(odds), method)
+    return score(df, weights, min_edge) if len(df) else pd.DataFrame(columns=FAIR_COLUMNS)
+
+
+def _keys(df: pd.DataFrame, columns) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(df[columns]).unique()
+
+
+def _isin(df: pd.DataFrame, columns, keys: pd.MultiIndex) -> np.ndarray:
+    return pd.MultiIndex.from_frame(df[columns]).isin(keys)
+
+
+class FairLineEngine:
+    """Fair lines kept current across snapshots; only moved book-markets are recomputed"""
+
+    def __init__(self, method: str = DEFAULT_METHOD, weights: Optional[Dict[str, float]] = None,
+                 min_edge: float = MIN_EDGE):
+        if method not in METHODS:
+            raise ValueError(f"Unknown de-vig method {method!r}; expected one of {METHODS}")
+        self.method = method
+        self.weights = BOOK_WEIGHTS if weights is None else weights
+        self.min_edge = min_edge
+        self.table = pd.DataFrame(columns=FAIR_COLUMNS)
+        self.updated_at = -math.inf
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_games(cls, games, **kwargs) -> 'FairLineEngine':
+        engine = cls(**kwargs)
+        engine.update_from_games(games)
+        return engine
+
+    def update_from_games(self, games, timestamp: Optional[float] = None, complete: bool = True) -> pd.DataFrame:
+        """Apply a snapshot; one already consumed (same or older timestamp) is a no-op"""
+        if timestamp is not None:
+            with self._lock:
+                if timestamp <= self.updated_at:
+                    return self.table.iloc[:0]
+                self.updated_at = timestamp
+        return self.update(games if isinstance(games, pd.DataFrame) else normalize_odds(games), complete)
+
+    def update(self, odds: pd.DataFrame, complete: bool = False) -> pd.DataFrame:
+        """Apply new prices; returns the re-scored rows of every market that changed
+
+        odds holds whole book-markets (every outcome a book prices for that
+        line). With complete=True it is the full snapshot, so book-markets it
+        no longer contains are dropped too.
+        """
+        incoming = prepare(odds)
+        with self._lock:
+            table = self.table
+            # Only games in the update can change; a partial update never scans the rest
+            scoped = np.ones(len(table), dtype=bool) if complete else \
+                table['game_id'].isin(incoming['game_id'].unique()).to_numpy()
+            current, outside = table[scoped], table[~scoped]
+            if current.empty:
+                moved, gone, kept = incoming, current, current
+            else:
+                # A complete snapshot also retires every book-market it no longer quotes
+                previous = current if complete else \
+                    current[_isin(current, BOOK_MARKET_KEY, _keys(incoming, BOOK_MARKET_KEY))]
+                rows = incoming[ROW_KEY + ['price']].merge(previous[ROW_KEY + ['price']], on=ROW_KEY, how='outer',
+                                                           suffixes=('', '_old'), indicator=True)
+                # A book-market moved if any outcome was added, dropped or repriced
+                moved_rows = rows[(rows['_merge'] != 'both') | (rows['price'] != rows['price_old'])]
+                groups = _keys(moved_rows, BOOK_MARKET_KEY)
+                moved = incoming[_isin(incoming, BOOK_MARKET_KEY, groups)]
+                stale = _isin(current, BOOK_MARKET_KEY, groups)
+                gone, kept = current[stale], current[~stale]
+            if moved.empty and gone.empty:
+                return table.iloc[:0]
+
+            fresh = devig_frame(moved, self.method)
+            # Every other book's rows in a touched market are re-averaged with the new ones
+            markets = _keys(moved, MARKET_KEY).union(_keys(gone, MARKET_KEY))
+            touched = _isin(kept, MARKET_KEY, markets)
+            affected = pd.concat([part for part in (kept[touched], fresh) if not part.empty], ignore_index=True)
+            rescored = score(affected, self.weights, self.min_edge) if not affected.empty else table.iloc[:0]
+            parts = [part for part in (outside, kept[~touched], rescored) if not part.empty]
+            self.table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=FAIR_COLUMNS)
+            return rescored
+
+    def value_bets(self, min_edge: Optional[float] = None) -> pd.DataFrame:
+        """Prices beating the consensus by at least min_edge, best edge first"""
+        table = self.table
+        edge = self.min_edge if min_edge is None else min_edge
+        return table[(table['edge'] >= edge) & (table['books'] >= 2)].sort_values('edge', ascending=False)
+
+    def fair_probability(self, game_id: str, market: str, outcome: str, point=None, player: str = '') -> Optional[float]:
+        """Consensus no-vig probability of one outcome, if at least one book prices both sides"""
+        table = self.table
+        same_point = table['point'].isna() if point is None else table['point'] == float(point)
+        rows = table[(table['game_id'] == game_id) & (table['market'] == market) & (table['outcome'] == outcome)
+                     & (table['player'] == player) & same_point]
+        return float(rows['consensus'].iloc[0]) if len(rows) else None
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
+from cachetools import TTLCache
+from metrics import cache_lookup, get_logger, upstream
+
+SYSTEM_PROMPT = "You are a sports betting analytics expert."
+INSIGHT_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+UNAVAILABLE = "AI insight unavailable"
+CACHE_SIZE = 256
+CACHE_TTL = 15 * 60  # seconds
+MAX_WORKERS = 4
+
+log = get_logger(__name__)
+
+
+def normalize_prompt(text: Optional[str]) -> str:
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+def insight_key(query: str, context: Optional[str] = None) -> str:
+    """Cache key for a question; whitespace and case differences collapse to one entry"""
+    raw = normalize_prompt(query) + '\x00' + normalize_prompt(context)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class InsightRequest:
+    """Handle on one model answer that fills in as tokens stream back"""
+
+    def __init__(self, key: str, text: Optional[str] = None):
+        self.key = key
+        self.chunks = [text] if text is not None else []
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+        self._changed = threading.Condition()
+        if text is not None:
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _append(self, chunk: str):
+        with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    def _finish(self, error: Optional[Exception] = None):
+        with self._changed:
+            self.error = error
+            self._done.set()
+            self._changed.notify_all()
+
+    def stream(self, timeout: float = 60) -> Iterator[str]:
+        """Yield chunks as they arrive; safe to call from several readers"""
+        sent = 0
+        while True:
+            with self._changed:
+                while sent == len(self.chunks) and not self.done:
+                    if not self._changed.wait(timeout):
+                        return
+                pending = self.chunks[sent:]
+                finished = self.done
+            for chunk in pending:
+                yield chunk
+            sent += len(pending)
+            if finished and sent == len(self.chunks):
+                if self.error is not None and not sent:
+                    yield UNAVAILABLE
+                return
+
+    def result(self, timeout: float = 60) -> str:
+        self._done.wait(timeout)
+        if self.error is not None or not self.chunks:
+            return UNAVAILABLE
+        return ''.join(self.chunks)
+
+
+class InsightService:
+    """Chat-model answers behind a TTL/LRU cache with in-flight de-duplication
+
+    The OpenAI client honours OPENAI_BASE_URL, so pointing it at a local
+    OpenAI-compatible stand-in is enough to run without the real API.
+    """
+
+    def __init__(self, client=None, model: str = INSIGHT_MODEL, max_tokens: int = 150,
+                 cache_size: int = CACHE_SIZE, ttl: float = CACHE_TTL, max_workers: int = MAX_WORKERS):
+        self.model = model
+        self.max_tokens = max_tokens
+        self._client = client
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._inflight: Dict[str, InsightRequest] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='insight')
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            from transport import http_client
+            self._client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=http_client())
+        return self._client
+
+    def submit(self, query: str, context: Optional[str] = None) -> InsightRequest:
+        """Return a cached answer, join an identical in-flight call, or start a new one"""
+        key = insight_key(query, context)
+        with self._lock:
+            cached = self._cache.get(key)
+            cache_lookup('insights', cached is not None)
+            if cached is not None:
+                return InsightRequest(key, cached)
+            request = self._inflight.get(key)
+            if request is None:
+                request = self._inflight[key] = InsightRequest(key)
+                self._pool.submit(self._run, request, query, context)
+            return request
+
+    def ask(self, query: str, context: Optional[str] = None, timeout: float = 60) -> str:
+        return self.submit(query, context).result(timeout)
+
+    def _run(self, request: InsightRequest, query: str, context: Optional[str]):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ]
+        if context:
+            messages.insert(1, {"role": "system", "content": context})
+
+        error = None
+        try:
+            with upstream('openai', 'chat.completions'):
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    stream=True
+                )
+                for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        request._append(event.choices[0].delta.content)
+        except Exception as e:
+            log.error("Error generating AI insight: %s", e)
+            error = e
+
+        with self._lock:
+            if error is None and request.chunks:
+                self._cache[request.key] = ''.join(request.chunks)
+            self._inflight.pop(request.key, None)
+        request._finish(error)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_service: Optional[InsightService] = None
+_service_lock = threading.Lock()
+
+
+def get_insight_service() -> InsightService:
+    """Process-wide service so every session shares the cache"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = InsightService()
+        return _service
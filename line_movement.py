@@ -0,0 +1,272 @@
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional
+from metrics import get_logger
+from utils import iter_odds, outcome_label, calculate_implied_probability
+
+STEAM_BOOKS = 3          # books moving the same way inside the window
+STEAM_WINDOW = 300       # seconds
+RLM_PUBLIC_PCT = 60.0    # public ticket share that makes a side "the public side"
+MAX_ALERTS = 500
+
+log = get_logger(__name__)
+
+
+def market_strength(market: str, outcome: str, point: float, prob: float) -> float:
+    """How strongly the market rates an outcome; rises when the line moves toward it
+
+    The point dominates (half a point outweighs any juice change) and the no-vig
+    probability breaks ties, so -110 -> -130 at the same number is a move too.
+    """
+    if market == 'spreads' and not math.isnan(point):
+        return -point + prob
+    if (market == 'totals' or market.startswith('player_')) and not math.isnan(point):
+        return (point if outcome.lower() == 'over' else -point) + prob
+    return prob
+
+
+def _side_key(game_id: str, book: str, market: str, player: str, point: float) -> tuple:
+    """Rows sharing this key are the two sides of one book's line"""
+    if math.isnan(point):
+        return game_id, book, market, player, None
+    return game_id, book, market, player, abs(point) if market == 'spreads' else point
+
+
+def no_vig_rows(games) -> List[tuple]:
+    """Odds rows paired with each side's no-vig probability within its book's line"""
+    rows = list(iter_odds(games))
+    implied = [calculate_implied_probability(row[10]) for row in rows]
+    keys = [_side_key(row[0], row[5], row[6], row[8], row[9]) for row in rows]
+    totals: Dict[tuple, list] = {}
+    for key, prob in zip(keys, implied):
+        total = totals.setdefault(key, [0.0, 0])
+        total[0] += prob
+        total[1] += 1
+    # A side posted alone has nothing to remove the vig against; keep its implied price
+    return [(row, prob / totals[key][0] if totals[key][1] > 1 else prob)
+            for row, key, prob in zip(rows, keys, implied)]
+
+
+class LineState:
+    """One book's history for one outcome"""
+    __slots__ = ('open', 'previous', 'current', 'velocity', 'last_move')
+
+    def __init__(self, value: float, timestamp: float):
+        self.open = value
+        self.previous = value
+        self.current = value
+        self.velocity = 0.0
+        self.last_move = timestamp
+
+
+class MarketState:
+    """Moves across every book for one outcome, windowed for steam"""
+    __slots__ = ('books', 'moves', 'movers', 'last_steam', 'last_reverse')
+
+    def __init__(self):
+        self.books: Dict[str, LineState] = {}
+        self.moves = deque()                      # (timestamp, book, direction)
+        self.movers = {1: Counter(), -1: Counter()}
+        self.last_steam = {1: -math.inf, -1: -math.inf}
+        self.last_reverse = -math.inf
+
+
+class LineMovementDetector:
+    """Rolling per-book line state fed one odds snapshot at a time
+
+    Open/previous/current/velocity are kept per (game, book, market, outcome);
+    steam counts the books moving the same outcome the same way inside the
+    window, and reverse line movement flags a line moving away from the side
+    the public backs (only for outcomes given a split via set_public_split).
+    Games that leave a source's slate are dropped. Each changed price costs O(1) amortized: the book's last value is
+    compared, the outcome's move window is trimmed from the left and the
+    per-direction book counters are adjusted in place.
+    """
+
+    def __init__(self, steam_books: int = STEAM_BOOKS, window: float = STEAM_WINDOW,
+                 public_pct: float = RLM_PUBLIC_PCT, max_alerts: int = MAX_ALERTS):
+        self.steam_books = steam_books
+        self.window = window
+        self.public_pct = public_pct
+        self.markets: Dict[tuple, MarketState] = {}
+        self.games: Dict[str, str] = {}
+        self.public_splits: Dict[tuple, float] = {}
+        self._game_markets: Dict[str, set] = {}
+        self._source_games: Dict[str, set] = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self.alert_queue = queue.Queue(maxsize=max_alerts)
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._last_snapshot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        self._listeners.append(callback)
+
+    def set_public_split(self, game_id: str, market: str, outcome: str, ticket_pct: float):
+        """Record the public ticket share of an outcome, used for reverse line movement"""
+        with self._lock:
+            self.public_splits[(game_id, market, outcome)] = ticket_pct
+
+    def update(self, games: list, timestamp: Optional[float] = None, source: str = 'default') -> List[Dict]:
+        """Consume one odds snapshot; returns the alerts it raised"""
+        timestamp = timestamp or time.time()
+        raised = []
+        with self._lock:
+            if timestamp <= self._last_snapshot.get(source, -math.inf):
+                return raised  # already consumed this snapshot
+            self._last_snapshot[source] = timestamp
+
+            seen = set()
+            for row, prob in no_vig_rows(games):
+                game_id, _, _, home, away, book, market, outcome, player, point, _, _ = row
+                seen.add(game_id)
+                key = (game_id, market, outcome_label(outcome, player))
+                value = market_strength(market, outcome, point, prob)
+                state = self.markets.get(key)
+                if state is None:
+                    self.markets[key] = state = MarketState()
+                    self.games[game_id] = f"{home} vs {away}"
+                    self._game_markets.setdefault(game_id, set()).add(key)
+
+                line = state.books.get(book)
+                if line is None:
+                    state.books[book] = LineState(value, timestamp)
+                    continue
+                if value == line.current:
+                    continue
+                raised.extend(self._record_move(key, state, book, line, value, timestamp))
+
+            # An empty snapshot is a failed fetch, not a slate where every game ended
+            if seen:
+                for game_id in self._source_games.get(source, set()) - seen:
+                    self._drop_game(game_id)
+                self._source_games[source] = seen
+
+        for alert in raised:
+            self._publish(alert)
+        return raised
+
+    def _drop_game(self, game_id: str):
+        for key in self._game_markets.pop(game_id, ()):
+            del self.markets[key]
+            self.public_splits.pop(key, None)
+        self.games.pop(game_id, None)
+
+    def _record_move(self, key, state: MarketState, book: str, line: LineState,
+                     value: float, timestamp: float) -> List[Dict]:
+        change = value - line.current
+        direction = 1 if change > 0 else -1
+        elapsed = max(timestamp - line.last_move, 1.0)
+        line.velocity = change / elapsed * 60  # per minute
+        line.previous, line.current = line.current, value
+        line.last_move = timestamp
+
+        state.moves.append((timestamp, book, direction))
+        state.movers[direction][book] += 1
+        while state.moves and state.moves[0][0] < timestamp - self.window:
+            _, old_book, old_dir = state.moves.popleft()
+            state.movers[old_dir][old_book] -= 1
+            if not state.movers[old_dir][old_book]:
+                del state.movers[old_dir][old_book]
+
+        alerts = []
+        books_moving = len(state.movers[direction])
+        if books_moving >= self.steam_books and timestamp - state.last_steam[direction] > self.window:
+            state.last_steam[direction] = timestamp
+            alerts.append(self._alert('steam', key, book, line, direction, books_moving, timestamp))
+
+        public = self.public_splits.get(key)
+        if (public is not None and public >= self.public_pct and direction < 0
+                and timestamp - state.last_reverse > self.window):
+            state.last_reverse = timestamp
+            alerts.append(self._alert('reverse', key, book, line, direction, books_moving, timestamp))
+        return alerts
+
+    def _alert(self, kind: str, key, book: str, line: LineState, direction: int,
+               books_moving: int, timestamp: float) -> Dict:
+        game_id, market, outcome = key
+        return {
+            'type': kind,
+            'game_id': game_id,
+            'game': self.games.get(game_id, game_id),
+            'market': market,
+            'outcome': outcome,
+            'book': book,
+            'direction': 'toward' if direction > 0 else 'away',
+            'books': books_moving,
+            'open': line.open,
+            'previous': line.previous,
+            'current': line.current,
+            'velocity': round(line.velocity, 4),
+            'public_pct': self.public_splits.get(key),
+            'timestamp': timestamp
+        }
+
+    def _publish(self, alert: Dict):
+        self.alerts.append(alert)
+        try:
+            self.alert_queue.put_nowait(alert)
+        except queue.Full:
+            # Headless consumers that fall behind lose the oldest alert, not the newest
+            self.alert_queue.get_nowait()
+            self.alert_queue.put_nowait(alert)
+        for callback in self._listeners:
+            try:
+                callback(alert)
+            except Exception as e:
+                log.exception("Error in line movement listener: %s", e)
+
+    def recent_alerts(self, limit: int = 20) -> List[Dict]:
+        """Newest alerts first, for the Dashboard"""
+        return list(self.alerts)[-limit:][::-1]
+
+    def drain_alerts(self) -> List[Dict]:
+        """Pop every alert not yet handed to a headless consumer"""
+        drained = []
+        while True:
+            try:
+                drained.append(self.alert_queue.get_nowait())
+            except queue.Empty:
+                return drained
+
+    def get_state(self, game_id: str, market: str, outcome: str, book: str) -> Optional[Dict]:
+        state = self.markets.get((game_id, market, outcome))
+        line = state.books.get(book) if state is not None else None
+        if line is None:
+            return None
+        return {
+            'open': line.open,
+            'previous': line.previous,
+            'current': line.current,
+            'velocity': line.velocity,
+            'books_up': len(state.movers[1]),
+            'books_down': len(state.movers[-1])
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    from utils import fetch_odds_snapshot
+
+    parser = argparse.ArgumentParser(description="Poll odds and print steam / reverse line movement alerts")
+    parser.add_argument('--sport', default='NBA')
+    parser.add_argument('--interval', type=int, default=60)
+    parser.add_argument('--splits', help="CSV of game_id,market,outcome,ticket_pct, re-read every poll")
+    args = parser.parse_args()
+
+    detector = LineMovementDetector()
+    while True:
+        if args.splits:
+            import csv
+            with open(args.splits, newline='') as f:
+                for split in csv.DictReader(f):
+                    detector.set_public_split(split['game_id'], split['market'], split['outcome'],
+                                              float(split['ticket_pct']))
+        detector.update(fetch_odds_snapshot(args.sport))
+        for alert in detector.drain_alerts():
+            print(f"[{alert['type']}] {alert['game']} {alert['market']} {alert['outcome']} @ {alert['book']}: "
+                  f"{alert['previous']} -> {alert['current']} ({alert['books']} books)")
+        time.sleep(args.interval)
@@ -0,0 +1,405 @@
+"""Local stand-ins for the odds API, stats.nba.com and an OpenAI-compatible chat endpoint.
+
+    python local_upstreams.py --port 8787 --latency-ms 80 --error-rate 0.02
+
+prints the environment that points the app at it:
+
+    ODDS_API_URL=http://127.0.0.1:8787/v4 NBA_STATS_URL=http://127.0.0.1:8787/stats
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1 ...  streamlit run main.py
+
+Payloads come from synthetic_data, so they are deterministic for a seed and
+shaped like the real services: odds API games and credit headers, nba_api
+resultSets, and chat completions (streamed as server-sent events when asked).
+The variables are read at import time, so set them before importing the app.
+"""
+import json
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+from metrics import get_logger
+from transport import FaultInjector
+from synthetic_data import (NBA_TEAMS, generate_game_logs, generate_odds, generate_player_game_log,
+                            generate_roster, player_means, seeded_rng)
+
+DEFAULT_PORT = 8787
+PROPS_PER_GAME = 10  # players per event on the event-odds endpoint
+CHAT_MODEL = 'local-standin'
+
+log = get_logger(__name__)
+
+
+# nba_api helpers
+
+@lru_cache(maxsize=1)
+def _nba_teams() -> Dict[str, Dict]:
+    """full_name -> nba_api static team (id, abbreviation)"""
+    from nba_api.stats.static import teams
+    return {team['full_name']: team for team in teams.get_teams()}
+
+
+def _team_abbreviation(name: str) -> str:
+    team = _nba_teams().get(name)
+    return team['abbreviation'] if team else name.split()[-1][:3].upper()
+
+
+def _team_by_id(team_id) -> str:
+    for name, team in _nba_teams().items():
+        if str(team['id']) == str(team_id):
+            return name
+    return NBA_TEAMS[zlib.crc32(str(team_id).encode('utf-8')) % len(NBA_TEAMS)]
+
+
+@lru_cache(maxsize=1)
+def _player_teams() -> Dict[int, str]:
+    """generate_roster's team code -> team, to find a synthetic player's team from their id"""
+    return {zlib.crc32(team.encode('utf-8')) % 10000: team for team in NBA_TEAMS}
+
+
+def _player_team(player_id: str) -> str:
+    code = (int(player_id) - 1_000_000) // 100 if str(player_id).isdigit() else -1
+    return _player_teams().get(code, NBA_TEAMS[0])
+
+
+@lru_cache(maxsize=4)
+def _season_logs(season: str):
+    return generate_game_logs(season=season)
+
+
+def result_sets(endpoint: str, name: str, rows: List[Dict]) -> Dict:
+    """nba_api response: the named set first (nba_api reads sets in order), the others empty"""
+    import importlib
+
+    module = importlib.import_module(f"nba_api.stats.endpoints.{endpoint}")
+    expected = next(getattr(module, attr).expected_data for attr in dir(module)
+                    if getattr(getattr(module, attr), 'endpoint', None) == endpoint)
+    headers = list(expected.get(name, []))
+    headers += [column for column in (rows[0] if rows else {}) if column not in headers]
+    sets = [{'name': name, 'headers': headers, 'rowSet': [[row.get(h) for h in headers] for row in rows]}]
+    sets += [{'name': other, 'headers': list(columns), 'rowSet': []}
+             for other, columns in expected.items() if other != name]
+    return {'resource': endpoint, 'parameters': {}, 'resultSets': sets}
+
+
+def _param(params: Dict, *names, default=None):
+    lowered = {k.lower(): v for k, v in params.items()}
+    for name in names:
+        if lowered.get(name.lower()):
+            return lowered[name.lower()]
+    return default
+
+
+def _stat_rows(player_ids, names, positions, stats, minutes) -> List[Dict]:
+    return [{'PLAYER_ID': int(pid), 'PLAYER_NAME': name, 'START_POSITION': pos, 'MIN': f"{m:.0f}:00",
+             'PTS': int(s[0]), 'REB': int(s[1]), 'AST': int(s[2]), 'FG3M': int(s[3]), 'BLK': int(s[4]),
+             'STL': int(s[5])}
+            for pid, name, pos, s, m in zip(player_ids, names, positions, stats, minutes)]
+
+
+def nba_stats(endpoint: str, params: Dict) -> Optional[Dict]:
+    """resultSets payload for one stats.nba.com endpoint, or None if it isn't stood in"""
+    season = _param(params, 'Season', default='2023-24')
+
+    if endpoint == 'commonteamroster':
+        team = _team_by_id(_param(params, 'TeamID'))
+        return result_sets(endpoint, 'CommonTeamRoster', [{
+            'TeamID': int(_param(params, 'TeamID', default=0)), 'SEASON': season[:4], 'LeagueID': '00',
+            'PLAYER': p['name'], 'NUM': p['number'], 'POSITION': p['position'], 'HEIGHT': p['height'],
+            'WEIGHT': p['weight'], 'EXP': p['experience'], 'SEASON_EXP': p['experience'], 'PLAYER_ID': int(p['id'])
+        } for p in generate_roster(team)])
+
+    if endpoint == 'playergamelog':
+        player_id = str(_param(params, 'PlayerID', default='0'))
+        team = _team_abbreviation(_player_team(player_id))
+        games = generate_player_game_log(player_id, 30)
+        return result_sets(endpoint, 'PlayerGameLog', [{
+            'SEASON_ID': f"2{season[:4]}", 'Player_ID': int(player_id) if player_id.isdigit() else 0,
+            'Game_ID': f"002{zlib.crc32(f'{player_id}{i}'.encode('utf-8')) % 10**7:07d}",
+            'GAME_DATE': row.date.strftime('%b %d, %Y').upper(),
+            'MATCHUP': f"{team} vs. {_team_abbreviation(row.opponent)}",
+            'MIN': row.minutes, 'PTS': row.points, 'REB': row.rebounds, 'AST': row.assists,
+            'FG3M': row.threes, 'BLK': row.blocks, 'STL': row.steals
+        } for i, row in enumerate(games.itertuples())])
+
+    if endpoint == 'leaguegamelog':
+        logs = _season_logs(season)
+        date_from = _param(params, 'DateFrom')
+        if date_from:
+            logs = logs[logs['game_date'] >= datetime.strptime(date_from, '%m/%d/%Y').strftime('%Y-%m-%d')]
+        team_abbr = {team: _team_abbreviation(team) for team in NBA_TEAMS}
+        teams = logs['team'].map(team_abbr).to_numpy()
+        opponents = logs['opponent'].map(team_abbr).to_numpy()
+        rows = logs.assign(TEAM_ABBREVIATION=teams, MATCHUP=[f"{t} vs. {o}" for t, o in zip(teams, opponents)])
+        rows = rows.rename(columns={'player_id': 'PLAYER_ID', 'game_id': 'GAME_ID', 'game_date': 'GAME_DATE',
+                                    'pts': 'PTS', 'reb': 'REB', 'ast': 'AST', 'fg3m': 'FG3M', 'blk': 'BLK',
+                                    'stl': 'STL'})
+        rows = rows.drop(columns=['season', 'team', 'opponent', 'position'])
+        return result_sets(endpoint, 'LeagueGameLog', json.loads(rows.to_json(orient='records')))
+
+    if endpoint == 'playerindex':
+        rows = []
+        for team in NBA_TEAMS:
+            for p in generate_roster(team):
+                first, _, last = p['name'].partition(' ')
+                rows.append({'PERSON_ID': int(p['id']), 'PLAYER_FIRST_NAME': first, 'PLAYER_LAST_NAME': last,
+                             'TEAM_NAME': team, 'TEAM_ABBREVIATION': _team_abbreviation(team),
+                             'JERSEY_NUMBER': p['number'], 'POSITION': p['position']})
+        return result_sets(endpoint, 'PlayerIndex', rows)
+
+    if endpoint == 'teaminfocommon':
+        team = _team_by_id(_param(params, 'TeamID'))
+        rng = seeded_rng(None, 'standings', team, season)
+        wins = int(rng.integers(15, 65))
+        home_wins = int(rng.integers(max(0, wins - 41), min(41, wins) + 1))
+        return result_sets(endpoint, 'TeamInfoCommon', [{
+            'TEAM_ID': int(_param(params, 'TeamID', default=0)), 'SEASON_YEAR': season, 'TEAM_NAME': team,
+            'TEAM_ABBREVIATION': _team_abbreviation(team), 'W': wins, 'L': 82 - wins,
+            'PCT': round(wins / 82, 3), 'CONF_RANK': int(rng.integers(1, 16)), 'DIV_RANK': int(rng.integers(1, 6)),
+            'HOME_RECORD': f"{home_wins}-{41 - home_wins}", 'ROAD_RECORD': f"{wins - home_wins}-{41 - wins + home_wins}"
+        }])
+
+    if endpoint in ('boxscoretraditionalv2', 'boxscoreadvancedv2'):
+        game_id = str(_param(params, 'GameID', default='0'))
+        rng = seeded_rng(None, 'box', game_id)
+        home, away = rng.choice(len(NBA_TEAMS), 2, replace=False)
+        rows = []
+        for side in (home, away):
+            team = NBA_TEAMS[side]
+            players = generate_roster(team)[:10]
+            means = np.array([player_means(p['id'], p['position']) for p in players])
+            minutes = rng.normal(1.0, 0.18, (len(players), 1)).clip(0.3, 1.6)
+            stats = rng.poisson(means * minutes)
+            for row in _stat_rows([p['id'] for p in players], [p['name'] for p in players],
+                                  [p['position'] for p in players], stats, 34 * minutes[:, 0]):
+                row.update({'GAME_ID': game_id, 'TEAM_ABBREVIATION': _team_abbreviation(team)})
+                rows.append(row)
+        return result_sets(endpoint, 'PlayerStats', rows)
+
+    if endpoint == 'leaguegamefinder':
+        team = _team_by_id(_param(params, 'TeamID', default=0))
+        abbr = _team_abbreviation(team)
+        rng = seeded_rng(None, 'schedule', team, season)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = []
+        for days_ago in range(0, 20, 2):
+            opponent = NBA_TEAMS[int(rng.integers(0, len(NBA_TEAMS)))]
+            if opponent == team:
+                continue
+            rows.append({'SEASON_ID': f"2{season[:4]}", 'TEAM_ID': int(_param(params, 'TeamID', default=0)),
+                         'TEAM_ABBREVIATION': abbr, 'TEAM_NAME': team,
+                         'GAME_ID': f"002{zlib.crc32(f'{team}{opponent}{days_ago}'.encode('utf-8')) % 10**7:07d}",
+                         'GAME_DATE': (today - timedelta(days=days_ago)).strftime('%Y-%m-%d'),
+                         'MATCHUP': f"{abbr} vs. {_team_abbreviation(opponent)}"})
+        return result_sets(endpoint, 'LeagueGameFinderResults', rows)
+
+    return None
+
+
+# Odds API
+
+def _sport(sport_key: str) -> str:
+    from utils import SPORT_KEYS
+    return next((name for name, key in SPORT_KEYS.items() if key == sport_key), sport_key.upper())
+
+
+def odds_api(path: str, params: Dict, seed: Optional[int]):
+    """(status, body) for an odds API v4 path under /v4"""
+    markets = params.get('markets', 'h2h')
+    match = re.fullmatch(r'/sports/([^/]+)/odds', path)
+    if match:
+        games = generate_odds(_sport(match.group(1)), markets=markets, seed=seed)
+        if params.get('eventIds'):
+            event_ids = set(params['eventIds'].split(','))
+            games = [g for g in games if g['id'] in event_ids]
+        return 200, games
+    match = re.fullmatch(r'/sports/([^/]+)/events', path)
+    if match:
+        games = generate_odds(_sport(match.group(1)), markets='h2h', seed=seed)
+        return 200, [{k: g[k] for k in ('id', 'sport_key', 'commence_time', 'home_team', 'away_team')}
+                     for g in games]
+    match = re.fullmatch(r'/sports/([^/]+)/events/([^/]+)/odds', path)
+    if match:
+        games = generate_odds(_sport(match.group(1)), markets=markets, players_per_game=PROPS_PER_GAME, seed=seed)
+        event = next((g for g in games if g['id'] == match.group(2)), None)
+        return (200, event) if event else (404, {'message': 'Event not found'})
+    return 404, {'message': 'Unknown odds endpoint'}
+
+
+# Chat
+
+def chat_answer(messages: List[Dict], max_tokens: Optional[int] = None) -> str:
+    """Deterministic stand-in answer that echoes what was asked"""
+    question = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    question = ' '.join(str(question).split())
+    lean = ('the over looks priced about right', 'recent form supports the under',
+            'the line has moved toward the favourite')[zlib.crc32(question.encode('utf-8')) % 3]
+    words = (f"Local stand-in insight on: {question[:160]}. Based on the recent sample, {lean}; "
+             f"treat this as a placeholder answer, not a model output.").split(' ')
+    return ' '.join(words[:max_tokens] if max_tokens else words)
+
+
+def _chat_chunk(content: Optional[str], finish: Optional[str] = None, role: Optional[str] = None) -> bytes:
+    delta = {}
+    if role:
+        delta['role'] = role
+    if content is not None:
+        delta['content'] = content
+    chunk = {'id': 'chatcmpl-local', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+             'model': CHAT_MODEL, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish}]}
+    return f"data: {json.dumps(chunk)}\n\n".encode('utf-8')
+
+
+class LocalUpstreams:
+    """All three stand-ins on one port, served from a daemon thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, faults: Optional[FaultInjector] = None,
+                 seed: Optional[int] = None, token_delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.faults = faults or FaultInjector()
+        self.seed = seed
+        self.token_delay = token_delay
+        self.credits_used = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variables that point utils, transport and the OpenAI client here"""
+        return {'ODDS_API_URL': f"{self.url}/v4", 'NBA_STATS_URL': f"{self.url}/stats",
+                'OPENAI_BASE_URL': f"{self.url}/v1", 'THE_ODDS_API_KEY': 'local', 'OPENAI_API_KEY': 'local'}
+
+    def charge(self, params: Dict) -> Dict[str, str]:
+        """Odds API credit headers: markets x regions per priced call"""
+        cost = len(params.get('markets', 'h2h').split(',')) * len(params.get('regions', 'us').split(','))
+        with self._lock:
+            self.credits_used += cost
+            used = self.credits_used
+        return {'x-requests-last': str(cost), 'x-requests-used': str(used),
+                'x-requests-remaining': str(max(0, 500 - used))}
+
+    def start(self) -> 'LocalUpstreams':
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def send_json(self, status: int, payload, headers: Optional[Dict] = None):
+                body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def injected(self) -> bool:
+                upstreams.faults.delay()
+                if upstreams.faults.should_fail():
+                    self.send_json(upstreams.faults.error_status, {'message': 'Injected fault'})
+                    return True
+                return False
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query))
+                if self.injected():
+                    return
+                if parts.path.startswith('/v4/'):
+                    status, payload = odds_api(parts.path[3:], params, upstreams.seed)
+                    headers = upstreams.charge(params) if status == 200 and parts.path.endswith('/odds') else {}
+                    self.send_json(status, payload, headers)
+                elif parts.path.startswith('/stats/'):
+                    payload = nba_stats(parts.path[len('/stats/'):].strip('/').lower(), params)
+                    self.send_json(200 if payload else 404, payload or {'message': 'Unknown stats endpoint'})
+                elif parts.path in ('/v1/models', '/models'):
+                    self.send_json(200, {'object': 'list', 'data': [{'id': CHAT_MODEL, 'object': 'model'}]})
+                else:
+                    self.send_json(404, {'message': 'Not found'})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.injected():
+                    return
+                if urlsplit(self.path).path not in ('/v1/chat/completions', '/chat/completions'):
+                    self.send_json(404, {'message': 'Not found'})
+                    return
+                request = json.loads(body or b'{}')
+                answer = chat_answer(request.get('messages', []), request.get('max_tokens'))
+                if not request.get('stream'):
+                    self.send_json(200, {
+                        'id': 'chatcmpl-local', 'object': 'chat.completion', 'created': int(time.time()),
+                        'model': CHAT_MODEL,
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer},
+                                     'finish_reason': 'stop'}],
+                        'usage': {'prompt_tokens': 0, 'completion_tokens': len(answer.split()),
+                                  'total_tokens': len(answer.split())}
+                    })
+                    return
+                # Server-sent events until the connection closes, like the real streaming API
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                self.wfile.write(_chat_chunk('', role='assistant'))
+                for i, word in enumerate(answer.split(' ')):
+                    if upstreams.token_delay:
+                        time.sleep(upstreams.token_delay)
+                    self.wfile.write(_chat_chunk(word if i == 0 else ' ' + word))
+                    self.wfile.flush()
+                self.wfile.write(_chat_chunk(None, finish='stop'))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]  # port=0 picks a free one
+        threading.Thread(target=self._server.serve_forever, daemon=True, name='local-upstreams').start()
+        log.info("Local upstreams on %s", self.url)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'LocalUpstreams':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the odds API, stats.nba.com and chat")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, help="synthetic_data seed (default SYNTHETIC_SEED)")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--token-ms', type=float, default=0.0, help="delay between streamed chat tokens")
+    args = parser.parse_args()
+
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate, seed=args.seed)
+    server = LocalUpstreams(args.host, args.port, faults, args.seed, args.token_ms / 1000).start()
+    print(' '.join(f"{name}={value}" for name, value in server.env().items()))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
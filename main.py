@@ -1,31 +1,181 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from utils import *
-from data_utils import *
 from datetime import datetime, timedelta
-import requests
 import os
 import time
-from stats_utils import *
-import altair as alt
-from betting_analysis import *
-from team_data import fetch_team_players, fetch_player_stats, fetch_game_props, get_game_id_from_teams, fetch_player_game_log
+import uuid
+from utils import (SPORT_KEYS, fetch_odds_snapshot, format_game_data, calculate_implied_probability,
+                   calculate_ev, format_american_odds, generate_ai_insight, slate_opponents)
+from insight_service import get_insight_service, insight_key
+from prop_odds import PROP_CATEGORIES
+from auth_utils import create_user, login, verify_session_token
+from metrics import METRICS, PROFILER, serve_metrics, stage
+import db
 
-# Define HARDCODED_ROSTERS and PROP_CATEGORIES
+# Page-specific modules (nba_api, altair, scikit-learn, sqlalchemy) are imported
+# inside the page that uses them; see benchmarks/startup.py for the budget.
+
+# Define HARDCODED_ROSTERS
 HARDCODED_ROSTERS = {
     "Team A": [{"name": "Player 1", "position": "G"}, {"name": "Player 2", "position": "F"}],
     "Team B": [{"name": "Player 3", "position": "C"}, {"name": "Player 4", "position": "G"}]
 }
 
-PROP_CATEGORIES = {
-    "Points": {"thresholds": [10, 15, 20]},
-    "Rebounds": {"thresholds": [5, 10, 15]},
-    "Assists": {"thresholds": [3, 5, 7]}
-}
+# ADAPTIVE_REFRESH=1 polls odds per game in the background (refresh_scheduler.py)
+ADAPTIVE_REFRESH = os.getenv('ADAPTIVE_REFRESH', '').lower() in ('1', 'true', 'yes')
 
 st.set_page_config(page_title="Sports Betting Analytics", layout="wide")
 
+@st.cache_resource
+def start_metrics_endpoint():
+    # One listener per server process; a no-op unless METRICS_PORT is set
+    return serve_metrics()
+
+start_metrics_endpoint()
+
+@st.cache_resource
+def get_line_detector():
+    from line_movement import LineMovementDetector
+    # One detector per server process, fed by whichever session fetches a new snapshot
+    return LineMovementDetector()
+
+@st.cache_resource
+def get_fair_lines(sport):
+    from fair_lines import FairLineEngine
+    # One engine per sport so each sport's full snapshot only retires its own lines
+    return FairLineEngine()
+
+@st.cache_resource
+def get_best_lines(sport):
+    from best_lines import BestLineIndex
+    # One index per sport, kept current by each new odds snapshot instead of rebuilt per read
+    return BestLineIndex()
+
+@st.cache_resource
+def get_snapshots():
+    from snapshots import SnapshotRegistry
+    # Shared, read-only data for every session; sessions only keep filters and selections
+    return SnapshotRegistry()
+
+def _store_odds(sport, games, fetched_at):
+    with db.connect() as conn:
+        db.save_odds_snapshot(conn, games, fetched_at)
+
+def _fetch_and_store_odds(sport):
+    from compact import OddsBuffer
+    with stage('fetch', data='odds'):
+        fetched_at, snapshot = time.time(), fetch_odds_snapshot(sport)
+    _store_odds(sport, snapshot, fetched_at)
+    # Held for the whole process, so keep it as arrays rather than nested dicts
+    with stage('normalize', data='odds'):
+        return OddsBuffer.from_games(snapshot)
+
+@st.cache_resource
+def get_refresh_scheduler():
+    from refresh_scheduler import RefreshScheduler
+    # One background poller per server process; it publishes odds:{sport} for every session
+    scheduler = RefreshScheduler(get_snapshots())
+    scheduler.subscribe(_store_odds)
+    return scheduler.start()
+
+def load_odds_snapshot(sport):
+    if ADAPTIVE_REFRESH:
+        snapshot = get_refresh_scheduler().watch(sport)
+    else:
+        snapshot = get_snapshots().get_or_load(f"odds:{sport}", lambda: _fetch_and_store_odds(sport), ttl=60)
+    return snapshot.created_at, snapshot.data
+
+@st.cache_resource
+def get_odds_hub():
+    from odds_hub import OddsHubClient
+    # One websocket per server process; sessions read its mirrored state
+    return OddsHubClient(os.environ['ODDS_HUB_URL'], list(SPORT_KEYS))
+
+def current_odds_snapshot(sport):
+    if os.getenv('ODDS_HUB_URL'):
+        hub = get_odds_hub()
+        if sport.upper() in hub.updated_at:
+            return hub.updated_at[sport.upper()], hub.games(sport)
+    return load_odds_snapshot(sport)
+
+def current_best_lines(sport, fetched_at, snapshot):
+    index = get_best_lines(sport)
+    index.update_from_games(snapshot, fetched_at)
+    return index
+
+def _build_games_frame(sport, fetched_at, snapshot):
+    with stage('normalize', data='games'):
+        games = snapshot.to_games() if hasattr(snapshot, 'to_games') else snapshot
+        index = current_best_lines(sport, fetched_at, snapshot)
+        return _games_frame([format_game_data(game, index) for game in games])
+
+def _games_frame(games):
+    df = pd.DataFrame(games)
+    if not df.empty:
+        df['commence_time'] = pd.to_datetime(df['commence_time'])
+        df['matchup'] = df['home_team'] + " vs " + df['away_team']
+    return df
+
+def load_games_frame(sport):
+    # Derived from whichever odds snapshot is current (TTL fetch, scheduler or hub), never fetched separately
+    fetched_at, snapshot = current_odds_snapshot(sport)
+    return get_snapshots().get_or_derive(f"games:{sport}", fetched_at, lambda: _build_games_frame(sport, fetched_at, snapshot)).data
+
+def load_roster(team):
+    from team_data import fetch_team_players
+    return get_snapshots().get_or_load(f"roster:{team}", lambda: fetch_team_players(team), ttl=3600).data
+
+def load_game_log_snapshot(player_id, last_n_games):
+    from team_data import fetch_player_game_log
+    return get_snapshots().get_or_load(f"game_log:{player_id}:{last_n_games}",
+                                       lambda: fetch_player_game_log(player_id, last_n_games), ttl=900)
+
+def load_game_log(player_id, last_n_games):
+    return load_game_log_snapshot(player_id, last_n_games).data
+
+def load_slate_correlations(rosters):
+    from correlation_utils import CorrelationService
+    def build():
+        service = CorrelationService()
+        service.precompute_slate(rosters, fetch_logs=load_game_log)
+        return service
+    # Rebuilt for a new set of teams, or once the game logs it read have expired
+    source = (tuple(sorted(rosters)), int(time.time() // 900))
+    return get_snapshots().get_or_derive("correlations:slate", source, build).data
+
+def prop_owner():
+    # Logged-in users keep their props; anonymous sessions get their own scratch owner
+    return st.session_state.get('user_id') or st.session_state.session_id
+
+def load_prop_odds_snapshot(sport):
+    from prop_odds import fetch_slate_props
+    def load():
+        with stage('fetch', data='prop_lines'):
+            return fetch_slate_props(sport)
+    return get_snapshots().get_or_load(f"prop_odds:{sport}", load, ttl=300)
+
+def load_prop_lines_snapshot(sport):
+    from prop_odds import summarize_props
+    odds = load_prop_odds_snapshot(sport)
+    def build():
+        with stage('normalize', data='prop_lines'):
+            return summarize_props(odds.data)
+    return get_snapshots().get_or_derive(f"prop_lines:{sport}", odds.version, build)
+
+def load_prop_lines(sport):
+    return load_prop_lines_snapshot(sport).data
+
+def load_prop_fair_lines(sport):
+    from fair_lines import fair_lines
+    odds = load_prop_odds_snapshot(sport)
+    return get_snapshots().get_or_derive(f"prop_fair:{sport}", odds.version, lambda: fair_lines(odds.data)).data
+
+def load_game_props(event_id):
+    from team_data import fetch_game_props
+    # The service caches per event and rebuilds when the prop odds version changes
+    odds = load_prop_odds_snapshot('NBA')
+    return fetch_game_props(event_id, odds.data, odds.version)
+
 # Initialize session states
 if 'selected_game' not in st.session_state:
     st.session_state.selected_game = None
@@ -33,17 +183,45 @@ if 'selected_players' not in st.session_state:
     st.session_state.selected_players = []
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'asked_insight_keys' not in st.session_state:
+    st.session_state.asked_insight_keys = set()
 
 # Add session state for filters
 if 'prop_count' not in st.session_state:
     st.session_state.prop_count = {'total': 0, 'filtered': 0}
-if 'saved_props' not in st.session_state:
-    st.session_state.saved_props = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Enhanced sidebar with more navigation options
 st.sidebar.title("Sports Betting Analytics")
 page = st.sidebar.radio("Navigation", 
-    ["Dashboard", "Props", "EV+", "Boosts", "Arbitrage", "Middle Bets"])
+    ["Dashboard", "Props", "EV+", "Boosts", "Arbitrage", "Middle Bets", "Diagnostics"], key="page")
+
+# Account: the signed token is checked with one HMAC per rerun, no password hashing
+claims = verify_session_token(st.session_state.get('session_token'))
+st.session_state.user_id = claims['sub'] if claims else None
+with st.sidebar.expander("Account", expanded=False):
+    if claims:
+        st.write(f"Signed in as {claims['name']}")
+        if st.button("Log out"):
+            st.session_state.session_token = None
+            st.rerun()
+    else:
+        username = st.text_input("Username", key="login_username")
+        password = st.text_input("Password", type="password", key="login_password")
+        login_col, signup_col = st.columns(2)
+        with login_col:
+            if st.button("Log in"):
+                st.session_state.session_token = login(None, username, password)
+                if st.session_state.session_token:
+                    st.rerun()
+                st.error("Invalid username or password")
+        with signup_col:
+            if st.button("Sign up"):
+                if username and password and create_user(None, username, password):
+                    st.session_state.session_token = login(None, username, password)
+                    st.rerun()
+                st.error("Username unavailable")
 
 # Global filters in sidebar
 with st.sidebar.expander("Global Filters", expanded=True):
@@ -77,38 +255,58 @@ with st.sidebar.expander("AI Betting Assistant", expanded=True):
         if st.button("Find Value Bets"):
             user_question = "What are the best value bets in this game?"
             
-    if user_question:
-        with st.spinner("Analyzing..."):
-            response = generate_ai_insight(user_question, context)
-            st.session_state.chat_history.append({"q": user_question, "a": response})
+    # text_input keeps its value across reruns (and after a quick button), so only unasked questions start a request
+    if user_question and insight_key(user_question, context) not in st.session_state.asked_insight_keys:
+        st.session_state.asked_insight_keys.add(insight_key(user_question, context))
+        request = get_insight_service().submit(user_question, context)
+        live_answer = st.empty()
+        with live_answer.container():
+            st.write_stream(request.stream())
+        live_answer.empty()
+        st.session_state.chat_history.append({"q": user_question, "a": request.result()})
             
     for chat in st.session_state.chat_history[-3:]:
         st.write(f"❓ {chat['q']}")
         st.info(f"🤖 {chat['a']}")
 
+render_started = time.perf_counter()
+
 if page == "Dashboard":
+    from team_data import fetch_player_stats
+    from defense_data import get_defense_vs_position
+
     col1, col2, col3 = st.columns([2,2,1])
     with col1:
         sport_type = st.selectbox("Sport", list(SPORT_KEYS.keys()), key="sport_select")
         
-    data = fetch_odds_data(sport_type)
-    if data:
-        df = pd.DataFrame(data)
-        df['commence_time'] = pd.to_datetime(df['commence_time'])
-        games = [f"{row['home_team']} vs {row['away_team']}" for _, row in df.iterrows()]
+    df = load_games_frame(sport_type)
+    if not df.empty:
+        games = df['matchup'].tolist()
         
         with col2:
             selected_game = st.selectbox("Select Game", games, key="game_select")
             st.session_state.selected_game = selected_game
         
         with col3:
-            st.metric("Game Time", df[df.apply(lambda x: f"{x['home_team']} vs {x['away_team']}" == selected_game, axis=1)]['commence_time'].iloc[0].strftime('%I:%M %p'))
+            st.metric("Game Time", df.loc[df['matchup'] == selected_game, 'commence_time'].iloc[0].strftime('%I:%M %p'))
 
         if selected_game:
-            game_row = df[df.apply(lambda x: f"{x['home_team']} vs {x['away_team']}" == selected_game, axis=1)].iloc[0]
+            game_row = df[df['matchup'] == selected_game].iloc[0]
             home_team = game_row['home_team']
             away_team = game_row['away_team']
             
+            fetched_at, snapshot = current_odds_snapshot(sport_type)
+            detector = get_line_detector()
+            detector.update(snapshot, fetched_at, source=sport_type)
+            line_alerts = detector.recent_alerts()
+            fair = get_fair_lines(sport_type)
+            fair.update_from_games(snapshot, fetched_at)
+            if line_alerts:
+                with st.expander(f"Line Movement Alerts ({len(line_alerts)})"):
+                    st.dataframe(pd.DataFrame(line_alerts)[
+                        ['type', 'game', 'market', 'outcome', 'book', 'direction', 'books', 'open', 'current', 'velocity']
+                    ], use_container_width=True)
+
             tabs = st.tabs(["Game Props", "Player Analysis"])
             
             with tabs[0]:
@@ -124,12 +322,17 @@ if page == "Dashboard":
                         odds_key = f"odds_{selected_team}"
                         if odds_key in game_row:
                             team_odds = float(game_row[odds_key])
-                            implied_prob = calculate_implied_probability(team_odds)
+                            # The books' no-vig consensus; the best price's own implied odds carry its vig
+                            fair_prob = fair.fair_probability(str(game_row['id']), 'h2h', selected_team)
+                            implied_prob = fair_prob if fair_prob is not None \
+                                else calculate_implied_probability(team_odds)
                             
                             # Display odds info
                             col1, col2, col3 = st.columns(3)
                             with col1:
                                 st.metric("American Odds", format_american_odds(team_odds))
+                                if pd.notna(game_row.get(f"book_{selected_team}")):
+                                    st.caption(f"Best price at {game_row[f'book_{selected_team}']}")
                                 if team_odds > 0:
                                     st.caption(f"Bet ${bet_amount} to win ${(team_odds/100 * bet_amount):.2f}")
                                 else:
@@ -137,10 +340,11 @@ if page == "Dashboard":
                                     
                             with col2:
                                 st.metric("Win Probability", f"{implied_prob:.1%}")
-                                st.caption(f"Based on {selected_team} odds")
+                                st.caption("No-vig consensus across books" if fair_prob is not None
+                                           else f"Based on {selected_team} odds")
                                 
                             with col3:
-                                # Calculate EV using implied probability
+                                # Calculate EV of the best price against the fair probability
                                 ev = calculate_ev(team_odds, implied_prob, bet_amount)
                                 st.metric("Expected Value", f"${ev:.2f}")
                                 if ev > 0:
@@ -161,8 +365,8 @@ if page == "Dashboard":
                         
                     else:  # Player Props
                         # Get real-time roster data
-                        home_players = fetch_team_players(home_team)
-                        away_players = fetch_team_players(away_team)
+                        home_players = load_roster(home_team)
+                        away_players = load_roster(away_team)
                         
                         col1, col2 = st.columns(2)
                         with col1:
@@ -195,28 +399,40 @@ if page == "Dashboard":
                                 player_id = player['id']
                                 stats = fetch_player_stats(player_id)
                                 
-                                game_id = get_game_id_from_teams(home_team, away_team)
-                                props = fetch_game_props(game_id) if game_id else {}
-                                prop_data = props.get(selected_player, {}).get(prop_type.lower(), None)
+                                props = load_game_props(game_row['id']) if sport_type == 'NBA' else None
+                                prop_key = (selected_player, prop_type.lower())
+                                prop_data = props.loc[prop_key] if props is not None and prop_key in props.index \
+                                    else None
                                 
                                 # Display stats and odds
+                                opponent = away_team if team == home_team else home_team
+                                dvp = get_defense_vs_position(opponent, player['position'], prop_type.lower())
                                 col1, col2, col3 = st.columns(3)
                                 with col1:
                                     st.metric(f"Season Avg {prop_type}", f"{stats[prop_type.lower()]:.1f}")
+                                    if dvp:
+                                        st.metric(f"{opponent} vs {player['position']}",
+                                                  f"{dvp['allowed']:.1f}",
+                                                  f"Rank {dvp['rank']}", delta_color="off")
                                 with col2:
-                                    if prop_data:
+                                    if prop_data is not None and prop_data['posted']:
                                         st.metric("Line", f"{prop_data['line']:.1f}")
-                                        st.metric("Over Odds", format_american_odds(prop_data['over_odds']))
+                                        if pd.notna(prop_data['over_odds']):
+                                            st.metric("Over Odds", format_american_odds(prop_data['over_odds']))
+                                    else:
+                                        st.caption("No line posted by books")
+                                    if prop_data is not None and pd.notna(prop_data['box_score']):
+                                        st.metric(f"{prop_type} This Game", f"{prop_data['box_score']:.0f}")
                                 with col3:
-                                    if prop_data:
-                                        ev_over = calculate_ev(
-                                            prop_data['over_odds'],
-                                            calculate_implied_probability(prop_data['over_odds']),
-                                            bet_amount
-                                        )
+                                    # EV prices the best over at the books' no-vig consensus for the line
+                                    if (prop_data is not None and prop_data['posted'] and pd.notna(prop_data['over_odds'])
+                                            and pd.notna(prop_data['over_prob'])):
+                                        ev_over = calculate_ev(prop_data['over_odds'], prop_data['over_prob'], bet_amount)
                                         st.metric("Over EV", f"${ev_over:.2f}")
                                         if ev_over > 0:
                                             st.caption("✅ Positive EV Bet")
+                                    elif prop_data is not None and prop_data['posted']:
+                                        st.caption("No EV without both sides posted by books")
                             else:
                                 st.error("Player not found")
                                 
@@ -237,8 +453,8 @@ if page == "Dashboard":
                     )
                     
                     # Fetch team rosters
-                    home_roster = fetch_team_players(home_team)
-                    away_roster = fetch_team_players(away_team)
+                    home_roster = load_roster(home_team)
+                    away_roster = load_roster(away_team)
 
                     col1, col2 = st.columns(2)
                     with col1:
@@ -262,25 +478,23 @@ if page == "Dashboard":
                         )
                         
                         try:
+                            from charts import comparison_spec
+
                             player1_id = next(p['id'] for p in home_roster if p['name'] == player1)
                             player2_id = next(p['id'] for p in away_roster if p['name'] == player2)
                             
                             # Fetch extended game logs
-                            logs1 = fetch_player_game_log(player1_id, time_range)
-                            logs2 = fetch_player_game_log(player2_id, time_range)
+                            log1 = load_game_log_snapshot(player1_id, time_range)
+                            log2 = load_game_log_snapshot(player2_id, time_range)
+                            logs1, logs2 = log1.data, log2.data
+                            # Same players, window and log versions -> the spec built on an earlier rerun
+                            chart_key = (player1_id, player2_id, time_range, log1.version, log2.version)
                             
                             # Create comparison charts for each metric
                             for metric in metrics:
                                 st.subheader(f"{metric.title()} Comparison")
-                                chart = create_comparison_chart(
-                                    stats1=logs1,
-                                    stats2=logs2,
-                                    player1=player1,
-                                    player2=player2,
-                                    metric=metric,
-                                    add_trend=True  # Changed from show_trend_line
-                                )
-                                st.altair_chart(chart, use_container_width=True)
+                                spec = comparison_spec(chart_key, logs1, logs2, player1, player2, metric)
+                                st.vega_lite_chart(spec, use_container_width=True)
                                 
                                 # Calculate and show trends
                                 trend1 = logs1[metric].rolling(3).mean()
@@ -316,6 +530,9 @@ if page == "Dashboard":
                             st.error(f"Error comparing players: {e}")
 
 elif page == "Props":
+    from betting_analysis import screen_player_props, props_frame, prop_highlights
+    from saved_props import save_props
+
     st.title("Player Props Analysis")
     
     # Enhanced filters in expandable section
@@ -335,67 +552,26 @@ elif page == "Props":
             show_hot = st.checkbox("🔥 Hot Only", False)
 
     # Process and display props
-    all_props = []
-    for team in (teams if teams and "All Teams" not in teams else HARDCODED_ROSTERS.keys()):
-        players = fetch_team_players(team)
-        for player in players:
-            if positions and "All Positions" not in positions and player['position'] not in positions:
-                continue
-                
-            # Fetch detailed player stats
-            stats = fetch_player_stats(player['id'])
-            game_logs = fetch_player_game_log(player['id'], 10)
-            
-            for prop_type in selected_props:
-                for threshold in PROP_CATEGORIES[prop_type]["thresholds"]:
-                    if threshold < min_threshold:
-                        continue
-                        
-                    for variation in variations:
-                        prop_key = prop_type.lower()
-                        
-                        # Calculate detailed metrics
-                        last_5_games = game_logs[prop_key].tail(5)
-                        last_10_games = game_logs[prop_key].tail(10)
-                        
-                        win_rate_5 = (
-                            (last_5_games > threshold if variation == "Over" else last_5_games < threshold)
-                            .mean() * 100
-                        )
-                        win_rate_10 = (
-                            (last_10_games > threshold if variation == "Over" else last_10_games < threshold)
-                            .mean() * 100
-                        )
-                        
-                        if show_hot and win_rate_5 < 80:
-                            continue
-                            
-                        if win_rate_5 < min_win_rate:
-                            continue
-                        
-                        # Get odds and calculate EV
-                        odds = 100  # Mock odds, replace with real odds API
-                        implied_prob = calculate_implied_probability(odds)
-                        ev = calculate_ev(odds, implied_prob)
-                        
-                        if ev < min_ev_input:
-                            continue
-                        
-                        prop_data = {
-                            "Player": player['name'],
-                            "Team": team,
-                            "Position": player['position'],
-                            "Prop": f"{variation} {threshold} {prop_type}",
-                            "Line": threshold,
-                            "Odds": format_american_odds(odds),
-                            "L5 Avg": f"{last_5_games.mean():.1f}",
-                            "L10 Avg": f"{last_10_games.mean():.1f}",
-                            "Win% L5": f"{win_rate_5:.0f}%",
-                            "Win% L10": f"{win_rate_10:.0f}%",
-                            "EV": ev,
-                            "Trend": "🔥" if win_rate_5 >= 80 else ("📈" if win_rate_5 > win_rate_10 else "📉")
-                        }
-                        all_props.append(prop_data)
+    rosters = {team: load_roster(team)
+               for team in (teams if teams and "All Teams" not in teams else HARDCODED_ROSTERS.keys())}
+    prop_lines = load_prop_lines(global_sport)
+    slate = load_games_frame(global_sport)
+    opponents = slate_opponents(slate['home_team'], slate['away_team']) if not slate.empty else {}
+    with stage('analyze', analyzer='correlations'):
+        correlations = load_slate_correlations(rosters)
+    with stage('analyze', analyzer='props'):
+        all_props = screen_player_props(
+            rosters, PROP_CATEGORIES, selected_props, variations,
+            prop_lines=prop_lines,
+            sport=global_sport,
+            positions=[p for p in positions if p != "All Positions"],
+            min_line=min_threshold,
+            min_ev=min_ev_input,
+            min_win_rate=min_win_rate,
+            hot_only=show_hot,
+            opponents=opponents,
+            fair=load_prop_fair_lines(global_sport)
+        )
     
     # Update prop count
     total_props = len(all_props)
@@ -403,59 +579,188 @@ elif page == "Props":
     
     # Display props table with enhanced formatting
     if all_props:
-        props_df = pd.DataFrame(all_props)
+        props_df = props_frame(all_props)
         
         # Add sorting functionality
         sort_col = st.selectbox("Sort By", props_df.columns)
         sort_order = st.radio("Order", ["Descending", "Ascending"], horizontal=True)
-        props_df = props_df.sort_values(sort_col, ascending=(sort_order == "Ascending"))
+        props_df = props_df.sort_values(sort_col, ascending=(sort_order == "Ascending"), kind='stable')
+        
+        # Only the visible page is styled and sent to the browser
+        page_cols = st.columns([1, 1, 3])
+        with page_cols[0]:
+            page_size = st.selectbox("Rows per page", [50, 100, 250, 500], index=1)
+        n_pages = max(1, -(-len(props_df) // page_size))
+        if st.session_state.get('props_page', 1) > n_pages:
+            st.session_state.props_page = n_pages
+        with page_cols[1]:
+            page_number = st.number_input("Page", min_value=1, max_value=n_pages, key='props_page')
+        with page_cols[2]:
+            st.caption(f"{len(props_df)} props, page {page_number} of {n_pages}")
+        page_df = props_df.iloc[(page_number - 1) * page_size:page_number * page_size]
         
         # Display table with conditional formatting
         st.dataframe(
-            props_df.style
-            .apply(lambda x: [
-                'background-color: lightgreen' if 'Win%' in col and float(str(val).strip('%')) >= 80
-                else 'background-color: yellow' if 'Win%' in col and float(str(val).strip('%')) >= 60
-                else 'background-color: lightcoral' if 'EV' in col and float(val) < 0
-                else 'background-color: lightgreen' if 'EV' in col and float(val) > 0
-                else '' for col, val in x.items()
-            ], axis=1)
+            page_df.style
+            .apply(prop_highlights, axis=None)
             .format({
                 'Line': '{:.1f}',
+                'Odds': '{:+.0f}',
                 'EV': '${:.2f}',
                 'L5 Avg': '{:.1f}',
-                'L10 Avg': '{:.1f}'
-            }),
+                'L10 Avg': '{:.1f}',
+                'Win% L5': '{:.0f}%',
+                'Win% L10': '{:.0f}%',
+                'Opp Allowed': '{:.1f}',
+                'Opp Rank': '{:.0f}'
+            }, na_rep='-'),
             use_container_width=True
         )
         
         # Save functionality
+        labels = dict(zip(page_df.index, page_df['Player'] + ' - ' + page_df['Prop']))
         selected_rows = st.multiselect(
             "Select props to save",
-            range(len(props_df)),
-            format_func=lambda x: f"{props_df.iloc[x]['Player']} - {props_df.iloc[x]['Prop']}"
+            list(labels),
+            format_func=labels.get
         )
         
+        # Only props with a posted price can be saved or parlayed
+        chosen = props_df.loc[selected_rows]
+        chosen = chosen[chosen['Odds'].notna()]
+        if len(chosen) < len(selected_rows):
+            st.caption(f"{len(selected_rows) - len(chosen)} selected props have no posted price and are skipped")
+
         if st.button("Save Selected Props"):
-            for idx in selected_rows:
-                prop = props_df.iloc[idx].to_dict()
-                if prop not in st.session_state.saved_props:
-                    st.session_state.saved_props.append(prop)
-            st.success(f"Saved {len(selected_rows)} props")
+            with db.connect() as conn:
+                added = save_props(conn, prop_owner(), chosen.to_dict('records'))
+            st.success(f"Saved {added} props ({len(chosen) - added} already saved)")
+
+        if len(chosen) >= 2:
+            st.subheader("Same-Game Parlay")
+            # Prop reads "<side> <line> <stat>"
+            side_stat = chosen['Prop'].str.split(' ', n=2, expand=True)
+            legs = [{'player': player, 'stat': stat.lower(), 'side': side, 'odds': odds}
+                    for player, side, stat, odds in zip(chosen['Player'], side_stat[0], side_stat[2], chosen['Odds'])]
+            parlay = correlations.price_parlay(legs)
+            parlay_cols = st.columns(4)
+            parlay_cols[0].metric("Parlay Odds", format_american_odds(parlay['parlay_odds']))
+            parlay_cols[1].metric("Independent", f"{parlay['independent_prob']:.1%}")
+            parlay_cols[2].metric("Correlated", f"{parlay['correlated_prob']:.1%}")
+            parlay_cols[3].metric("EV", f"${parlay['ev']:.2f}")
     else:
         st.info("No props found matching your criteria")
 
 elif page == "EV+":
+    from saved_props import query_props
+
     st.title("Expected Value Analysis")
-    ev_props = [p for p in st.session_state.saved_props if p['EV'] > 0]
-    if ev_props:
-        st.dataframe(pd.DataFrame(ev_props))
+    with db.connect() as conn:
+        ev_props = query_props(conn, prop_owner(), min_ev=0)
+    if not ev_props.empty:
+        st.dataframe(ev_props.drop(columns=['id', 'user_id']), use_container_width=True)
+
+        st.subheader("Stake Sizing")
+        # Sizing loads scipy (~1s) on first use, so it waits until asked for
+        if st.checkbox("Size stakes across the whole card"):
+            from portfolio import PortfolioKelly, card_correlation, saved_props_card
+            size_cols = st.columns(3)
+            with size_cols[0]:
+                bankroll = st.number_input("Bankroll ($)", 10.0, 1_000_000.0, 1000.0, step=100.0)
+                kelly_fraction = st.slider("Kelly fraction", 0.1, 1.0, 0.5, 0.05)
+            with size_cols[1]:
+                max_bet = st.slider("Max per bet (%)", 0.5, 10.0, 5.0, 0.5) / 100
+                max_game = st.slider("Max per game (%)", 1.0, 25.0, 10.0, 0.5) / 100
+            with size_cols[2]:
+                max_total = st.slider("Max total (%)", 1.0, 50.0, 25.0, 1.0) / 100
+                same_game = st.slider("Same-game correlation", 0.0, 0.9, 0.2, 0.05,
+                                      help="Assumed outcome correlation of props in the same game; "
+                                           "same-player props get at least 0.5")
+
+            # Kept per session so resizing after a slider change starts from the last stakes
+            if 'kelly_sizer' not in st.session_state:
+                st.session_state.kelly_sizer = PortfolioKelly()
+            sizer = st.session_state.kelly_sizer
+            card = saved_props_card(ev_props, load_prop_fair_lines(global_sport), global_sport)
+            if len(card) < (ev_props['result'] == 'pending').sum():
+                st.caption("Props whose line is no longer posted have no fair price and are not sized")
+            sized = sizer.size(card, bankroll, corr=card_correlation(card, same_game, max(same_game, 0.5)),
+                               fraction=kelly_fraction, max_bet=max_bet, max_game=max_game, max_total=max_total)
+            sized['independent_stake'] = (sized['independent_kelly'] * bankroll).round(2)
+
+            metric_cols = st.columns(3)
+            metric_cols[0].metric("Card stake", f"${sized['stake'].sum():,.2f}",
+                                  f"{sized['stake'].sum() - sized['independent_stake'].sum():+,.2f} vs one at a time")
+            metric_cols[1].metric("Expected log growth", f"{sizer.last['growth'] * 100:.2f}%")
+            metric_cols[2].metric("Solve time", f"{sizer.last['seconds'] * 1000:.0f} ms",
+                                  f"{sizer.last['iterations']} iterations", delta_color="off")
+            st.dataframe(sized[['player', 'team', 'market', 'side', 'line', 'odds', 'prob', 'books',
+                                'independent_stake', 'stake']].sort_values('stake', ascending=False),
+                         use_container_width=True)
     else:
         st.info("No positive EV props saved yet")
 
+elif page == "Diagnostics":
+    st.title("Diagnostics")
+    snapshot = METRICS.snapshot()
+    timers = pd.DataFrame(snapshot['timers'])
+    counters = pd.DataFrame(snapshot['counters'])
+
+    st.subheader("Stage latency")
+    if not timers.empty and (timers['name'] == 'stage').any():
+        st.dataframe(timers[timers['name'] == 'stage'].drop(columns='name').dropna(axis=1, how='all'),
+                     use_container_width=True)
+    else:
+        st.info("No stages timed yet")
+
+    st.subheader("Upstream calls")
+    if not timers.empty and (timers['name'] == 'upstream').any():
+        st.dataframe(timers[timers['name'] == 'upstream'].drop(columns='name').dropna(axis=1, how='all'),
+                     use_container_width=True)
+        if not counters.empty and (counters['name'] == 'upstream.errors').any():
+            st.dataframe(counters[counters['name'] == 'upstream.errors'].drop(columns='name')
+                         .dropna(axis=1, how='all'), use_container_width=True)
+    else:
+        st.info("No upstream calls yet")
+
+    st.subheader("Caches")
+    cache_cols = st.columns(2)
+    with cache_cols[0]:
+        ratios = METRICS.cache_ratios()
+        if ratios:
+            st.dataframe(pd.DataFrame({'cache': list(ratios), 'hit_ratio': list(ratios.values())}),
+                         use_container_width=True)
+    with cache_cols[1]:
+        st.dataframe(get_snapshots().stats(), use_container_width=True)
+
+    if ADAPTIVE_REFRESH:
+        st.subheader("Odds refresh schedule")
+        scheduler = get_refresh_scheduler()
+        st.caption(f"{scheduler.budget.spent}/{scheduler.budget.limit} credits this hour, "
+                   f"intervals stretched x{scheduler.stretch():.2f} to fit")
+        st.dataframe(scheduler.plan(), use_container_width=True)
+
+    st.subheader("Sampling profiler")
+    if PROFILER.running:
+        if st.button("Stop profiler"):
+            PROFILER.stop()
+            st.rerun()
+    elif st.button("Start profiler"):
+        PROFILER.start()
+        st.rerun()
+    if PROFILER.samples:
+        st.caption(f"{PROFILER.samples} samples every {PROFILER.interval * 1000:.0f} ms")
+        st.dataframe(pd.DataFrame(PROFILER.top(25)), use_container_width=True)
+
+METRICS.observe('stage', time.perf_counter() - render_started, stage='render', page=page)
+
 # Auto-refresh control
 st.sidebar.markdown("---")
 auto_refresh = st.sidebar.checkbox("Auto-refresh")
 if auto_refresh:
-    time.sleep(30)
+    # With the scheduler running, rerun when the next odds for this sport land instead of a flat 30s
+    wait = 30
+    if ADAPTIVE_REFRESH:
+        wait = min(wait, max(2, get_refresh_scheduler().next_refresh_in(global_sport) + 1))
+    time.sleep(wait)
     st.rerun()
@@ -0,0 +1,276 @@
+"""Process-wide instrumentation: stage timers, upstream call stats, cache ratios, structured logs.
+
+    from metrics import get_logger, stage, upstream, cache_lookup
+
+    log = get_logger(__name__)
+    with stage('fetch'):
+        with upstream('odds_api', 'odds'):
+            response = requests.get(...)
+
+METRICS_PORT=9108 serves the counters as Prometheus text on /metrics and JSON
+on /metrics.json; the app's Diagnostics page reads the same registry.
+LOG_FORMAT=json switches log lines to one JSON object each. PROFILE_SAMPLING=1
+starts a sampling profiler that counts where every thread is spending time.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+SAMPLE_WINDOW = 512  # latency samples kept per timer for percentiles
+PROFILE_INTERVAL = 0.005
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; anything passed as extra= becomes a field"""
+    RESERVED = set(vars(logging.makeLogRecord({})))
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in self.RESERVED and k != 'message'})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_logging_configured = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    global _logging_configured
+    if not _logging_configured:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json'
+                             else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root = logging.getLogger('sports')
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _logging_configured = True
+    return logging.getLogger(f"sports.{name}")
+
+
+class Timer:
+    """Count, total and a window of recent samples for percentiles"""
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def pct(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+        return {'count': self.count, 'total_s': round(self.total, 4),
+                'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                'p50_ms': round(pct(0.5), 3), 'p95_ms': round(pct(0.95), 3), 'max_ms': round(self.max * 1000, 3)}
+
+
+class Metrics:
+    """Thread-safe registry of timers and counters keyed by (name, labels)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers: Dict[tuple, Timer] = defaultdict(Timer)
+        self.counters: Counter = Counter()
+
+    def observe(self, name: str, seconds: float, **labels):
+        with self._lock:
+            self.timers[(name, tuple(sorted(labels.items())))].observe(seconds)
+
+    def incr(self, name: str, amount: int = 1, **labels):
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            timers = [{'name': name, **dict(labels), **timer.summary()} for (name, labels), timer in self.timers.items()]
+            counters = [{'name': name, **dict(labels), 'value': value}
+                        for (name, labels), value in self.counters.items()]
+        return {'timers': timers, 'counters': counters}
+
+    def cache_ratios(self) -> Dict[str, float]:
+        """Hit ratio per cache from the cache.lookups counter"""
+        hits, totals = Counter(), Counter()
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if name == 'cache.lookups':
+                    labels = dict(labels)
+                    totals[labels['cache']] += value
+                    if labels['result'] == 'hit':
+                        hits[labels['cache']] += value
+        return {cache: hits[cache] / total for cache, total in totals.items() if total}
+
+    def prometheus(self) -> str:
+        """Counters and timer totals in the Prometheus text exposition format"""
+        def fmt(name, labels):
+            name = 'sports_' + name.replace('.', '_')
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            return f"{name}{{{label_text}}}" if label_text else name
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{fmt(name + '_total', labels)} {value}")
+            for (name, labels), timer in sorted(self.timers.items()):
+                lines.append(f"{fmt(name + '_seconds_count', labels)} {timer.count}")
+                lines.append(f"{fmt(name + '_seconds_sum', labels)} {timer.total:.6f}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+log = get_logger('metrics')
+
+
+@contextmanager
+def stage(name: str, **labels):
+    """Time one pipeline/page stage: fetch, normalize, analyze, render"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe('stage', time.perf_counter() - start, stage=name, **labels)
+
+
+@contextmanager
+def upstream(service: str, endpoint: str):
+    """Count and time one upstream call; an exception counts as an error and propagates"""
+    start = time.perf_counter()
+    METRICS.incr('upstream.calls', service=service, endpoint=endpoint)
+    try:
+        yield
+    except Exception as e:
+        METRICS.incr('upstream.errors', service=service, endpoint=endpoint, error=type(e).__name__)
+        raise
+    finally:
+        METRICS.observe('upstream', time.perf_counter() - start, service=service, endpoint=endpoint)
+
+
+def upstream_error(service: str, endpoint: str, error: str):
+    """Record an upstream failure that didn't raise, e.g. a non-200 response"""
+    METRICS.incr('upstream.errors', service=service, endpoint=endpoint, error=error)
+
+
+def cache_lookup(cache: str, hit: bool):
+    METRICS.incr('cache.lookups', cache=cache, result='hit' if hit else 'miss')
+
+
+class SamplingProfiler:
+    """Samples every thread's stack on an interval and counts the innermost app frames
+
+    Cheap enough to leave on in production: one sys._current_frames() call per
+    interval, no tracing hooks.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, root: Optional[str] = None):
+        self.interval = interval
+        self.root = root or os.path.dirname(os.path.abspath(__file__))
+        self.frames: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name='sampling-profiler')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                # Attribute the sample to the deepest frame in our own code
+                while frame is not None and not frame.f_code.co_filename.startswith(self.root):
+                    frame = frame.f_back
+                if frame is not None:
+                    code = frame.f_code
+                    self.frames[f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"] += 1
+            self.samples += 1
+
+    def top(self, n: int = 20) -> list:
+        return [{'frame': frame, 'samples': count, 'share': count / max(self.samples, 1)}
+                for frame, count in self.frames.most_common(n)]
+
+
+PROFILER = SamplingProfiler()
+if os.getenv('PROFILE_SAMPLING', '').lower() in ('1', 'true', 'yes'):
+    PROFILER.start()
+
+
+_server = None
+
+
+def serve_metrics(port: int = METRICS_PORT, host: str = '127.0.0.1'):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; idempotent"""
+    global _server
+    if _server is not None or not port:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = METRICS.prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                payload = {**METRICS.snapshot(), 'cache_ratios': METRICS.cache_ratios(), 'profile': PROFILER.top()}
+                body, content_type = json.dumps(payload, default=str).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        _server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        log.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+    threading.Thread(target=_server.serve_forever, daemon=True, name='metrics-http').start()
+    log.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return _server
@@ -0,0 +1,227 @@
+"""Local odds hub: one process polls the odds API and pushes per-market diffs to subscribers.
+
+    python odds_hub.py --sports NBA NFL --port 8765 --interval 30
+
+Clients send {"type": "subscribe", "sports": ["NBA"]}, receive a full
+"snapshot" message, then only "diff" messages carrying changed and removed
+prices and the games that dropped off the slate. Set ODDS_HUB_URL (e.g.
+ws://localhost:8765) to make the dashboard read from the hub instead of
+polling upstream itself. With --record the hub also appends every price
+move to odds_snapshots through the async db engine.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set
+import websockets
+import db
+from metrics import get_logger, serve_metrics
+from utils import SPORT_KEYS, iter_odds, fetch_odds_snapshot
+
+ODDS_HUB_URL = os.getenv('ODDS_HUB_URL')
+HUB_HOST = 'localhost'
+HUB_PORT = 8765
+POLL_INTERVAL = 30
+
+log = get_logger(__name__)
+
+
+def flatten_snapshot(games: list):
+    """(prices, games) from raw odds: prices keyed by (game, book, market, outcome, player)"""
+    prices, meta = {}, {}
+    for (game_id, sport, commence_time, home, away, book, market, outcome, player,
+         point, price, _) in iter_odds(games):
+        prices[(game_id, book, market, outcome, player)] = (None if point != point else point, price)
+        meta[game_id] = [sport, commence_time, home, away]
+    for game in games:
+        meta.setdefault(str(game.get('id', '')), [game.get('sport_key', ''), game.get('commence_time', ''),
+                                                  game.get('home_team', ''), game.get('away_team', '')])
+    return prices, meta
+
+
+def diff_prices(old: Dict, new: Dict):
+    """Rows that changed or appeared, and keys that disappeared"""
+    upserts = [[*key, *value] for key, value in new.items() if old.get(key) != value]
+    removes = [list(key) for key in old.keys() - new.keys()]
+    return upserts, removes
+
+
+def build_games(prices: Dict, meta: Dict) -> list:
+    """Rebuild the odds API game shape from flat hub state for the existing analyzers"""
+    books = defaultdict(lambda: defaultdict(list))
+    for (game_id, book, market, outcome, player), (point, price) in prices.items():
+        entry = {'name': outcome, 'price': price}
+        if player:
+            entry['description'] = player
+        if point is not None:
+            entry['point'] = point
+        books[(game_id, book)][market].append(entry)
+
+    games = {}
+    for game_id, (sport, commence_time, home, away) in meta.items():
+        games[game_id] = {'id': game_id, 'sport_key': sport, 'commence_time': commence_time,
+                          'home_team': home, 'away_team': away, 'bookmakers': []}
+    for (game_id, book), markets in books.items():
+        if game_id in games:
+            games[game_id]['bookmakers'].append({
+                'key': book,
+                'title': book,
+                'markets': [{'key': key, 'outcomes': outcomes} for key, outcomes in markets.items()]
+            })
+    return list(games.values())
+
+
+class OddsHub:
+    """Owns upstream polling and fans out compact diffs over websockets"""
+
+    def __init__(self, sports: List[str], fetch: Callable[[str], list] = fetch_odds_snapshot,
+                 interval: float = POLL_INTERVAL, record: bool = False):
+        self.sports = [s.upper() for s in sports]
+        self.fetch = fetch
+        self.interval = interval
+        self.record = record
+        self.prices: Dict[str, Dict] = {sport: {} for sport in self.sports}
+        self.meta: Dict[str, Dict] = {sport: {} for sport in self.sports}
+        self.versions: Dict[str, int] = {sport: 0 for sport in self.sports}
+        self.subscribers: Dict[str, Set] = {sport: set() for sport in self.sports}
+
+    async def poll_once(self, sport: str) -> Optional[Dict]:
+        """Fetch one sport, update state and broadcast the diff; returns the message sent"""
+        fetched_at = time.time()
+        games = await asyncio.to_thread(self.fetch, sport)
+        if not games:
+            # fetch_odds_snapshot returns [] on any upstream error; diffing that would wipe every slate
+            log.warning("Empty %s odds fetch; keeping the last slate", sport)
+            return None
+        if self.record:
+            await db.save_odds_snapshot_async(games, fetched_at)
+        prices, meta = flatten_snapshot(games)
+        upserts, removes = diff_prices(self.prices[sport], prices)
+        new_games = {gid: info for gid, info in meta.items() if gid not in self.meta[sport]}
+        ended_games = [gid for gid in self.meta[sport] if gid not in meta]
+        self.prices[sport], self.meta[sport] = prices, meta
+        if not (upserts or removes or new_games or ended_games):
+            return None
+
+        self.versions[sport] += 1
+        message = {'type': 'diff', 'sport': sport, 'version': self.versions[sport],
+                   'time': time.time(), 'games': new_games, 'ended_games': ended_games,
+                   'upserts': upserts, 'removes': removes}
+        websockets.broadcast(self.subscribers[sport], json.dumps(message, separators=(',', ':')))
+        return message
+
+    def snapshot_message(self, sport: str) -> Dict:
+        return {'type': 'snapshot', 'sport': sport, 'version': self.versions[sport], 'time': time.time(),
+                'games': self.meta[sport], 'upserts': [[*k, *v] for k, v in self.prices[sport].items()],
+                'removes': []}
+
+    async def poll_forever(self, sport: str):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once(sport)
+            except Exception as e:
+                log.error("Error polling %s: %s", sport, e)
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    async def handler(self, websocket):
+        joined = []
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                if request.get('type') != 'subscribe':
+                    continue
+                for sport in request.get('sports', []):
+                    sport = sport.upper()
+                    if sport in self.subscribers and sport not in joined:
+                        joined.append(sport)
+                        self.subscribers[sport].add(websocket)
+                        await websocket.send(json.dumps(self.snapshot_message(sport), separators=(',', ':')))
+        except (websockets.ConnectionClosed, json.JSONDecodeError):
+            pass
+        finally:
+            for sport in joined:
+                self.subscribers[sport].discard(websocket)
+
+    async def serve(self, host: str = HUB_HOST, port: int = HUB_PORT):
+        async with websockets.serve(self.handler, host, port):
+            await asyncio.gather(*(self.poll_forever(sport) for sport in self.sports))
+
+
+class OddsHubClient:
+    """Mirror of the hub's state for the requested sports, kept current on a background thread"""
+
+    def __init__(self, url: str, sports: List[str]):
+        self.url = url
+        self.sports = [s.upper() for s in sports]
+        self.prices: Dict[str, Dict] = defaultdict(dict)
+        self.meta: Dict[str, Dict] = defaultdict(dict)
+        self.versions: Dict[str, int] = defaultdict(int)
+        self.updated_at: Dict[str, float] = {}
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True,
+                                        name='odds-hub-client')
+        self._thread.start()
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Call back with every applied diff message"""
+        self._listeners.append(callback)
+
+    def apply(self, message: Dict):
+        sport = message['sport']
+        with self._lock:
+            if message['type'] == 'snapshot':
+                self.prices[sport] = {}
+                self.meta[sport] = {}
+            self.meta[sport].update(message.get('games', {}))
+            for game_id in message.get('ended_games', []):
+                self.meta[sport].pop(game_id, None)
+            prices = self.prices[sport]
+            for row in message.get('upserts', []):
+                prices[tuple(row[:5])] = (row[5], row[6])
+            for row in message.get('removes', []):
+                prices.pop(tuple(row), None)
+            self.versions[sport] = message['version']
+            self.updated_at[sport] = message['time']
+        for callback in self._listeners:
+            callback(message)
+
+    def games(self, sport: str) -> list:
+        with self._lock:
+            return build_games(dict(self.prices[sport.upper()]), dict(self.meta[sport.upper()]))
+
+    async def _run(self):
+        while True:
+            try:
+                async for message in subscribe(self.url, self.sports):
+                    self.apply(message)
+            except (OSError, websockets.WebSocketException) as e:
+                log.warning("Odds hub connection lost: %s", e)
+            await asyncio.sleep(5)
+
+
+async def subscribe(url: str, sports: List[str]):
+    """Async iterator over hub messages for headless consumers"""
+    async with websockets.connect(url) as websocket:
+        await websocket.send(json.dumps({'type': 'subscribe', 'sports': sports}))
+        async for raw in websocket:
+            yield json.loads(raw)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Poll odds upstream and push diffs to subscribers")
+    parser.add_argument('--sports', nargs='+', default=['NBA'], choices=list(SPORT_KEYS.keys()))
+    parser.add_argument('--host', default=HUB_HOST)
+    parser.add_argument('--port', type=int, default=HUB_PORT)
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--record', action='store_true', help="append price moves to odds_snapshots")
+    args = parser.parse_args()
+
+    serve_metrics()
+    asyncio.run(OddsHub(args.sports, interval=args.interval, record=args.record).serve(args.host, args.port))
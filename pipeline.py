@@ -0,0 +1,166 @@
+"""Headless screening pipeline: EV scan, arbitrage, middles and props without Streamlit.
+
+    python pipeline.py --sports NBA NFL --once --format parquet
+    python pipeline.py --sports NBA --interval 300 --props
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+import pandas as pd
+from utils import SPORT_KEYS, fetch_odds_snapshot, slate_opponents
+from best_lines import BestLineIndex
+from data_utils import identify_arbitrage_opportunities
+from betting_analysis import find_high_ev_opportunities, find_enhanced_middles, screen_player_props, props_frame
+from prop_odds import PROP_CATEGORIES
+from fair_lines import fair_lines
+from metrics import METRICS, serve_metrics
+
+OUTPUT_FORMATS = ('parquet', 'csv', 'jsonl')
+
+# Best prices per sport, carried across passes so each one only applies what moved
+BEST_LINES: Dict[str, BestLineIndex] = defaultdict(BestLineIndex)
+
+
+class StageTimer:
+    """Wall-clock samples per pipeline stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def time(self, stage: str, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples[stage].append(elapsed)
+            METRICS.observe('stage', elapsed, stage=stage, source='pipeline')
+
+    def summary(self) -> pd.DataFrame:
+        rows = []
+        for stage, samples in self.samples.items():
+            rows.append({
+                'stage': stage,
+                'runs': len(samples),
+                'total_s': sum(samples),
+                'mean_ms': statistics.mean(samples) * 1000,
+                'p50_ms': statistics.median(samples) * 1000,
+                'max_ms': max(samples) * 1000
+            })
+        return pd.DataFrame(rows)
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: str) -> str:
+    path = f"{path}.{fmt}"
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        df.to_json(path, orient='records', lines=True, date_format='iso')
+    return path
+
+
+def screen_sport_props(snapshot: list, sport: str, prop_lines: dict, fair: pd.DataFrame) -> list:
+    from team_data import fetch_team_players
+
+    opponents = slate_opponents([game['home_team'] for game in snapshot], [game['away_team'] for game in snapshot])
+    rosters = {team: fetch_team_players(team) for team in sorted(opponents)}
+    return screen_player_props(rosters, PROP_CATEGORIES, list(PROP_CATEGORIES),
+                               prop_lines=prop_lines, sport=sport, opponents=opponents, fair=fair)
+
+
+def run_sport(sport: str, args, timer: StageTimer) -> Dict[str, pd.DataFrame]:
+    fetched_at = time.time()
+    snapshot = timer.time('fetch', fetch_odds_snapshot, sport, args.markets)
+    if args.archive:
+        from archive import archive_odds_snapshot
+        timer.time('archive', archive_odds_snapshot, snapshot, fetched_at)
+    index = BEST_LINES[sport]
+    timer.time('index', index.update_from_games, snapshot, fetched_at)
+
+    results = {
+        'ev': timer.time('ev', find_high_ev_opportunities, snapshot, args.min_ev, index),
+        'arbitrage': pd.DataFrame(timer.time('arbitrage', identify_arbitrage_opportunities, snapshot, index)),
+        'middles': pd.DataFrame(timer.time('middles', find_enhanced_middles, snapshot, args.min_middle))
+    }
+    if args.props and sport == 'NBA':
+        from prop_odds import fetch_slate_props, summarize_props
+
+        prop_odds = timer.time('fetch_props', fetch_slate_props, sport)
+        prop_lines = summarize_props(prop_odds)
+        prop_fair = timer.time('prop_fair', fair_lines, prop_odds)
+        results['props'] = props_frame(timer.time('props', screen_sport_props, snapshot, sport, prop_lines, prop_fair))
+    return results
+
+
+def run_once(args, timer: StageTimer) -> List[str]:
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+    written = []
+    for sport in args.sports:
+        results = timer.time('sport_total', run_sport, sport, args, timer)
+        for name, df in results.items():
+            if df.empty and not args.write_empty:
+                continue
+            path = os.path.join(args.output_dir, f"{sport.lower()}_{name}_{stamp}")
+            written.append(timer.time('write', write_frame, df, path, args.format))
+            print(f"{sport} {name}: {len(df)} rows -> {written[-1]}")
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the betting screens without a browser session")
+    parser.add_argument('--sports', nargs='+', default=['NBA'], choices=list(SPORT_KEYS.keys()))
+    parser.add_argument('--markets', default='h2h,spreads,totals')
+    parser.add_argument('--min-ev', type=float, default=5.0)
+    parser.add_argument('--min-middle', type=float, default=1.0)
+    parser.add_argument('--props', action='store_true', help="also screen NBA player props (slow: nba_api)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet')
+    parser.add_argument('--output-dir', default='results')
+    parser.add_argument('--write-empty', action='store_true')
+    parser.add_argument('--archive', action='store_true',
+                        help="append every fetched snapshot to the Parquet history archive (see archive.py)")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="use seeded synthetic data instead of the APIs (scale with SYNTHETIC_SCALE)")
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument('--once', action='store_true', help="run one pass and exit (default)")
+    when.add_argument('--interval', type=int, help="seconds between passes")
+    parser.add_argument('--runs', type=int, help="stop after this many passes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.synthetic:
+        os.environ['SYNTHETIC_DATA'] = '1'
+    os.makedirs(args.output_dir, exist_ok=True)
+    serve_metrics()  # no-op unless METRICS_PORT is set
+    timer = StageTimer()
+    runs = 0
+    try:
+        while True:
+            started = time.monotonic()
+            timer.time('pass', run_once, args, timer)
+            runs += 1
+            if not args.interval or (args.runs and runs >= args.runs):
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    if args.archive:
+        from archive import compact
+        timer.time('compact', compact, 'odds')
+
+    summary = timer.summary()
+    if not summary.empty:
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Simultaneous (fractional) Kelly stakes for a card of bets.
+
+stats_utils.calculate_kelly_criterion sizes one bet as if it were the only
+one. Here the whole card is sized together: stakes maximise the expected log
+bankroll over correlated win/loss scenarios drawn from a Gaussian copula (the
+same construction correlation_utils uses for parlays), subject to a per-bet
+cap, a per-game cap and a cap on the whole card, solved with scipy's SLSQP.
+Full Kelly is solved with the caps divided by the Kelly fraction and then
+scaled back down, so the returned stakes respect the caps as given.
+
+Each solve is warm-started from the previous stakes of bets with the same key,
+so resizing a card after one bet is added or a price moves takes a few
+iterations.
+"""
+import time
+from typing import Dict, Hashable, Optional
+import numpy as np
+import pandas as pd
+from metrics import get_logger
+
+KELLY_FRACTION = 0.5
+MAX_BET = 0.05      # share of bankroll on one bet, as calculate_kelly_criterion caps it
+MAX_GAME = 0.10     # share of bankroll on bets sharing a game
+MAX_TOTAL = 0.25    # share of bankroll on the whole card
+SCENARIOS = 4000
+MAX_ITER = 200
+
+log = get_logger(__name__)
+
+
+def decimal_odds(odds) -> np.ndarray:
+    """American odds to decimal (stake included), vectorized"""
+    odds = np.asarray(odds, dtype=float)
+    return np.where(odds > 0, 1 + odds / 100, 1 + 100 / np.abs(odds))
+
+
+def independent_kelly(prob, odds) -> np.ndarray:
+    """Single-bet Kelly fraction of each bet on its own, floored at 0"""
+    b = decimal_odds(odds) - 1
+    prob = np.asarray(prob, dtype=float)
+    return np.clip((prob * b - (1 - prob)) / b, 0, None)
+
+
+def card_correlation(bets: pd.DataFrame, same_game: float = 0.0, same_player: float = 0.0) -> np.ndarray:
+    """Latent correlation between bets' outcomes from shared game and player
+
+    Bets on opposite sides ('Over'/'Under') of the same player and market move
+    against each other, so their correlation is negated.
+    """
+    n = len(bets)
+    corr = np.zeros((n, n))
+    if 'game' in bets:
+        game = bets['game'].to_numpy()
+        corr = np.where(game[:, None] == game[None, :], same_game, corr)
+    if 'player' in bets:
+        player = bets['player'].to_numpy()
+        same = player[:, None] == player[None, :]
+        corr = np.where(same, np.maximum(corr, same_player), corr)
+        if 'side' in bets and 'market' in bets:
+            market, side = bets['market'].to_numpy(), bets['side'].to_numpy()
+            opposite = same & (market[:, None] == market[None, :]) & (side[:, None] != side[None, :])
+            corr = np.where(opposite, -np.abs(corr), corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+class PortfolioKelly:
+    """Sizes cards of bets jointly; keeps the last stakes per bet key for warm starts"""
+
+    def __init__(self, n_scenarios: int = SCENARIOS, seed: int = 0):
+        self.n_scenarios = n_scenarios
+        self.seed = seed
+        self.last: Dict = {}
+        self._warm: Dict[Hashable, float] = {}
+
+    def scenarios(self, prob: np.ndarray, corr: Optional[np.ndarray]) -> np.ndarray:
+        """Boolean wins, n_scenarios x bets; the same seed every call so warm starts stay near the optimum"""
+        rng = np.random.default_rng(self.seed)
+        z = rng.standard_normal((self.n_scenarios, len(prob)))
+        if corr is not None:
+            from correlation_utils import _nearest_correlation
+            z = z @ np.linalg.cholesky(_nearest_correlation(np.asarray(corr, dtype=float))).T
+        # Thresholds at each column's own empirical quantile make every bet win exactly prob of the
+        # scenarios, so sampling noise only touches the dependence, not each bet's edge
+        ranks = np.clip(np.round(prob * self.n_scenarios).astype(int), 0, self.n_scenarios - 1)
+        thresholds = np.sort(z, axis=0)[ranks, np.arange(len(prob))]
+        return z < thresholds
+
+    def size(self, bets: pd.DataFrame, bankroll: float, corr=None, fraction: float = KELLY_FRACTION,
+             max_bet: float = MAX_BET, max_game: float = MAX_GAME, max_total: float = MAX_TOTAL) -> pd.DataFrame:
+        """Stakes for every bet on the card
+
+        bets needs 'prob' (model win probability) and American 'odds'; 'game'
+        groups bets for max_game and 'key' identifies a bet across calls
+        (defaults to the index). corr is an optional bets x bets latent
+        correlation matrix, e.g. from card_correlation or CorrelationService.
+        Adds 'kelly' (share of bankroll), 'stake' and 'independent_kelly'.
+        """
+        from scipy.optimize import minimize  # ~1s to import; only needed once a card is sized
+
+        started = time.perf_counter()
+        result = bets.copy()
+        prob = result['prob'].to_numpy(dtype=float)
+        payout = decimal_odds(result['odds']) - 1
+        alone = independent_kelly(prob, result['odds'])
+        result['independent_kelly'] = np.minimum(alone * fraction, max_bet)
+        result['kelly'] = 0.0
+        keys = list(result['key'] if 'key' in result else result.index)
+
+        # Bets with no edge on their own are only worth holding as hedges; a card of value bets has none
+        live = np.flatnonzero(alone > 0)
+        self.last = {'bets': len(result), 'sized': len(live), 'iterations': 0, 'success': True, 'growth': 0.0}
+        if len(live) == 0:
+            result['stake'] = 0.0
+            self.last['seconds'] = time.perf_counter() - started
+            return result
+
+        wins = self.scenarios(prob[live], None if corr is None else np.asarray(corr)[np.ix_(live, live)])
+        returns = np.where(wins, payout[live], -1.0)
+        scale = 1 / fraction
+        cap_bet, cap_total = min(max_bet * scale, 1.0), min(max_total * scale, 0.99)
+
+        constraints = [{'type': 'ineq', 'fun': lambda f: cap_total - f.sum(),
+                        'jac': lambda f: -np.ones_like(f)}]
+        if 'game' in result:
+            games = pd.factorize(result['game'].to_numpy()[live])[0]
+            membership = (games[None, :] == np.arange(games.max() + 1)[:, None]).astype(float)
+            shared = membership[membership.sum(axis=1) > 1]
+            if len(shared):
+                cap_game = max_game * scale
+                constraints.append({'type': 'ineq', 'fun': lambda f: cap_game - shared @ f,
+                                    'jac': lambda f: -shared})
+
+        def objective(f):
+            wealth = np.maximum(1 + returns @ f, 1e-12)
+            value = -np.log(wealth).mean()
+            grad = -(returns / wealth[:, None]).mean(axis=0)
+            return value, grad
+
+        start = np.array([self._warm.get(keys[i], min(alone[i], cap_bet)) for i in live])
+        # A cold start past the card cap is pulled back inside so SLSQP starts feasible
+        if start.sum() > cap_total:
+            start *= cap_total / start.sum()
+        solution = minimize(objective, start, jac=True, method='SLSQP', bounds=[(0.0, cap_bet)] * len(live),
+                            constraints=constraints, options={'maxiter': MAX_ITER, 'ftol': 1e-9})
+        if not solution.success:
+            log.warning("Kelly sizing did not converge: %s", solution.message)
+        full = np.clip(solution.x, 0.0, cap_bet)
+
+        self._warm.update({keys[i]: value for i, value in zip(live, full)})
+        result.iloc[live, result.columns.get_loc('kelly')] = full * fraction
+        result['kelly'] = result['kelly'].round(6)
+        result['stake'] = (result['kelly'] * bankroll).round(2)
+        self.last.update({
+            'iterations': int(solution.nit),
+            'success': bool(solution.success),
+            'growth': float(np.log(np.maximum(1 + returns @ (full * fraction), 1e-12)).mean()),
+            'exposure': float(result['kelly'].sum()),
+            'seconds': time.perf_counter() - started
+        })
+        return result
+
+
+def saved_props_card(props: pd.DataFrame, fair: pd.DataFrame, sport: str = 'NBA') -> pd.DataFrame:
+    """Pending saved props still posted, priced at the books' no-vig consensus for their line
+
+    fair is a fair_lines table of the sport's prop odds. Its game ids key the
+    per-game cap, taking the player's next game when the slate has several;
+    props whose line is no longer posted are left off the card.
+    """
+    from prop_odds import PLAYER_MARKETS
+
+    card = props[props.get('result', 'pending') == 'pending'].copy()
+    card['key'] = card['id'] if 'id' in card else card.index
+    card['market_key'] = card['market'].map(PLAYER_MARKETS.get(sport, {}))
+    # Every book's row of an outcome carries the same consensus
+    consensus = (fair.sort_values('commence_time', kind='stable')
+                 .drop_duplicates(['market', 'player', 'outcome', 'point'])
+                 [['game_id', 'market', 'player', 'outcome', 'point', 'consensus', 'books']]
+                 .rename(columns={'game_id': 'game', 'market': 'market_key', 'outcome': 'side',
+                                  'point': 'line', 'consensus': 'prob'}))
+    card = card.merge(consensus, on=['player', 'market_key', 'side', 'line'], how='inner')
+    return card.drop(columns='market_key')
@@ -0,0 +1,173 @@
+import os
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from metrics import get_logger, upstream, upstream_error
+from transport import get_session
+from utils import SPORT_KEYS, ODDS_API_URL, ODDS_COLUMNS, normalize_odds, use_synthetic_data
+
+log = get_logger(__name__)
+
+# App prop names -> the-odds-api player market keys
+PLAYER_MARKETS = {
+    'NBA': {
+        'Points': 'player_points',
+        'Rebounds': 'player_rebounds',
+        'Assists': 'player_assists',
+        'Threes Made': 'player_threes',
+        'Blocks': 'player_blocks',
+        'Steals': 'player_steals'
+    },
+    'NFL': {
+        'Passing Yards': 'player_pass_yds',
+        'Rushing Yards': 'player_rush_yds',
+        'Receiving Yards': 'player_reception_yds',
+        'Receptions': 'player_receptions'
+    },
+    'MLB': {
+        'Hits': 'player_hits',
+        'Total Bases': 'player_total_bases',
+        'Strikeouts': 'pitcher_strikeouts'
+    },
+    'NHL': {
+        'Points': 'player_points',
+        'Shots On Goal': 'player_shots_on_goal',
+        'Goals': 'player_goals'
+    }
+}
+
+# Fallback lines screened when no book has posted one
+PROP_CATEGORIES = {
+    "Points": {"thresholds": [10, 15, 20]},
+    "Rebounds": {"thresholds": [5, 10, 15]},
+    "Assists": {"thresholds": [3, 5, 7]}
+}
+
+CREDIT_BUDGET = int(os.getenv('ODDS_API_CREDIT_BUDGET', '500'))
+MAX_WORKERS = 8
+
+
+class CreditBudget:
+    """Thread-safe tracker of the-odds-api usage credits for one ingestion run"""
+
+    def __init__(self, limit: int = CREDIT_BUDGET):
+        self.limit = limit
+        self.spent = 0
+        self.remaining: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: int) -> bool:
+        """Claim credits before a request; False if it would exceed the budget"""
+        with self._lock:
+            if self.spent + cost > self.limit:
+                return False
+            if self.remaining is not None and cost > self.remaining:
+                return False
+            self.spent += cost
+            return True
+
+    def settle(self, reserved: int, headers) -> None:
+        """Replace a reservation with what the API reports it actually charged"""
+        with self._lock:
+            last = headers.get('x-requests-last')
+            if last is not None:
+                self.spent += int(float(last)) - reserved
+            remaining = headers.get('x-requests-remaining')
+            if remaining is not None:
+                self.remaining = int(float(remaining))
+
+
+def fetch_events(sport: str, base_url: str = ODDS_API_URL, session=None) -> List[Dict]:
+    """List upcoming events for a sport (the events endpoint costs no credits)"""
+    try:
+        session = session or get_session()
+        sport_key = SPORT_KEYS.get(sport.upper(), sport.lower())
+        with upstream('odds_api', 'events'):
+            response = session.get(f"{base_url}/sports/{sport_key}/events",
+                                   params={'apiKey': os.getenv('THE_ODDS_API_KEY')})
+        if response.status_code != 200:
+            upstream_error('odds_api', 'events', f"HTTP {response.status_code}")
+            return []
+        return [event for event in response.json() if isinstance(event, dict)]
+    except Exception as e:
+        log.error("Error fetching events: %s", e)
+        return []
+
+
+def fetch_event_props(sport: str, event_id: str, markets: List[str], budget: CreditBudget,
+                      regions: str = 'us', base_url: str = ODDS_API_URL, session=None) -> Optional[Dict]:
+    """Fetch player markets for one event, if the budget allows it"""
+    cost = len(markets) * len(regions.split(','))
+    if not budget.reserve(cost):
+        return None
+    try:
+        session = session or get_session()
+        sport_key = SPORT_KEYS.get(sport.upper(), sport.lower())
+        with upstream('odds_api', 'event_odds'):
+            response = session.get(f"{base_url}/sports/{sport_key}/events/{event_id}/odds", params={
+                'apiKey': os.getenv('THE_ODDS_API_KEY'),
+                'regions': regions,
+                'markets': ','.join(markets),
+                'oddsFormat': 'american'
+            })
+        budget.settle(cost, response.headers)
+        if response.status_code != 200:
+            upstream_error('odds_api', 'event_odds', f"HTTP {response.status_code}")
+            return None
+        return response.json()
+    except Exception as e:
+        log.error("Error fetching props for event %s: %s", event_id, e)
+        return None
+
+
+def fetch_slate_props(sport: str = 'NBA', prop_types: Optional[List[str]] = None,
+                      budget: Optional[CreditBudget] = None, base_url: str = ODDS_API_URL,
+                      session=None, max_workers: int = MAX_WORKERS) -> pd.DataFrame:
+    """Fetch player props for every event on the slate into the normalized odds table"""
+    if use_synthetic_data():
+        from synthetic_data import generate_prop_odds
+        return generate_prop_odds(sport, prop_types)
+    sport_markets = PLAYER_MARKETS.get(sport.upper(), {})
+    markets = [sport_markets[p] for p in (prop_types or sport_markets) if p in sport_markets]
+    if not markets:
+        return pd.DataFrame(columns=ODDS_COLUMNS)
+
+    budget = budget or CreditBudget()
+    session = session or get_session()
+    events = fetch_events(sport, base_url, session)
+    # Earliest tip-offs first so a tight budget still covers tonight's games
+    events.sort(key=lambda event: event.get('commence_time', ''))
+
+    games = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch_event_props, sport, event['id'], markets, budget,
+                               base_url=base_url, session=session)
+                   for event in events if event.get('id')]
+        for future in as_completed(futures):
+            event = future.result()
+            if event:
+                games.append(event)
+    return normalize_odds(games)
+
+
+def summarize_props(props: pd.DataFrame) -> Dict:
+    """Best over/under price per (player, market) at the line most books are hanging"""
+    if props.empty:
+        return {}
+    props = props[props['outcome'].isin(['Over', 'Under'])]
+    line_counts = props.groupby(['player', 'market', 'point'])['bookmaker'].nunique().reset_index()
+    main_lines = (line_counts.sort_values('bookmaker', ascending=False)
+                  .drop_duplicates(['player', 'market'])[['player', 'market', 'point']])
+    best = (props.merge(main_lines, on=['player', 'market', 'point'])
+            .groupby(['player', 'market', 'point', 'outcome'])['price'].max()
+            .unstack('outcome'))
+
+    summary = {}
+    for (player, market, point), row in best.iterrows():
+        summary[(player, market)] = {
+            'line': point,
+            'over_odds': row.get('Over'),
+            'under_odds': row.get('Under')
+        }
+    return summary
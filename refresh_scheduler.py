@@ -0,0 +1,317 @@
+"""Adaptive odds refresh: every game on its own interval, inside the API credit budget.
+
+    python refresh_scheduler.py --sports NBA NFL --credits-per-hour 600
+
+A game's interval comes from how soon it starts (seconds near tip-off, an hour
+for next week's games), whether it is in progress, and how much its prices
+moved on recent fetches. Due games are fetched together in one /odds call with
+eventIds, which costs the same as fetching one game, so games that are at least
+RIDE_ALONG through their own interval join the call. When the projected spend
+would run past the hourly budget, every interval is stretched by one factor.
+
+Results are merged into 'odds:{sport}' in a snapshots.SnapshotRegistry, the
+same entry the dashboard reads, so sessions never call the API themselves.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from metrics import METRICS, get_logger, stage
+from prop_odds import CreditBudget
+from snapshots import Snapshot, SnapshotRegistry
+from utils import iter_odds, fetch_odds_snapshot
+
+ADAPTIVE_REFRESH = os.getenv('ADAPTIVE_REFRESH', '').lower() in ('1', 'true', 'yes')
+CREDITS_PER_HOUR = int(os.getenv('ODDS_API_CREDITS_PER_HOUR', '300'))
+
+# (seconds until commence_time, refresh interval), first match wins
+INTERVAL_TIERS = (
+    (15 * 60, 5),
+    (60 * 60, 15),
+    (6 * 3600, 60),
+    (24 * 3600, 300),
+    (72 * 3600, 900)
+)
+FAR_INTERVAL = 3600
+LIVE_INTERVAL = 10
+LIVE_WINDOW = 4 * 3600     # after commence_time a game counts as live until it leaves the feed or this passes
+MIN_INTERVAL = 5
+DISCOVERY_INTERVAL = 900   # full-slate fetch that picks up new games and drops finished ones
+VOLATILITY_WEIGHT = 4.0    # interval is divided by 1 + weight * (share of prices that moved per fetch)
+VOLATILITY_DECAY = 0.5
+RIDE_ALONG = 0.5
+TICK = 1.0
+
+log = get_logger(__name__)
+
+
+def parse_time(value: str) -> float:
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def base_interval(commence_time: float, now: float) -> float:
+    """Refresh interval from time to tip-off alone"""
+    until = commence_time - now
+    if until <= -LIVE_WINDOW:
+        return FAR_INTERVAL  # still listed long after it should have finished
+    if until <= 0:
+        return LIVE_INTERVAL
+    for horizon, interval in INTERVAL_TIERS:
+        if until < horizon:
+            return interval
+    return FAR_INTERVAL
+
+
+def game_prices(game: Dict) -> Dict:
+    """(book, market, outcome, player) -> (point, price) for one raw game"""
+    return {row[5:9]: (row[9], row[10]) for row in iter_odds([game])}
+
+
+@dataclass
+class GameSchedule:
+    game_id: str
+    commence_time: float
+    game: Dict
+    prices: Dict
+    volatility: float = 0.0
+    fetched_at: float = 0.0
+
+    def live(self, now: float) -> bool:
+        return self.commence_time <= now < self.commence_time + LIVE_WINDOW
+
+    def interval(self, now: float, stretch: float = 1.0) -> float:
+        interval = base_interval(self.commence_time, now) / (1 + VOLATILITY_WEIGHT * self.volatility)
+        return max(MIN_INTERVAL, interval) * stretch
+
+    def update(self, game: Dict, fetched_at: float) -> int:
+        """Take a new payload for this game; returns how many prices changed"""
+        prices = game_prices(game)
+        changed = sum(1 for key, value in prices.items() if self.prices.get(key) != value)
+        changed += len(self.prices.keys() - prices.keys())
+        share = changed / max(1, len(prices), len(self.prices))
+        self.volatility = VOLATILITY_DECAY * self.volatility + (1 - VOLATILITY_DECAY) * share
+        self.game, self.prices, self.fetched_at = game, prices, fetched_at
+        self.commence_time = parse_time(game.get('commence_time', '')) or self.commence_time
+        return changed
+
+
+class RefreshScheduler:
+    """Polls watched sports per game on an APScheduler background thread, publishing to a registry"""
+
+    def __init__(self, registry: SnapshotRegistry, markets: str = 'h2h,spreads,totals',
+                 credits_per_hour: int = CREDITS_PER_HOUR, fetch: Callable = fetch_odds_snapshot):
+        self.registry = registry
+        self.markets = markets
+        self.credits_per_hour = credits_per_hour
+        self.fetch = fetch
+        self.games: Dict[str, Dict[str, GameSchedule]] = {}
+        self.discovered_at: Dict[str, float] = {}
+        self.budget = CreditBudget(credits_per_hour)
+        self.window_started = time.time()
+        self._listeners: List[Callable[[str, list, float], None]] = []
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+    @staticmethod
+    def snapshot_name(sport: str) -> str:
+        return f"odds:{sport.upper()}"
+
+    def subscribe(self, callback: Callable[[str, list, float], None]):
+        """Call back with (sport, fetched games, fetched_at) after every upstream call"""
+        self._listeners.append(callback)
+
+    def start(self) -> 'RefreshScheduler':
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.start()
+        for sport in list(self.games):
+            self._add_job(sport)
+        return self
+
+    def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def _add_job(self, sport: str):
+        if self._scheduler is not None and self._scheduler.get_job(sport) is None:
+            # One job per sport, so a slow sport never holds up another's near-tip games
+            self._scheduler.add_job(self.tick, 'interval', seconds=TICK, args=[sport], id=sport,
+                                    max_instances=1, coalesce=True)
+
+    def watch(self, sport: str) -> Snapshot:
+        """Current snapshot for a sport, fetching the full slate and scheduling it on first use"""
+        sport = sport.upper()
+        snapshot = self.registry.get_or_load(self.snapshot_name(sport), lambda: self._discover(sport),
+                                             ttl=float('inf'))
+        with self._lock:
+            self.games.setdefault(sport, {})
+            self._add_job(sport)
+        return snapshot
+
+    # Budget
+
+    def _roll_window(self, now: float):
+        if now - self.window_started >= 3600:
+            remaining = self.budget.remaining
+            self.budget = CreditBudget(self.credits_per_hour)
+            self.budget.remaining = remaining  # the API's own quota carries over
+            self.window_started = now
+
+    def stretch(self, now: Optional[float] = None) -> float:
+        """Factor applied to every interval so projected spend fits the rest of this hour's budget"""
+        now = now or time.time()
+        cost = len(self.markets.split(','))
+        calls_per_hour = 0.0
+        with self._lock:
+            sports = {sport: list(games.values()) for sport, games in self.games.items()}
+        for games in sports.values():
+            # Batched calls are paced by the sport's most urgent game, plus discovery
+            shortest = min((game.interval(now) for game in games), default=DISCOVERY_INTERVAL)
+            calls_per_hour += 3600 / shortest + 3600 / DISCOVERY_INTERVAL
+        left = max(0, self.budget.limit - self.budget.spent)
+        if self.budget.remaining is not None:
+            left = min(left, self.budget.remaining)
+        affordable = left / max(60.0, 3600 - (now - self.window_started)) * 3600
+        return max(1.0, calls_per_hour * cost / affordable) if affordable else float('inf')
+
+    # Fetching
+
+    def _merge(self, sport: str, games: list, fetched_at: float, requested: Optional[List[str]]) -> int:
+        changed = 0
+        with self._lock:
+            schedules = self.games.setdefault(sport, {})
+            seen = set()
+            for game in games:
+                game_id = str(game.get('id', ''))
+                seen.add(game_id)
+                schedule = schedules.get(game_id)
+                if schedule is None:
+                    schedules[game_id] = GameSchedule(game_id, parse_time(game.get('commence_time', '')), game,
+                                                      game_prices(game), fetched_at=fetched_at)
+                    changed += 1
+                else:
+                    changed += schedule.update(game, fetched_at)
+            # Games missing from a response that asked for them have finished or been pulled
+            for game_id in (set(schedules) if requested is None else set(requested)) - seen:
+                schedules.pop(game_id, None)
+                changed += 1
+        for callback in self._listeners:
+            try:
+                callback(sport, games, fetched_at)
+            except Exception as e:
+                log.warning("Refresh listener failed for %s: %s", sport, e)
+        return changed
+
+    def _fetch(self, sport: str, event_ids: Optional[List[str]]) -> Optional[list]:
+        fetched_at = time.time()
+        with stage('fetch', data='odds', source='scheduler'):
+            games = self.fetch(sport, self.markets, event_ids=event_ids, budget=self.budget)
+        if not games:
+            return None  # refused by the budget or failed upstream; keep the last prices
+        METRICS.incr('refresh.calls', sport=sport, kind='discovery' if event_ids is None else 'games')
+        METRICS.incr('refresh.games', len(games), sport=sport)
+        METRICS.incr('refresh.price_changes', self._merge(sport, games, fetched_at, event_ids), sport=sport)
+        return games
+
+    def _buffer(self, sport: str):
+        from compact import OddsBuffer
+
+        with self._lock:
+            payload = [schedule.game for schedule in self.games.get(sport, {}).values()]
+        with stage('normalize', data='odds', source='scheduler'):
+            return OddsBuffer.from_games(payload)
+
+    def _discover(self, sport: str):
+        self.discovered_at[sport] = time.time()
+        self._fetch(sport, None)
+        return self._buffer(sport)
+
+    def due(self, sport: str, now: Optional[float] = None) -> List[str]:
+        """Game ids to fetch now: any that are due, plus those far enough along to ride along"""
+        now = now or time.time()
+        stretch = self.stretch(now)
+        with self._lock:
+            games = list(self.games.get(sport, {}).values())
+        progress = {game.game_id: (now - game.fetched_at) / game.interval(now, stretch) for game in games}
+        if not progress or max(progress.values()) < 1:
+            return []
+        return [game_id for game_id, done in progress.items() if done >= RIDE_ALONG]
+
+    def tick(self, sport: str):
+        """One scheduler beat for a sport: discovery when it is due, otherwise the due games"""
+        now = time.time()
+        self._roll_window(now)
+        try:
+            if now - self.discovered_at.get(sport, 0) >= DISCOVERY_INTERVAL * self.stretch(now):
+                self.discovered_at[sport] = now
+                fetched = self._fetch(sport, None)
+            else:
+                event_ids = self.due(sport, now)
+                fetched = self._fetch(sport, event_ids) if event_ids else None
+        except Exception as e:
+            log.error("Scheduled refresh failed for %s: %s", sport, e)
+            return
+        if fetched is not None:
+            self.registry.publish(self.snapshot_name(sport), self._buffer(sport))
+
+    def next_refresh_in(self, sport: str) -> float:
+        """Seconds until the sport's next scheduled fetch"""
+        now = time.time()
+        stretch = self.stretch(now)
+        with self._lock:
+            games = list(self.games.get(sport.upper(), {}).values())
+        waits = [game.fetched_at + game.interval(now, stretch) - now for game in games]
+        waits.append(self.discovered_at.get(sport.upper(), now) + DISCOVERY_INTERVAL * stretch - now)
+        return max(0.0, min(waits))
+
+    def plan(self) -> pd.DataFrame:
+        """Per-game schedule: status, volatility, current interval and seconds until the next fetch"""
+        now = time.time()
+        stretch = self.stretch(now)
+        with self._lock:
+            rows = [{
+                'sport': sport,
+                'game_id': game.game_id,
+                'matchup': f"{game.game.get('home_team', '')} vs {game.game.get('away_team', '')}",
+                'starts_in_min': round((game.commence_time - now) / 60, 1),
+                'live': game.live(now),
+                'volatility': round(game.volatility, 3),
+                'interval_s': round(game.interval(now, stretch), 1),
+                'next_in_s': round(max(0.0, game.fetched_at + game.interval(now, stretch) - now), 1)
+            } for sport, games in self.games.items() for game in games.values()]
+        columns = ['sport', 'game_id', 'matchup', 'starts_in_min', 'live', 'volatility', 'interval_s', 'next_in_s']
+        return pd.DataFrame(rows, columns=columns).sort_values('next_in_s') if rows else pd.DataFrame(columns=columns)
+
+
+if __name__ == '__main__':
+    import argparse
+    from metrics import serve_metrics
+    from utils import SPORT_KEYS
+
+    parser = argparse.ArgumentParser(description="Refresh odds per game by time to tip-off, status and volatility")
+    parser.add_argument('--sports', nargs='+', default=['NBA'], choices=list(SPORT_KEYS.keys()))
+    parser.add_argument('--markets', default='h2h,spreads,totals')
+    parser.add_argument('--credits-per-hour', type=int, default=CREDITS_PER_HOUR)
+    parser.add_argument('--report', type=float, default=60, help="seconds between schedule printouts")
+    args = parser.parse_args()
+
+    serve_metrics()
+    scheduler = RefreshScheduler(SnapshotRegistry(), args.markets, args.credits_per_hour).start()
+    for name in args.sports:
+        scheduler.watch(name)
+    try:
+        while True:
+            time.sleep(args.report)
+            print(scheduler.plan().to_string(index=False))
+            print(f"credits spent this hour: {scheduler.budget.spent}/{scheduler.budget.limit}, "
+                  f"stretch {scheduler.stretch():.2f}")
+    except KeyboardInterrupt:
+        scheduler.stop()
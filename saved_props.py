@@ -0,0 +1,106 @@
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+PROP_RESULTS = ('pending', 'win', 'loss', 'push')
+
+SAVED_PROP_COLUMNS = ['id', 'user_id', 'player', 'team', 'market', 'side', 'line',
+                      'odds', 'ev', 'saved_at', 'result']
+
+
+def init_saved_props_table(conn):
+    c = conn.cursor()
+    columns = [row[1] for row in c.execute('PRAGMA table_info(saved_props)')]
+    if 'prop_data' in columns:
+        # Old layout stored str(dict) per row; keep it around rather than parse reprs
+        c.execute('ALTER TABLE saved_props RENAME TO saved_props_legacy')
+    c.execute('''CREATE TABLE IF NOT EXISTS saved_props (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        player TEXT NOT NULL,
+        team TEXT,
+        market TEXT NOT NULL,
+        side TEXT NOT NULL,
+        line REAL NOT NULL,
+        odds REAL NOT NULL,
+        ev REAL,
+        saved_at TEXT NOT NULL,
+        result TEXT NOT NULL DEFAULT 'pending',
+        UNIQUE (user_id, player, market, side, line)
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saved_props_user_ev ON saved_props (user_id, ev)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saved_props_user_time ON saved_props (user_id, saved_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saved_props_result ON saved_props (result)')
+
+
+def _parse_odds(odds) -> float:
+    return float(str(odds).replace('+', ''))
+
+
+def prop_row(user_id, prop: Dict, saved_at: Optional[str] = None) -> tuple:
+    """Typed row from a Props page record ('Prop': 'Over 20 Points', 'Odds': '+100', ...)"""
+    if 'Prop' in prop:
+        side, _, market = str(prop['Prop']).split(' ', 2)
+    else:
+        side, market = prop['side'], prop['market']
+    return (
+        str(user_id),
+        prop.get('Player', prop.get('player')),
+        prop.get('Team', prop.get('team')),
+        market,
+        side,
+        float(prop.get('Line', prop.get('line'))),
+        _parse_odds(prop.get('Odds', prop.get('odds'))),
+        float(prop.get('EV', prop.get('ev', 0))),
+        saved_at or datetime.now().isoformat(timespec='seconds')
+    )
+
+
+def save_props(conn, user_id, props: Iterable[Dict]) -> int:
+    """Insert props in one transaction; duplicates are ignored. Returns rows added"""
+    saved_at = datetime.now().isoformat(timespec='seconds')
+    rows = [prop_row(user_id, prop, saved_at) for prop in props]
+    if not rows:
+        return 0
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            'INSERT OR IGNORE INTO saved_props '
+            '(user_id, player, team, market, side, line, odds, ev, saved_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        return conn.total_changes - before
+
+
+def query_props(conn, user_id, min_ev: Optional[float] = None, result: Optional[str] = None,
+                player: Optional[str] = None, since: Optional[str] = None,
+                limit: Optional[int] = None) -> pd.DataFrame:
+    """Saved props for a user, filtered in SQL on the indexed columns"""
+    clauses, params = ['user_id = ?'], [str(user_id)]
+    if min_ev is not None:
+        clauses.append('ev > ?')
+        params.append(min_ev)
+    if result is not None:
+        clauses.append('result = ?')
+        params.append(result)
+    if player is not None:
+        clauses.append('player = ?')
+        params.append(player)
+    if since is not None:
+        clauses.append('saved_at >= ?')
+        params.append(since)
+    sql = (f"SELECT {', '.join(SAVED_PROP_COLUMNS)} FROM saved_props "
+           f"WHERE {' AND '.join(clauses)} ORDER BY ev DESC")
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def settle_props(conn, results: Dict[int, str]) -> int:
+    """Record win/loss/push for saved props by id"""
+    rows = [(result, prop_id) for prop_id, result in results.items() if result in PROP_RESULTS]
+    with conn:
+        conn.executemany('UPDATE saved_props SET result = ? WHERE id = ?', rows)
+    return len(rows)
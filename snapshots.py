@@ -0,0 +1,130 @@
+"""Process-wide registry of versioned, read-only data snapshots.
+
+Odds, rosters and game logs are the same for every viewer, so they live here
+once per server process instead of once per Streamlit session. A refresh
+builds the new value off to the side and swaps it in under the lock; readers
+keep whatever Snapshot they already hold, so a session never sees a half-built
+frame. Session state should only hold filters and (name, version) references,
+and a page that needs to add columns works on a .copy().
+"""
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
+import pandas as pd
+from metrics import cache_lookup
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    name: str
+    version: int
+    data: Any
+    created_at: float
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+def freeze(data):
+    """Mark a DataFrame's column arrays read-only so shared frames can't be edited in place"""
+    if isinstance(data, pd.DataFrame):
+        for values in data._mgr.arrays:
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+    elif isinstance(data, dict):
+        for value in data.values():
+            freeze(value)
+    return data
+
+
+def data_nbytes(data) -> int:
+    """Rough resident size of a snapshot's data"""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return int(np.sum(data.memory_usage(deep=True)))
+    if hasattr(data, 'nbytes'):  # numpy arrays, compact.OddsBuffer
+        return int(data.nbytes)
+    if isinstance(data, dict):
+        return sys.getsizeof(data) + sum(data_nbytes(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return sys.getsizeof(data) + sum(data_nbytes(value) for value in data)
+    return sys.getsizeof(data)
+
+
+class SnapshotRegistry:
+    """Named snapshots shared by every session in the process"""
+
+    def __init__(self):
+        self._snapshots: Dict[str, Snapshot] = {}
+        # Outlive invalidate() so a reloaded name never reuses a version a reader already saw
+        self._versions: Dict[str, int] = {}
+        self._sources: Dict[str, Hashable] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def publish(self, name: str, data) -> Snapshot:
+        """Swap in a new version of a snapshot"""
+        freeze(data)
+        with self._lock:
+            version = self._versions[name] = self._versions.get(name, 0) + 1
+            snapshot = Snapshot(name, version, data, time.time())
+            self._snapshots[name] = snapshot
+            self._sources.pop(name, None)
+        return snapshot
+
+    def get(self, name: str) -> Optional[Snapshot]:
+        return self._snapshots.get(name)
+
+    def get_or_load(self, name: str, loader: Callable[[], Any], ttl: float) -> Snapshot:
+        """Current snapshot if younger than ttl, otherwise load it once for every waiting session"""
+        cache = name.split(':', 1)[0]
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None and snapshot.age() < ttl:
+            cache_lookup(cache, True)
+            return snapshot
+        cache_lookup(cache, False)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            # Another session may have refreshed it while we waited
+            snapshot = self._snapshots.get(name)
+            if snapshot is not None and snapshot.age() < ttl:
+                return snapshot
+            return self.publish(name, loader())
+
+    def get_or_derive(self, name: str, source: Hashable, build: Callable[[], Any]) -> Snapshot:
+        """Snapshot built from another piece of data; rebuilt once whenever source (its identity) changes"""
+        cache = name.split(':', 1)[0]
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None and self._sources.get(name) == source:
+            cache_lookup(cache, True)
+            return snapshot
+        cache_lookup(cache, False)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is not None and self._sources.get(name) == source:
+                return snapshot
+            snapshot = self.publish(name, build())
+            with self._lock:
+                self._sources[name] = source
+            return snapshot
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._snapshots.pop(name, None)
+            self._sources.pop(name, None)
+
+    def stats(self) -> pd.DataFrame:
+        """Name, version, age and approximate size of every snapshot"""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        return pd.DataFrame([{
+            'name': s.name,
+            'version': s.version,
+            'age_s': round(s.age(), 1),
+            'bytes': data_nbytes(s.data)
+        } for s in snapshots], columns=['name', 'version', 'age_s', 'bytes'])
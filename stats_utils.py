@@ -1,11 +1,10 @@
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import altair as alt
+from synthetic_data import seeded_rng
 
-def fetch_player_stats(player_name: str, last_n_games: int = 10) -> pd.DataFrame:
-    """Return player stats for last N games"""
-    dates = pd.date_range(end=datetime.now(), periods=last_n_games)
+def fetch_player_stats(player_name: str, last_n_games: int = 10, seed: int = None) -> pd.DataFrame:
+    """Return player stats for last N games (mock data, seeded per player)"""
+    dates = pd.date_range(end=datetime.now().date(), periods=last_n_games)
     
     # Player-specific base stats
     if 'Embiid' in player_name:
@@ -16,17 +15,14 @@ def fetch_player_stats(player_name: str, last_n_games: int = 10) -> pd.DataFrame
         base_stats = {'pts': 20, 'reb': 5, 'ast': 4}
 
     # Generate realistic stats with some variance
-    data = []
-    for date in dates:
-        data.append({
-            'date': date,
-            'points': max(0, np.random.normal(base_stats['pts'], 5)),
-            'rebounds': max(0, np.random.normal(base_stats['reb'], 3)),
-            'assists': max(0, np.random.normal(base_stats['ast'], 2)),
-            'player': player_name
-        })
-    
-    return pd.DataFrame(data).round(1)
+    rng = seeded_rng(seed, 'stats', player_name)
+    return pd.DataFrame({
+        'date': dates,
+        'points': rng.normal(base_stats['pts'], 5, last_n_games).clip(0).round(1),
+        'rebounds': rng.normal(base_stats['reb'], 3, last_n_games).clip(0).round(1),
+        'assists': rng.normal(base_stats['ast'], 2, last_n_games).clip(0).round(1),
+        'player': player_name
+    })
 
 def calculate_kelly_criterion(probability: float, odds: float, bankroll: float = 1000) -> float:
     if odds <= 0:
@@ -37,45 +33,19 @@ def calculate_kelly_criterion(probability: float, odds: float, bankroll: float =
     kelly = (probability * (decimal_odds - 1) - q) / (decimal_odds - 1)
     return max(0, min(kelly * bankroll, bankroll * 0.05))  # Cap at 5% of bankroll
 
-def create_performance_chart(stats_df: pd.DataFrame, metric: str) -> alt.Chart:
-    base = alt.Chart(stats_df).encode(
-        x=alt.X('date:T', title='Date'),
-        y=alt.Y(f'{metric}:Q', title=metric.title()),
-        tooltip=['date', metric]
-    )
-    
-    line = base.mark_line(color='steelblue')
-    points = base.mark_circle(color='steelblue')
-    
-    chart = (line + points).properties(
-        width=600,
-        height=300,
-        title=f"{metric.title()} Over Time"
-    ).interactive()
-    
-    return chart
+def create_performance_chart(stats_df: pd.DataFrame, metric: str) -> 'alt.Chart':
+    from charts import line_chart, series_frame
 
-def create_metrics_comparison(stats_df: pd.DataFrame) -> alt.Chart:
-    # Melt the dataframe for multiple metrics
-    metrics_df = stats_df.melt(
-        id_vars=['date'], 
-        value_vars=['points', 'rebounds', 'assists'],
-        var_name='metric', 
-        value_name='value'
-    )
-    
-    chart = alt.Chart(metrics_df).mark_line().encode(
-        x='date:T',
-        y='value:Q',
-        color='metric:N',
-        tooltip=['date', 'metric', 'value']
-    ).properties(
-        width=600,
-        height=300,
-        title="Player Performance Metrics"
-    ).interactive()
-    
-    return chart
+    frame = series_frame(stats_df, metric, metric.title())
+    return line_chart(frame, title=f"{metric.title()} Over Time", y_title=metric.title(), color_title='Metric')
+
+def create_metrics_comparison(stats_df: pd.DataFrame) -> 'alt.Chart':
+    from charts import line_chart, metrics_frame
+
+    # One downsampled line per metric instead of melting every row of the log
+    frame = metrics_frame(stats_df, ['points', 'rebounds', 'assists'])
+    return line_chart(frame, title="Player Performance Metrics", y_title='Value', color_title='Metric',
+                      points=False)
 
 def identify_middle_opportunities(odds_data: list) -> list:
     middles = []
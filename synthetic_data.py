@@ -0,0 +1,397 @@
+"""Seeded synthetic odds, rosters and game logs for offline runs and load tests.
+
+Every generator is a pure function of its arguments and a seed, and draws all
+of its numbers as numpy arrays, so a 100x slate costs array math rather than
+Python loops per value. Player identities are derived from (team, slot), so
+rosters, game logs and prop lines generated separately refer to the same
+players.
+
+Set SYNTHETIC_DATA=1 to make the fetchers in utils, team_data, defense_data
+and prop_odds return synthetic data instead of calling upstream APIs;
+SYNTHETIC_SCALE multiplies the number of games on a slate and SYNTHETIC_SEED
+fixes the seed.
+"""
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+SYNTHETIC_SEED = int(os.getenv('SYNTHETIC_SEED', '7'))
+SYNTHETIC_SCALE = float(os.getenv('SYNTHETIC_SCALE', '1'))
+
+NBA_TEAMS = [
+    'Atlanta Hawks', 'Boston Celtics', 'Brooklyn Nets', 'Charlotte Hornets', 'Chicago Bulls',
+    'Cleveland Cavaliers', 'Dallas Mavericks', 'Denver Nuggets', 'Detroit Pistons', 'Golden State Warriors',
+    'Houston Rockets', 'Indiana Pacers', 'Los Angeles Clippers', 'Los Angeles Lakers', 'Memphis Grizzlies',
+    'Miami Heat', 'Milwaukee Bucks', 'Minnesota Timberwolves', 'New Orleans Pelicans', 'New York Knicks',
+    'Oklahoma City Thunder', 'Orlando Magic', 'Philadelphia 76ers', 'Phoenix Suns', 'Portland Trail Blazers',
+    'Sacramento Kings', 'San Antonio Spurs', 'Toronto Raptors', 'Utah Jazz', 'Washington Wizards'
+]
+
+BOOKMAKERS = ['draftkings', 'fanduel', 'betmgm', 'williamhill_us', 'pointsbetus', 'betrivers', 'wynnbet',
+              'unibet_us', 'bovada', 'mybookieag', 'betonlineag', 'lowvig', 'superbook', 'betus', 'espnbet']
+
+# Typical games per day, full-game total and the step lines move in, per sport
+SPORT_PROFILES = {
+    'NBA': {'games': 10, 'teams': 30, 'total': 226.0, 'total_sd': 8.0, 'spread_scale': 28.0, 'step': 0.5},
+    'NFL': {'games': 14, 'teams': 32, 'total': 44.0, 'total_sd': 4.0, 'spread_scale': 20.0, 'step': 0.5},
+    'NCAAF': {'games': 50, 'teams': 130, 'total': 52.0, 'total_sd': 8.0, 'spread_scale': 40.0, 'step': 0.5},
+    'MLB': {'games': 15, 'teams': 30, 'total': 8.5, 'total_sd': 1.0, 'spread_scale': 0.0, 'step': 0.5},
+    'NHL': {'games': 8, 'teams': 32, 'total': 6.0, 'total_sd': 0.5, 'spread_scale': 0.0, 'step': 0.5}
+}
+
+FIRST_NAMES = ['Jalen', 'Marcus', 'Tyrese', 'Darius', 'Jaylen', 'Andre', 'Malik', 'Devin', 'Cam', 'Isaiah',
+               'Jordan', 'Trey', 'Keegan', 'Miles', 'Derrick', 'Luka', 'Nikola', 'Franz', 'Scottie', 'Evan']
+LAST_NAMES = ['Williams', 'Johnson', 'Brown', 'Harris', 'Green', 'Walker', 'Allen', 'Murray', 'Holiday',
+              'Mitchell', 'Bridges', 'Porter', 'Thompson', 'Robinson', 'Jackson', 'White', 'Carter', 'Young',
+              'Davis', 'Miller']
+POSITIONS = np.array(['G', 'G', 'F', 'F', 'C', 'G', 'F', 'G', 'F', 'C', 'G', 'F', 'C'])
+# Per-position mean points / rebounds / assists / threes / blocks / steals for a starter
+POSITION_MEANS = {
+    'G': np.array([18.0, 4.0, 6.0, 2.4, 0.4, 1.2]),
+    'F': np.array([16.0, 6.5, 3.0, 1.6, 0.7, 0.9]),
+    'C': np.array([15.0, 10.0, 2.5, 0.6, 1.6, 0.7])
+}
+STAT_COLUMNS = ['points', 'rebounds', 'assists', 'threes', 'blocks', 'steals']
+PROP_VIG = 0.045  # books' hold on a two-way player prop
+
+
+def seeded_rng(seed: Optional[int] = None, *keys) -> np.random.Generator:
+    """Generator determined by the seed and any string/int keys (stable across processes)"""
+    seed = SYNTHETIC_SEED if seed is None else seed
+    return np.random.default_rng([seed, *(zlib.crc32(str(key).encode('utf-8')) for key in keys)])
+
+
+def team_names(sport: str = 'NBA') -> List[str]:
+    sport = sport.upper()
+    if sport == 'NBA':
+        return list(NBA_TEAMS)
+    return [f"{sport} Team {i + 1:03d}" for i in range(SPORT_PROFILES.get(sport, SPORT_PROFILES['NBA'])['teams'])]
+
+
+def book_names(n_books: int) -> List[str]:
+    return BOOKMAKERS[:n_books] + [f"book{i}" for i in range(len(BOOKMAKERS), n_books)]
+
+
+def prob_to_american(prob: np.ndarray) -> np.ndarray:
+    """Implied probability -> integer American odds, vectorized"""
+    prob = np.clip(prob, 0.01, 0.99)
+    return np.where(prob >= 0.5, -100 * prob / (1 - prob), 100 * (1 - prob) / prob).round().astype(int)
+
+
+def _round_to(values: np.ndarray, step: float) -> np.ndarray:
+    return np.round(values / step) * step
+
+
+# Rosters and game logs
+
+def generate_roster(team: str, size: int = 13, seed: Optional[int] = None) -> List[Dict]:
+    """Roster in fetch_team_players' shape; the same team always gets the same players"""
+    rng = seeded_rng(seed, 'roster', team)
+    team_code = zlib.crc32(team.encode('utf-8')) % 10000
+    first = rng.choice(FIRST_NAMES, size)
+    last = rng.choice(LAST_NAMES, size)
+    names = [f"{first[slot]} {last[slot]}" for slot in range(size)]
+    if team in NBA_TEAMS and size * len(NBA_TEAMS) <= len(FIRST_NAMES) * len(LAST_NAMES):
+        # Props and lines are keyed by player name, so no two players in the league share one
+        league = seeded_rng(seed, 'names').permutation(len(FIRST_NAMES) * len(LAST_NAMES))
+        picks = league[NBA_TEAMS.index(team) * size + np.arange(size)]
+        names = [f"{FIRST_NAMES[i // len(LAST_NAMES)]} {LAST_NAMES[i % len(LAST_NAMES)]}" for i in picks]
+    numbers = rng.choice(np.arange(0, 100), size, replace=False)
+    heights = rng.integers(73, 86, size)
+    weights = rng.integers(180, 270, size)
+    experience = rng.integers(0, 16, size)
+    positions = POSITIONS[np.arange(size) % len(POSITIONS)]
+    return [{
+        'id': str(1_000_000 + team_code * 100 + slot),
+        'name': names[slot],
+        'position': str(positions[slot]),
+        'number': str(numbers[slot]),
+        'height': f"{heights[slot] // 12}-{heights[slot] % 12}",
+        'weight': str(weights[slot]),
+        'experience': str(experience[slot]),
+        'team_id': str(team_code)
+    } for slot in range(size)]
+
+
+def generate_rosters(teams: List[str], size: int = 13, seed: Optional[int] = None) -> Dict[str, List[Dict]]:
+    return {team: generate_roster(team, size, seed) for team in teams}
+
+
+def player_means(player_id: str, position: str = 'G', seed: Optional[int] = None) -> np.ndarray:
+    """Per-game means for STAT_COLUMNS; a player's role scales their position's baseline"""
+    rng = seeded_rng(seed, 'player', player_id)
+    role = rng.uniform(0.35, 1.6)
+    return POSITION_MEANS.get(position, POSITION_MEANS['F']) * role
+
+
+def _draw_stats(rng: np.random.Generator, means: np.ndarray) -> np.ndarray:
+    """Poisson counting stats around each row's means (rows x STAT_COLUMNS)"""
+    return rng.poisson(means)
+
+
+def roster_position(player_id: str) -> str:
+    """Position generate_roster gave a synthetic player id"""
+    return str(POSITIONS[int(player_id) % 100 % len(POSITIONS)]) if str(player_id).isdigit() else 'G'
+
+
+def generate_player_game_log(player_id: str, last_n_games: int = 10, position: Optional[str] = None,
+                             seed: Optional[int] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """Recent games in fetch_player_game_log's shape (plus threes/blocks/steals)"""
+    rng = seeded_rng(seed, 'log', player_id)
+    position = position or roster_position(player_id)
+    means = player_means(player_id, position, seed)
+    # Game-to-game minutes swing every stat together
+    minutes_factor = rng.normal(1.0, 0.18, (last_n_games, 1)).clip(0.3, 1.6)
+    stats = _draw_stats(rng, means[None, :] * minutes_factor)
+    end = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = pd.to_datetime(end) - pd.to_timedelta(np.cumsum(rng.integers(1, 4, last_n_games)), unit='D')
+    opponents = np.array(NBA_TEAMS)[rng.integers(0, len(NBA_TEAMS), last_n_games)]
+    frame = pd.DataFrame(stats, columns=STAT_COLUMNS)
+    frame.insert(0, 'date', dates)
+    frame['opponent'] = opponents
+    frame['minutes'] = (34 * minutes_factor[:, 0]).round(1)
+    return frame[['date', 'points', 'rebounds', 'assists', 'opponent', 'minutes', 'threes', 'blocks', 'steals']]
+
+
+def generate_game_logs(n_games: int = 1230, season: str = '2023-24', players_per_side: int = 10,
+                       seed: Optional[int] = None, start: str = '2023-10-24') -> pd.DataFrame:
+    """League-wide player box scores in fetch_bulk_game_logs' shape, one vectorized draw"""
+    rng = seeded_rng(seed, 'season', season)
+    teams = np.array(NBA_TEAMS)
+    rosters = generate_rosters(list(teams), seed=seed)
+    ids = np.array([[int(p['id']) for p in rosters[t]][:players_per_side] for t in teams])
+    positions = np.array([[p['position'] for p in rosters[t]][:players_per_side] for t in teams])
+    means = np.array([[player_means(p['id'], p['position'], seed) for p in rosters[t][:players_per_side]]
+                      for t in teams])
+
+    home = rng.integers(0, len(teams), n_games)
+    away = (home + rng.integers(1, len(teams), n_games)) % len(teams)
+    # About eight games a night, like a regular-season schedule
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.arange(n_games) // 8, unit='D')
+    # (games, 2 sides, players) -> flat rows
+    side_team = np.stack([home, away], axis=1)
+    side_opponent = np.stack([away, home], axis=1)
+    team_idx = np.repeat(side_team[:, :, None], players_per_side, axis=2).ravel()
+    opp_idx = np.repeat(side_opponent[:, :, None], players_per_side, axis=2).ravel()
+    slot = np.tile(np.arange(players_per_side), n_games * 2)
+    minutes_factor = rng.normal(1.0, 0.18, (len(slot), 1)).clip(0.3, 1.6)
+    stats = _draw_stats(rng, means[team_idx, slot] * minutes_factor)
+
+    return pd.DataFrame({
+        'player_id': ids[team_idx, slot],
+        'game_id': np.repeat(np.char.add('002', np.char.zfill(np.arange(n_games).astype(str), 7)),
+                             2 * players_per_side),
+        'game_date': np.repeat(dates.strftime('%Y-%m-%d').to_numpy(), 2 * players_per_side),
+        'season': season,
+        'team': teams[team_idx],
+        'opponent': teams[opp_idx],
+        'position': positions[team_idx, slot],
+        'pts': stats[:, 0], 'reb': stats[:, 1], 'ast': stats[:, 2],
+        'fg3m': stats[:, 3], 'blk': stats[:, 4], 'stl': stats[:, 5]
+    })
+
+
+# Odds payloads
+
+def generate_odds(sport: str = 'NBA', n_games: Optional[int] = None, n_books: int = 8,
+                  markets: str = 'h2h,spreads,totals', players_per_game: int = 0,
+                  arb_rate: float = 0.03, middle_rate: float = 0.08, seed: Optional[int] = None,
+                  start: Optional[datetime] = None) -> list:
+    """Odds API games with per-book line dispersion, vig, and occasional arbs and middles
+
+    arb_rate is the share of games where two books' moneylines together imply
+    under 100%; middle_rate the share where two books hang spreads/totals far
+    enough apart to middle. Player markets (e.g. 'player_points') use the
+    synthetic rosters' players.
+
+    The slate itself (game ids, matchups, start times, fair prices) depends
+    only on sport, n_games and seed, so payloads generated with other books
+    or markets, such as generate_prop_odds', describe the same games.
+    """
+    sport = sport.upper()
+    seed = SYNTHETIC_SEED if seed is None else seed
+    profile = SPORT_PROFILES.get(sport, SPORT_PROFILES['NBA'])
+    n_games = n_games or max(1, int(profile['games'] * SYNTHETIC_SCALE))
+    markets = [m for m in markets.split(',') if m]
+    slate = seeded_rng(seed, 'slate', sport, n_games)
+    rng = seeded_rng(seed, 'odds', sport, n_games, n_books)
+    teams = np.array(team_names(sport))
+    books = book_names(n_books)
+    shape = (n_games, n_books)
+    step = profile['step']
+
+    home = slate.integers(0, len(teams), n_games)
+    away = (home + slate.integers(1, len(teams), n_games)) % len(teams)
+    start = start or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=2)
+    commence = [(start + timedelta(minutes=int(m))).strftime('%Y-%m-%dT%H:%M:%SZ')
+                for m in np.sort(slate.integers(0, 6 * 60, n_games)) // 30 * 30]
+    fair_home = slate.beta(6, 6, n_games).clip(0.12, 0.88)
+    vig = rng.uniform(0.035, 0.055, shape)
+    # Books shade the consensus by well under their hold, so arbs only come from the flagged games
+    noise = rng.normal(0, 0.006, shape)
+
+    # Two books per flagged game get the off-market side that creates the arb / middle
+    arb_games = np.flatnonzero(rng.random(n_games) < arb_rate) if n_books >= 2 else np.array([], int)
+    middle_games = np.flatnonzero(rng.random(n_games) < middle_rate) if n_books >= 2 else np.array([], int)
+    arb_books = np.array([rng.choice(n_books, 2, replace=False) for _ in arb_games], dtype=int).reshape(-1, 2)
+    middle_books = np.array([rng.choice(n_books, 2, replace=False) for _ in middle_games], dtype=int).reshape(-1, 2)
+
+    prices = {}
+    if 'h2h' in markets:
+        p = (fair_home[:, None] + noise).clip(0.05, 0.95)
+        home_implied, away_implied = p * (1 + vig), (1 - p) * (1 + vig)
+        home_implied[arb_games, arb_books[:, 0]] = fair_home[arb_games] * 0.94
+        away_implied[arb_games, arb_books[:, 1]] = (1 - fair_home[arb_games]) * 0.94
+        prices['h2h'] = (prob_to_american(home_implied), prob_to_american(away_implied), None)
+
+    def line_market(center: np.ndarray, spread_sd: float, middle_shift: float):
+        offsets = rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0], shape, p=[0.03, 0.12, 0.7, 0.12, 0.03]) * spread_sd
+        lines = _round_to(center[:, None] + offsets, step)
+        lines[middle_games, middle_books[:, 0]] += middle_shift
+        lines[middle_games, middle_books[:, 1]] -= middle_shift
+        juice = rng.choice([-115, -112, -110, -110, -108, -105], shape)
+        return lines, juice, (-220 - juice)  # keeps both sides near -110 with ~4.5% hold
+
+    if 'spreads' in markets and profile['spread_scale']:
+        center = _round_to(-(fair_home - 0.5) * profile['spread_scale'], step)
+        lines, home_price, away_price = line_market(center, 1.0, 1.5)
+        prices['spreads'] = (home_price, away_price, lines)
+    if 'totals' in markets:
+        center = _round_to(profile['total'] + rng.normal(0, profile['total_sd'], n_games), step)
+        lines, over_price, under_price = line_market(center, step * 2, max(step, profile['total_sd'] / 4))
+        prices['totals'] = (over_price, under_price, lines)
+
+    player_markets = [m for m in markets if m.startswith(('player_', 'pitcher_'))]
+    props = _player_prop_prices(rng, teams, home, away, player_markets, players_per_game, n_books, seed)
+
+    games = []
+    for g in range(n_games):
+        bookmakers = []
+        for b, book in enumerate(books):
+            book_markets = []
+            for key, (first, second, lines) in prices.items():
+                names = ('Over', 'Under') if key == 'totals' else (teams[home[g]], teams[away[g]])
+                outcomes = [{'name': str(names[0]), 'price': int(first[g, b])},
+                            {'name': str(names[1]), 'price': int(second[g, b])}]
+                if lines is not None:
+                    outcomes[0]['point'] = float(lines[g, b])
+                    outcomes[1]['point'] = float(lines[g, b] if key == 'totals' else -lines[g, b])
+                book_markets.append({'key': key, 'last_update': commence[g], 'outcomes': outcomes})
+            for key, rows in props.get(g, {}).items():
+                book_markets.append({'key': key, 'last_update': commence[g], 'outcomes': [
+                    outcome for player, line, over, under in rows
+                    for outcome in ({'name': 'Over', 'description': player, 'price': int(over[b]),
+                                     'point': float(line[b])},
+                                    {'name': 'Under', 'description': player, 'price': int(under[b]),
+                                     'point': float(line[b])})
+                ]})
+            bookmakers.append({'key': book, 'title': book, 'last_update': commence[g], 'markets': book_markets})
+        games.append({
+            'id': f"syn{zlib.crc32(f'{sport}{seed}{n_games}{g}'.encode('utf-8')):08x}{g:05d}",
+            'sport_key': _sport_key(sport),
+            'commence_time': commence[g],
+            'home_team': str(teams[home[g]]),
+            'away_team': str(teams[away[g]]),
+            'bookmakers': bookmakers
+        })
+    return games
+
+
+def _sport_key(sport: str) -> str:
+    from utils import SPORT_KEYS
+    return SPORT_KEYS.get(sport, sport.lower())
+
+
+_PROP_STAT = {'player_points': 0, 'player_rebounds': 1, 'player_assists': 2, 'player_threes': 3,
+              'player_blocks': 4, 'player_steals': 5}
+
+
+def _player_prop_prices(rng, teams, home, away, markets, players_per_game, n_books, seed) -> Dict:
+    """{game: {market: [(player, lines[books], over[books], under[books])]}} around each player's mean
+
+    Both sides of a book's line come from one fair over probability (a normal
+    approximation of the player's Poisson stat at that line, shaded a little
+    per book) grossed up by PROP_VIG.
+    """
+    if not markets or not players_per_game:
+        return {}
+    per_side = max(1, players_per_game // 2)
+    props = {}
+    for g in range(len(home)):
+        players = [p for side in (home[g], away[g]) for p in generate_roster(str(teams[side]), seed=seed)[:per_side]]
+        means = np.array([player_means(p['id'], p['position'], seed) for p in players])
+        for market in markets:
+            stat = _PROP_STAT.get(market, 0)
+            mean = means[:, stat, None]
+            lines = np.maximum(np.floor(mean) + 0.5 + rng.choice([-1.0, 0.0, 0.0, 0.0, 1.0],
+                                                                  (len(players), n_books)), 0.5)
+            z = (mean - lines) / np.sqrt(np.maximum(mean, 0.25))
+            fair_over = (1 / (1 + np.exp(-1.702 * z)) + rng.normal(0, 0.015, lines.shape)).clip(0.15, 0.85)
+            over = prob_to_american(fair_over * (1 + PROP_VIG))
+            under = prob_to_american((1 - fair_over) * (1 + PROP_VIG))
+            props.setdefault(g, {})[market] = [
+                (p['name'], lines[i], over[i], under[i]) for i, p in enumerate(players)
+            ]
+    return props
+
+
+def generate_prop_odds(sport: str = 'NBA', prop_types: Optional[List[str]] = None, n_games: Optional[int] = None,
+                       n_books: int = 6, players_per_game: int = 10, seed: Optional[int] = None) -> pd.DataFrame:
+    """Player props for generate_odds' slate, in fetch_slate_props' normalized table"""
+    from utils import normalize_odds
+    from prop_odds import PLAYER_MARKETS
+
+    sport_markets = PLAYER_MARKETS.get(sport.upper(), {})
+    markets = [sport_markets[p] for p in (prop_types or sport_markets) if p in sport_markets]
+    games = generate_odds(sport, n_games, n_books, ','.join(markets), players_per_game, seed=seed)
+    return normalize_odds(games)
+
+
+def find_game(home_team: str, away_team: str, sport: str = 'NBA', seed: Optional[int] = None) -> Optional[Dict]:
+    """The synthetic slate's game between two teams, or None when they do not meet"""
+    for game in generate_odds(sport, markets='h2h', n_books=1, seed=seed):
+        if game['home_team'] == home_team and game['away_team'] == away_team:
+            return game
+    return None
+
+
+def generate_team_stats(team: str, seed: Optional[int] = None) -> Dict:
+    """Season record in get_team_stats' shape"""
+    rng = seeded_rng(seed, 'team_stats', team)
+    home_wins, road_wins = rng.integers(5, 36, 2)
+    home_losses, road_losses = rng.integers(5, 36, 2)
+    wins, losses = int(home_wins + road_wins), int(home_losses + road_losses)
+    return {
+        'wins': wins,
+        'losses': losses,
+        'win_pct': round(wins / (wins + losses), 3),
+        'conf_rank': int(rng.integers(1, 16)),
+        'home_record': f"{home_wins}-{home_losses}",
+        'away_record': f"{road_wins}-{road_losses}"
+    }
+
+
+def generate_trending_props(n_props: int = 10, seed: Optional[int] = None) -> List[Dict]:
+    """get_trending_props rows: players whose last five games sit clearly on one side of the line"""
+    rng = seeded_rng(seed, 'trending')
+    teams = rng.choice(NBA_TEAMS, n_props)
+    slots = rng.integers(0, 8, n_props)
+    stats = rng.integers(0, 3, n_props)
+    props = []
+    for team, slot, stat in zip(teams, slots, stats):
+        player = generate_roster(str(team), seed=seed)[slot]
+        log = generate_player_game_log(player['id'], 5, player['position'], seed)
+        column = STAT_COLUMNS[stat]
+        last_5 = log[column].to_numpy()[::-1]
+        line = float(np.floor(player_means(player['id'], player['position'], seed)[stat]) + 0.5)
+        props.append({
+            'player': player['name'],
+            'prop': column.title(),
+            'line': line,
+            'trend': 'Up' if last_5.mean() > line else 'Down',
+            'last_5': last_5.tolist()
+        })
+    return props
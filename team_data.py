@@ -1,40 +1,58 @@
-from nba_api.stats.endpoints import commonteamroster, playercareerstats, teaminfocommon, boxscoreadvancedv2, leaguegamefinder
-from nba_api.stats.static import teams, players
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
 import pandas as pd
+import threading
 import time
-from datetime import datetime, timedelta
+from metrics import get_logger, upstream
+from transport import configure_nba_api
+from utils import season_for, use_synthetic_data
 
-# Cache team IDs
-TEAM_IDS = {team['full_name']: team['id'] for team in teams.get_teams()}
+log = get_logger(__name__)
+
+# nba_api endpoints are imported inside the functions that call them: loading
+# the endpoint package costs most of a second and many pages never need it.
+
+@lru_cache(maxsize=1)
+def get_team_ids() -> Dict[str, int]:
+    """Map of full team name to NBA team ID, built on first use"""
+    from nba_api.stats.static import teams
+    return {team['full_name']: team['id'] for team in teams.get_teams()}
 
 def get_team_id(team_name: str) -> int:
     """Get NBA team ID from team name"""
     try:
+        team_ids = get_team_ids()
         # Try exact match first
-        if team_name in TEAM_IDS:
-            return TEAM_IDS[team_name]
+        if team_name in team_ids:
+            return team_ids[team_name]
         
         # Try partial match
-        for full_name, team_id in TEAM_IDS.items():
+        for full_name, team_id in team_ids.items():
             if team_name.lower() in full_name.lower():
                 return team_id
         return None
     except Exception as e:
-        print(f"Error getting team ID: {e}")
+        log.error("Error getting team ID: %s", e)
         return None
 
 def fetch_team_players(team_name: str) -> List[Dict]:
     """Fetch current team roster from NBA API"""
+    if use_synthetic_data():
+        from synthetic_data import generate_roster
+        return generate_roster(team_name)
     try:
+        from nba_api.stats.endpoints import commonteamroster
+        configure_nba_api()
+
         team_id = get_team_id(team_name)
         if not team_id:
-            print(f"Team not found: {team_name}")
+            log.warning("Team not found: %s", team_name)
             return []
             
         # Get roster
-        roster = commonteamroster.CommonTeamRoster(team_id=team_id)
-        players_df = roster.get_data_frames()[0]
+        with upstream('nba_stats', 'commonteamroster'):
+            roster = commonteamroster.CommonTeamRoster(team_id=team_id)
+            players_df = roster.get_data_frames()[0]
         
         # Format player data with safe field access
         player_list = []
@@ -56,7 +74,7 @@ def fetch_team_players(team_name: str) -> List[Dict]:
                     player_list.append(player_data)
                     
             except Exception as e:
-                print(f"Error processing player data: {e}")
+                log.warning("Error processing player data: %s", e)
                 continue
             
             time.sleep(0.1)  # Rate limiting
@@ -68,7 +86,7 @@ def fetch_team_players(team_name: str) -> List[Dict]:
         return player_list
         
     except Exception as e:
-        print(f"Error fetching team roster: {e}")
+        log.error("Error fetching team roster: %s", e)
         # Fallback to hardcoded rosters
         return HARDCODED_ROSTERS.get(team_name, [])
 
@@ -93,11 +111,20 @@ HARDCODED_ROSTERS = {
 def fetch_player_stats(player_id: str) -> Dict:
     """Fetch comprehensive player stats"""
     try:
-        from nba_api.stats.endpoints import playergamelog, playervsplayer
-        
-        # Get recent games
-        game_logs = playergamelog.PlayerGameLog(player_id=player_id)
-        logs_df = game_logs.get_data_frames()[0].head(10)
+        if use_synthetic_data():
+            from synthetic_data import generate_player_game_log
+            logs_df = generate_player_game_log(player_id, 10).rename(columns={
+                'points': 'PTS', 'rebounds': 'REB', 'assists': 'AST',
+                'blocks': 'BLK', 'steals': 'STL', 'threes': 'FG3M'
+            })
+        else:
+            from nba_api.stats.endpoints import playergamelog
+            configure_nba_api()
+
+            # Get recent games
+            with upstream('nba_stats', 'playergamelog'):
+                game_logs = playergamelog.PlayerGameLog(player_id=player_id)
+                logs_df = game_logs.get_data_frames()[0].head(10)
         
         if logs_df.empty:
             return get_mock_stats(player_id)
@@ -127,7 +154,7 @@ def fetch_player_stats(player_id: str) -> Dict:
         return stats
         
     except Exception as e:
-        print(f"Error fetching player stats: {e}")
+        log.error("Error fetching player stats: %s", e)
         return get_mock_stats(player_id)
 
 def get_mock_stats(player_id: str) -> Dict:
@@ -142,12 +169,17 @@ def get_mock_stats(player_id: str) -> Dict:
 
 def fetch_player_game_log(player_id: str, last_n_games: int = 10) -> pd.DataFrame:
     """Fetch player's recent game logs"""
+    if use_synthetic_data():
+        from synthetic_data import generate_player_game_log
+        return generate_player_game_log(player_id, last_n_games)
     try:
         from nba_api.stats.endpoints import playergamelog
+        configure_nba_api()
         
         # Get game logs for current season
-        game_logs = playergamelog.PlayerGameLog(player_id=player_id)
-        logs_df = game_logs.get_data_frames()[0]
+        with upstream('nba_stats', 'playergamelog'):
+            game_logs = playergamelog.PlayerGameLog(player_id=player_id)
+            logs_df = game_logs.get_data_frames()[0]
         
         # Get last N games
         recent_games = logs_df.head(last_n_games)
@@ -156,6 +188,7 @@ def fetch_player_game_log(player_id: str, last_n_games: int = 10) -> pd.DataFram
         # Convert date format with explicit format
         return pd.DataFrame({
             'date': pd.to_datetime(recent_games['GAME_DATE'], format='%b %d, %Y'),
+            'game_id': recent_games['Game_ID'].astype(str),
             'points': recent_games['PTS'],
             'rebounds': recent_games['REB'],
             'assists': recent_games['AST'],
@@ -164,10 +197,11 @@ def fetch_player_game_log(player_id: str, last_n_games: int = 10) -> pd.DataFram
         })
         
     except Exception as e:
-        print(f"Error fetching game logs: {e}")
+        log.error("Error fetching game logs: %s", e)
         # Return empty DataFrame with correct column types
         return pd.DataFrame({
             'date': pd.Series(dtype='datetime64[ns]'),
+            'game_id': pd.Series(dtype='str'),
             'points': pd.Series(dtype='float64'),
             'rebounds': pd.Series(dtype='float64'),
             'assists': pd.Series(dtype='float64'),
@@ -177,13 +211,20 @@ def fetch_player_game_log(player_id: str, last_n_games: int = 10) -> pd.DataFram
 
 def get_team_stats(team_name: str) -> Dict:
     """Get team's current season stats"""
+    if use_synthetic_data():
+        from synthetic_data import generate_team_stats
+        return generate_team_stats(team_name)
     try:
+        from nba_api.stats.endpoints import teaminfocommon
+        configure_nba_api()
+
         team_id = get_team_id(team_name)
         if not team_id:
             return {}
             
-        team_info = teaminfocommon.TeamInfoCommon(team_id=team_id)
-        stats_df = team_info.get_data_frames()[0]
+        with upstream('nba_stats', 'teaminfocommon'):
+            team_info = teaminfocommon.TeamInfoCommon(team_id=team_id)
+            stats_df = team_info.get_data_frames()[0]
         
         return {
             'wins': int(stats_df['W'].iloc[0]),
@@ -195,69 +236,166 @@ def get_team_stats(team_name: str) -> Dict:
         }
         
     except Exception as e:
-        print(f"Error fetching team stats: {e}")
+        log.error("Error fetching team stats: %s", e)
         return {}
 
-def fetch_game_props(game_id: str) -> Dict:
-    """Fetch available props and odds for a game"""
+# Prop stat -> box score column; the names main.py and the prop odds markets use, lowercased
+PROP_STATS = {
+    'points': 'PTS',
+    'rebounds': 'REB',
+    'assists': 'AST',
+    'threes made': 'FG3M',
+    'blocks': 'BLK',
+    'steals': 'STL'
+}
+GAME_PROP_DTYPES = {
+    'line': 'float64',
+    'over_odds': 'float64',
+    'under_odds': 'float64',
+    'over_prob': 'float64',
+    'box_score': 'float64',
+    'posted': 'bool'
+}
+GAME_PROPS_TTL = 600  # seconds a game's frame, and the box score in it, is reused
+
+# event id -> (prop odds version, built at, frame)
+_game_props: Dict[str, Tuple[object, float, pd.DataFrame]] = {}
+_game_props_lock = threading.Lock()
+
+def empty_game_props() -> pd.DataFrame:
+    index = pd.MultiIndex.from_arrays([pd.Series(dtype='str'), pd.Series(dtype='str')], names=['player', 'stat'])
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in GAME_PROP_DTYPES.items()}, index=index)
+
+def game_props_frame(prop_odds: pd.DataFrame, box: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """One game's posted prop lines indexed by (player, stat), with its box score alongside once it has one
+
+    prop_odds holds the game's normalized prop odds rows. Each line is the one
+    most books hang, at the best price per side; over_prob is the books'
+    no-vig consensus for the over at that line. box_score is the player's
+    total in this game's box score, NaN before tip-off; it is never a line.
+    """
+    from fair_lines import fair_lines
+    from prop_odds import PLAYER_MARKETS, summarize_props
+
+    stat_of = {market: stat.lower() for stat, market in PLAYER_MARKETS['NBA'].items()}
+    df = empty_game_props()
+    posted = summarize_props(prop_odds)
+    if posted:
+        lines = pd.DataFrame.from_dict(posted, orient='index')
+        lines.index = pd.MultiIndex.from_tuples(lines.index, names=['player', 'market'])
+        over = fair_lines(prop_odds)
+        over = (over[over['outcome'] == 'Over'].drop_duplicates(['player', 'market', 'point'])
+                .set_index(['player', 'market', 'point'])['consensus'])
+        keys = pd.MultiIndex.from_arrays([lines.index.get_level_values('player'),
+                                          lines.index.get_level_values('market'), lines['line']])
+        df = pd.DataFrame({
+            'line': lines['line'].to_numpy(dtype=float),
+            'over_odds': lines['over_odds'].to_numpy(dtype=float),
+            'under_odds': lines['under_odds'].to_numpy(dtype=float),
+            'over_prob': over.reindex(keys).to_numpy(dtype=float),
+            'box_score': float('nan')
+        }, index=pd.MultiIndex.from_arrays([lines.index.get_level_values('player'),
+                                            lines.index.get_level_values('market').map(stat_of)],
+                                           names=['player', 'stat']))
+        df = df[df.index.get_level_values('stat').notna()]
+
+    if box is not None and not box.empty:
+        columns = {stat: column for stat, column in PROP_STATS.items() if column in box}
+        totals = (box.set_index('PLAYER_NAME')[list(columns.values())]
+                  .rename(columns={column: stat for stat, column in columns.items()})
+                  .rename_axis(index='player', columns='stat')
+                  .stack().dropna().astype(float))
+        df = df.reindex(df.index.union(totals.index))
+        df['box_score'] = totals.reindex(df.index)
+
+    df['posted'] = df['line'].notna()
+    return df.astype(GAME_PROP_DTYPES).sort_index()
+
+def fetch_box_score(home_team: str, away_team: str) -> Optional[pd.DataFrame]:
+    """Player box score of the teams' game, None until it has tipped off"""
+    if use_synthetic_data():
+        return None  # synthetic slate games have not tipped off
+    game_id = get_game_id_from_teams(home_team, away_team)
+    if not game_id:
+        return None
     try:
-        # Get game info
-        game = boxscoreadvancedv2.BoxScoreAdvancedV2(game_id=game_id)
-        player_stats = game.get_data_frames()[0]
-        
-        # Format props data
-        props = {}
-        for _, player in player_stats.iterrows():
-            player_name = player['PLAYER_NAME']
-            
-            # Points props
-            points_line = player['PTS'] * 0.9  # Conservative estimate
-            props[f"{player_name}_Points"] = {
-                'line': round(points_line, 1),
-                'over_odds': 100,  # Mock odds - replace with real odds API
-                'under_odds': -120
-            }
-            
-            # Rebounds props
-            reb_line = player['REB'] * 0.9
-            props[f"{player_name}_Rebounds"] = {
-                'line': round(reb_line, 1),
-                'over_odds': -110,
-                'under_odds': -110
-            }
-            
-            # Assists props
-            ast_line = player['AST'] * 0.9
-            props[f"{player_name}_Assists"] = {
-                'line': round(ast_line, 1),
-                'over_odds': -105,
-                'under_odds': -115
-            }
-        
-        return props
-        
+        from nba_api.stats.endpoints import boxscoretraditionalv2
+        configure_nba_api()
+
+        with upstream('nba_stats', 'boxscoretraditionalv2'):
+            return boxscoretraditionalv2.BoxScoreTraditionalV2(game_id=game_id).get_data_frames()[0]
     except Exception as e:
-        print(f"Error fetching game props: {e}")
-        return {}
+        log.error("Error fetching box score: %s", e)
+        return None
+
+def fetch_game_props(event_id: str, prop_odds: pd.DataFrame, version=None) -> pd.DataFrame:
+    """Prop lines for one odds event, indexed by (player, stat) for .loc[(player, stat)] lookups
+
+    prop_odds is the slate's normalized prop odds (prop_odds.fetch_slate_props)
+    and version identifies it. Frames are cached per event: a new version
+    rebuilds one, and otherwise it is reused for GAME_PROPS_TTL seconds. The
+    box score is only requested once the game has started.
+    """
+    now = time.time()
+    with _game_props_lock:
+        cached = _game_props.get(event_id)
+        if cached is not None and cached[0] == version and now - cached[1] < GAME_PROPS_TTL:
+            return cached[2]
+
+    rows = prop_odds[prop_odds['game_id'] == event_id]
+    box = None
+    if not rows.empty and pd.Timestamp(rows['commence_time'].iloc[0]) <= pd.Timestamp.now(tz='UTC'):
+        box = fetch_box_score(rows['home_team'].iloc[0], rows['away_team'].iloc[0])
+    props = game_props_frame(rows, box)
+    with _game_props_lock:
+        _game_props[event_id] = (version, now, props)
+    return props
+
+def invalidate_game_props(event_id: Optional[str] = None):
+    """Drop one event's cached frame, or every event's"""
+    with _game_props_lock:
+        if event_id is None:
+            _game_props.clear()
+        else:
+            _game_props.pop(event_id, None)
+
+@lru_cache(maxsize=1)
+def get_team_abbreviations() -> Dict[str, str]:
+    """Map of full team name to the abbreviation game finder MATCHUPs use"""
+    from nba_api.stats.static import teams
+    return {team['full_name']: team['abbreviation'] for team in teams.get_teams()}
 
 def get_game_id_from_teams(home_team: str, away_team: str) -> str:
-    """Get NBA game ID from team names"""
+    """NBA game ID of the teams' game from the last day, once it has started"""
+    if use_synthetic_data():
+        from synthetic_data import find_game
+        game = find_game(home_team, away_team)
+        return game['id'] if game else None
     try:
-        games = leaguegamefinder.LeagueGameFinder(
-            team_id_nullable=get_team_id(home_team),
-            season_nullable="2023-24"
-        ).get_data_frames()[0]
-        
-        # Find matching game
+        from nba_api.stats.endpoints import leaguegamefinder
+        configure_nba_api()
+
+        abbreviations = get_team_abbreviations()
+        if home_team not in abbreviations or away_team not in abbreviations:
+            log.warning("No abbreviation for %s or %s", home_team, away_team)
+            return None
+        today = pd.Timestamp.now()
+        with upstream('nba_stats', 'leaguegamefinder'):
+            games = leaguegamefinder.LeagueGameFinder(
+                team_id_nullable=get_team_id(home_team),
+                season_nullable=season_for(today)
+            ).get_data_frames()[0]
+
+        # The home team's rows read "PHI vs. MIL"
         game = games[
-            (games['MATCHUP'].str.contains(away_team, case=False)) &
-            (games['GAME_DATE'] >= (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'))
-        ]
-        
+            (games['MATCHUP'] == f"{abbreviations[home_team]} vs. {abbreviations[away_team]}") &
+            (games['GAME_DATE'] >= (today - pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+        ].sort_values('GAME_DATE', ascending=False)
+
         if not game.empty:
             return str(game.iloc[0]['GAME_ID'])
         return None
         
     except Exception as e:
-        print(f"Error finding game ID: {e}")
+        log.error("Error finding game ID: %s", e)
         return None
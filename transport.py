@@ -0,0 +1,246 @@
+"""Record/replay HTTP transport with injected latency and errors.
+
+    HTTP_MODE=record  streamlit run main.py     # live calls, each response saved under CASSETTE_DIR
+    HTTP_MODE=replay  python benchmarks/...     # answered from CASSETTE_DIR only, no network
+    HTTP_LATENCY_MS=120 HTTP_JITTER_MS=40 HTTP_ERROR_RATE=0.05   # faults, in any mode
+
+The odds API and nba_api calls go through get_session() (a requests session),
+the OpenAI client through http_client() (an httpx client). Recordings are keyed
+on method, URL with sorted query parameters, and body; API keys are left out of
+both the key and the stored URL, so cassettes can be committed.
+NBA_STATS_URL points nba_api at another host, e.g. local_upstreams.py.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import get_logger
+
+HTTP_MODE = os.getenv('HTTP_MODE', 'live').lower()  # live | record | replay
+CASSETTE_DIR = os.getenv('CASSETTE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes'))
+HTTP_LATENCY_MS = float(os.getenv('HTTP_LATENCY_MS', '0'))
+HTTP_JITTER_MS = float(os.getenv('HTTP_JITTER_MS', '0'))
+HTTP_ERROR_RATE = float(os.getenv('HTTP_ERROR_RATE', '0'))
+HTTP_FAULT_SEED = os.getenv('HTTP_FAULT_SEED')
+
+SECRET_PARAMS = {'apikey', 'api_key', 'key', 'token'}
+# Encoding headers describe the wire bytes, not the decoded body a cassette stores
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+log = get_logger(__name__)
+
+
+class ReplayMiss(requests.ConnectionError):
+    """Replay mode was asked for a request that was never recorded"""
+
+
+class FaultInjector:
+    """Adds latency (fixed plus uniform jitter) and fails a share of requests; seedable"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.latency_ms or self.jitter_ms or self.error_rate)
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._rng.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+def default_faults() -> FaultInjector:
+    return FaultInjector(HTTP_LATENCY_MS, HTTP_JITTER_MS, HTTP_ERROR_RATE,
+                         seed=int(HTTP_FAULT_SEED) if HTTP_FAULT_SEED else None)
+
+
+def redact_url(url: str) -> str:
+    """URL with secret query parameters removed and the rest sorted"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+class Cassette:
+    """One JSON file per recorded response, under a directory per host"""
+
+    def __init__(self, directory: str = CASSETTE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def key(method: str, url: str, body: Optional[bytes] = None) -> str:
+        digest = hashlib.sha256(f"{method.upper()} {redact_url(url)}\n".encode('utf-8'))
+        digest.update(body or b'')
+        return digest.hexdigest()[:32]
+
+    def path(self, url: str, key: str) -> str:
+        host = urlsplit(url).netloc.replace(':', '_') or 'local'
+        return os.path.join(self.directory, host, f"{key}.json")
+
+    def load(self, method: str, url: str, body: Optional[bytes] = None) -> Optional[Dict]:
+        path = self.path(url, self.key(method, url, body))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, method: str, url: str, body: Optional[bytes], status: int, headers: Dict, content: bytes):
+        path = self.path(url, self.key(method, url, body))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'method': method.upper(),
+            'url': redact_url(url),
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            'body': content.decode('utf-8', errors='replace'),
+            'recorded_at': time.time()
+        }
+        # Write-then-rename so a concurrent replay never reads half a file
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+
+def _request_body(body) -> Optional[bytes]:
+    if body is None or isinstance(body, bytes):
+        return body
+    return str(body).encode('utf-8')
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    """requests adapter: passes through, records, or replays, with faults applied first"""
+
+    def __init__(self, mode: str = HTTP_MODE, cassette: Optional[Cassette] = None,
+                 faults: Optional[FaultInjector] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.cassette = cassette or Cassette()
+        self.faults = faults or FaultInjector()
+
+    def _response(self, request, status: int, headers: Dict, content: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = content
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = 'Injected fault' if headers.get('X-Injected-Fault') else 'OK'
+        return response
+
+    def send(self, request, **kwargs):
+        self.faults.delay()
+        if self.faults.should_fail():
+            return self._response(request, self.faults.error_status, {'X-Injected-Fault': '1'}, b'')
+
+        body = _request_body(request.body)
+        if self.mode == 'replay':
+            entry = self.cassette.load(request.method, request.url, body)
+            if entry is None:
+                raise ReplayMiss(f"No recording for {request.method} {redact_url(request.url)}", request=request)
+            return self._response(request, entry['status'], entry['headers'], entry['body'].encode('utf-8'))
+
+        response = super().send(request, **kwargs)
+        if self.mode == 'record':
+            self.cassette.save(request.method, request.url, body, response.status_code,
+                               dict(response.headers), response.content)
+        return response
+
+
+def transport_active(mode: str = HTTP_MODE, faults: Optional[FaultInjector] = None) -> bool:
+    return mode != 'live' or (faults or default_faults()).active
+
+
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Process-wide requests session: pooled keep-alive, plus record/replay/faults when enabled"""
+    session = requests.Session()
+    faults = default_faults()
+    if transport_active(HTTP_MODE, faults):
+        adapter = RecordReplayAdapter(HTTP_MODE, Cassette(), faults)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        log.info("HTTP transport: mode=%s cassettes=%s faults=%s", HTTP_MODE, CASSETTE_DIR, faults.active)
+    return session
+
+
+def http_client():
+    """httpx client for the OpenAI SDK, or None to keep its default when the transport is off"""
+    faults = default_faults()
+    if not transport_active(HTTP_MODE, faults):
+        return None
+    import httpx
+
+    class RecordReplayTransport(httpx.BaseTransport):
+        def __init__(self):
+            self.inner = httpx.HTTPTransport()
+            self.cassette = Cassette()
+
+        def handle_request(self, request):
+            faults.delay()
+            if faults.should_fail():
+                return httpx.Response(faults.error_status, headers={'X-Injected-Fault': '1'}, request=request)
+            url, body = str(request.url), request.read()
+            if HTTP_MODE == 'replay':
+                entry = self.cassette.load(request.method, url, body)
+                if entry is None:
+                    raise httpx.ConnectError(f"No recording for {request.method} {redact_url(url)}",
+                                             request=request)
+                return httpx.Response(entry['status'], headers=entry['headers'],
+                                      content=entry['body'].encode('utf-8'), request=request)
+            response = self.inner.handle_request(request)
+            if HTTP_MODE != 'record':
+                return response
+            # Streamed completions are read in full so the recording replays as the same event stream
+            content = response.read()
+            response.close()
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+            self.cassette.save(request.method, url, body, response.status_code, headers, content)
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        def close(self):
+            self.inner.close()
+
+    return httpx.Client(transport=RecordReplayTransport(), timeout=60)
+
+
+_nba_configured = False
+
+
+def configure_nba_api():
+    """Route nba_api through get_session() and NBA_STATS_URL; call after importing an endpoint"""
+    global _nba_configured
+    if _nba_configured:
+        return
+    from nba_api.stats.library.http import NBAStatsHTTP
+
+    # Read at first use rather than import, so an in-process LocalUpstreams can set it
+    stats_url = os.getenv('NBA_STATS_URL')
+    if stats_url:
+        NBAStatsHTTP.base_url = stats_url.rstrip('/') + '/{endpoint}'
+    if transport_active() and hasattr(NBAStatsHTTP, 'set_session'):
+        NBAStatsHTTP.set_session(get_session())
+    _nba_configured = True
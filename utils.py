@@ -1,13 +1,14 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import openai
 import os
 from dotenv import load_dotenv
-from functools import lru_cache, wraps
+from functools import wraps
+from metrics import get_logger, upstream, upstream_error
+from transport import get_session
 
 load_dotenv()
+log = get_logger(__name__)
 
 SPORT_KEYS = {
     'NBA': 'basketball_nba',
@@ -17,39 +18,118 @@ SPORT_KEYS = {
     'NHL': 'icehockey_nhl'
 }
 
-@lru_cache(maxsize=32)
-def fetch_odds_data(sport):
+ODDS_API_URL = os.getenv('ODDS_API_URL', 'https://api.the-odds-api.com/v4')
+
+def use_synthetic_data() -> bool:
+    """SYNTHETIC_DATA=1 swaps every upstream fetch for synthetic_data's generators"""
+    return os.getenv('SYNTHETIC_DATA', '').lower() in ('1', 'true', 'yes')
+
+ODDS_COLUMNS = ['game_id', 'sport', 'commence_time', 'home_team', 'away_team',
+                'bookmaker', 'market', 'outcome', 'player', 'point', 'price', 'last_update']
+
+def season_for(day) -> str:
+    """NBA-style season label ('2023-24') for a date; seasons roll over in October"""
+    day = pd.Timestamp(day)
+    start = day.year if day.month >= 10 else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+def slate_opponents(home_teams, away_teams) -> dict:
+    """Each team on the slate mapped to the team it plays"""
+    opponents = dict(zip(home_teams, away_teams))
+    opponents.update(zip(away_teams, home_teams))
+    return opponents
+
+def fetch_odds_snapshot(sport, markets='h2h,spreads,totals', event_ids=None, budget=None):
+    """Fetch raw odds for a sport, keeping every bookmaker's markets
+
+    event_ids limits the call to those games at the same credit cost; a
+    prop_odds.CreditBudget, if given, is charged and may refuse the call.
+    """
+    if use_synthetic_data():
+        from synthetic_data import generate_odds
+        games = generate_odds(sport, markets=markets)
+        return [game for game in games if game['id'] in event_ids] if event_ids is not None else games
+    cost = len(markets.split(','))
+    if budget is not None and not budget.reserve(cost):
+        return []
     try:
         api_key = os.getenv('THE_ODDS_API_KEY')
         sport_key = SPORT_KEYS.get(sport.upper(), sport.lower())
-        
-        url = f"https://api.the-odds-api.com/v4/sports/{sport_key}/odds"
-        response = requests.get(url, params={
+        params = {
             'apiKey': api_key,
             'regions': 'us',
-            'markets': 'h2h,spreads',
+            'markets': markets,
             'oddsFormat': 'american'
-        })
+        }
+        if event_ids is not None:
+            params['eventIds'] = ','.join(event_ids)
+        
+        url = f"{ODDS_API_URL}/sports/{sport_key}/odds"
+        with upstream('odds_api', 'odds'):
+            response = get_session().get(url, params=params)
+        if budget is not None:
+            budget.settle(cost, response.headers)
         
         if response.status_code != 200:
+            upstream_error('odds_api', 'odds', f"HTTP {response.status_code}")
             return []
             
-        data = response.json()
-        return [format_game_data(game) for game in data if isinstance(game, dict)]
+        return [game for game in response.json() if isinstance(game, dict)]
         
     except Exception as e:
-        print(f"API Error: {e}")
+        log.error("Odds API error: %s", e)
         return []
 
-def format_game_data(game):
-    odds_h2h = {}
-    if game.get('bookmakers'):
-        for book in game['bookmakers']:
+def fetch_odds_data(sport):
+    from best_lines import BestLineIndex
+
+    data = fetch_odds_snapshot(sport, markets='h2h,spreads')
+    index = BestLineIndex.from_games(data)
+    return [format_game_data(game, index) for game in data]
+
+def iter_odds(games):
+    """Yield one flat tuple per bookmaker outcome, in ODDS_COLUMNS order"""
+    if hasattr(games, 'iter_rows'):  # compact.OddsBuffer
+        yield from games.iter_rows()
+        return
+    for game in games:
+        game_id = str(game.get('id', ''))
+        sport = game.get('sport_key', '')
+        commence_time = game.get('commence_time', '')
+        home_team = game.get('home_team', '')
+        away_team = game.get('away_team', '')
+        for book in game.get('bookmakers', []):
+            book_key = book.get('key', '')
             for market in book.get('markets', []):
-                if market.get('key') == 'h2h':
-                    for outcome in market.get('outcomes', []):
-                        team_name = outcome.get('name', '')
-                        odds_h2h[f"odds_{team_name}"] = float(outcome.get('price', 0))
+                market_key = market.get('key', '')
+                last_update = market.get('last_update', book.get('last_update', ''))
+                for outcome in market.get('outcomes', []):
+                    point = outcome.get('point')
+                    # Player markets name the player in 'description' and the side in 'name'
+                    yield (game_id, sport, commence_time, home_team, away_team,
+                           book_key, market_key, outcome.get('name', ''), outcome.get('description', ''),
+                           float(point) if point is not None else np.nan,
+                           float(outcome.get('price', 0)), last_update)
+
+def outcome_label(outcome: str, player: str = '') -> str:
+    """Unique outcome name within a market, e.g. 'Joel Embiid Over' for player props"""
+    return f"{player} {outcome}" if player else outcome
+
+def normalize_odds(games) -> pd.DataFrame:
+    """Flatten raw odds API games into one row per bookmaker outcome"""
+    return pd.DataFrame.from_records(list(iter_odds(games)), columns=ODDS_COLUMNS)
+
+def format_game_data(game, index=None):
+    from best_lines import BestLineIndex
+
+    # Best moneyline per team across every book, not whichever book came last
+    index = index or BestLineIndex.from_games([game])
+    game_id = str(game.get('id', ''))
+    odds_h2h = {}
+    for team_name, point in index.lines(game_id, 'h2h'):
+        price, book = index.best(game_id, 'h2h', team_name, point)
+        odds_h2h[f"odds_{team_name}"] = float(price)
+        odds_h2h[f"book_{team_name}"] = book
 
     return {
         'id': str(game.get('id', '')),
@@ -76,6 +156,12 @@ def calculate_implied_probability(odds: float) -> float:
     else:
         return round(abs(odds) / (abs(odds) + 100), 3)
 
+def american_to_decimal(odds: float) -> float:
+    """Convert American odds to decimal odds (stake included)"""
+    if odds > 0:
+        return 1 + odds / 100
+    return 1 + 100 / abs(odds)
+
 def calculate_ev(odds: float, prob_winning: float, bet_amount: float = 100) -> float:
     """Calculate EV for a bet
     Args:
@@ -100,23 +186,8 @@ def format_american_odds(odds: float) -> str:
     return f"{odds:0.0f}"
 
 def generate_ai_insight(query, context=None):
-    try:
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        messages = [
-            {"role": "system", "content": "You are a sports betting analytics expert."},
-            {"role": "user", "content": query}
-        ]
-        if context:
-            messages.insert(1, {"role": "system", "content": context})
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=150
-        )
-        return response.choices[0].message['content']
-    except:
-        return "AI insight unavailable"
+    from insight_service import get_insight_service
+    return get_insight_service().ask(query, context)
 
 def format_historical_data(data):
     return pd.DataFrame(data).sort_values('date', ascending=False)